@@ -0,0 +1,12 @@
+##########################################
+# 
+# PassTools SDK benchmarks
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Benchmarks of the PassTools SDK hot paths, run against a local stand-in for the API (see passtools.standin).
+
+Run them with run_benchmarks.py.
+
+"""
@@ -0,0 +1,247 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+"""
+Benchmark cases. Each case is (name, setup, iterations, concurrency); setup(context) prepares what the case
+needs and returns the operation to time. context holds the stand-in server's base_url, api_key, template_id
+and pass_ids, and the base_url and certfile of a second stand-in serving the same over HTTPS
+(see make_context()).
+
+"""
+
+import logging
+import os
+import ssl
+import StringIO
+
+from passtools import client, jsoncodec, service, template, pt_pass
+
+API_KEY = "benchmark-key"
+FIELD_COUNT = 30
+PASS_COUNT = 1000
+LARGE_FIELD_COUNT = 50
+LARGE_FIELD_SIZE = 1000
+
+
+def make_fields(prefix="value"):
+	return dict(("field%d" % i, {"value": "%s %d" % (prefix, i), "label": "Field %d" % i, "changeMessage": ""})
+	            for i in xrange(FIELD_COUNT))
+
+
+def make_context(server, tls_server):
+	"""
+	Fill the stand-in servers with a template and PASS_COUNT passes; both get the same ids.
+
+	@return: Dict passed to the setup of every case
+	"""
+	for filled in (server, tls_server):
+		template_id = filled.add_template(make_fields(), name="Benchmark")
+		pass_ids = [filled.add_pass(template_id) for i in xrange(PASS_COUNT)]
+	return {"base_url": server.base_url, "api_key": API_KEY, "template_id": template_id, "pass_ids": pass_ids,
+	        "tls_base_url": tls_server.base_url, "certfile": tls_server.certfile}
+
+
+def make_large_fields(prefix="value"):
+	# About 50 KB once encoded
+	return dict(("field%d" % i, {"value": "%s %d %s" % (prefix, i, "x" * LARGE_FIELD_SIZE), "label": "Field %d" % i,
+	                             "changeMessage": ""})
+	            for i in xrange(LARGE_FIELD_COUNT))
+
+
+def _service(context, **client_options):
+	return service.Service(context["api_key"], base_url=context["base_url"], **client_options)
+
+
+def _tls_service(context, **client_options):
+	ssl_context = ssl.create_default_context(cafile=context["certfile"])
+	return service.Service(context["api_key"], base_url=context["tls_base_url"], ssl_context=ssl_context,
+	                       **client_options)
+
+
+def _pass_dict(context):
+	api_client = _service(context).api_client
+	return api_client.get("/pass/%s" % context["pass_ids"][0])[1]
+
+
+def _pass_listing(context, count):
+	# Body of a /pass listing of 'count' passes, repeating the stand-in's passes under new ids
+	api_client = _service(context).api_client
+	listing = api_client.codec.loads(api_client.get_json("/pass", pageSize=PASS_COUNT)[1])
+	passes = listing["Passes"]
+	# Encoded pass by pass, so that building it does not raise the peak memory of the case
+	encoded = [api_client.codec.dumps(dict(passes[i % len(passes)], id=i + 1)) for i in xrange(count)]
+	return '{"count": %d, "Passes": [%s]}' % (count, ", ".join(encoded))
+
+
+def _log_to_devnull(level):
+	# Cases run in their own process, so this only affects the case calling it
+	root = logging.getLogger()
+	root.addHandler(logging.StreamHandler(open(os.devnull, "w")))
+	root.setLevel(level)
+
+
+##########################################
+# Request building and response parsing
+##########################################
+
+def encode_form(context):
+	api_client = client.PassToolsClient(API_KEY)
+	encode = api_client._PassToolsClient__encode_form
+	fields = make_fields()
+	return lambda: encode({"json": api_client.codec.dumps(fields)})
+
+
+def decode_pass(context):
+	api_client = _service(context).api_client
+	data = api_client.get_json("/pass/%s" % context["pass_ids"][0])[1]
+	return lambda: api_client.codec.loads(data)
+
+
+def decode_pass_list(codec_name):
+	def setup(context):
+		codec = jsoncodec.get_codec(codec_name)
+		data = _pass_listing(context, 5000)
+		return lambda: codec.loads(data)
+	return setup
+
+
+def hold_listed_passes(compact):
+	# Run once: memory_growth_kb is the memory taken by 100k listed passes
+	def setup(context):
+		api_client = client.PassToolsClient(API_KEY)
+		data = _pass_listing(context, 100000)
+
+		def hold():
+			listed = api_client.codec.loads(data)["Passes"]
+			if compact:
+				return [pt_pass.PassRecord(p, api_client) for p in listed]
+			pass_list = []
+			for p in listed:
+				new_pass = pt_pass.Pass(api_client=api_client)
+				new_pass._Pass__load_from_dict(p)
+				pass_list.append(new_pass)
+			return pass_list
+		return hold
+	return setup
+
+
+def load_pass(context):
+	pass_dict = _pass_dict(context)
+	api_client = client.PassToolsClient(API_KEY)
+
+	def load():
+		new_pass = pt_pass.Pass(api_client=api_client)
+		new_pass._Pass__load_from_dict(pass_dict)
+	return load
+
+
+def load_template_header(context):
+	header = _service(context).api_client.get("/template/%s" % context["template_id"])[1]["templateHeader"]
+	api_client = client.PassToolsClient(API_KEY)
+
+	def load():
+		new_template = template.Template(api_client=api_client)
+		new_template.header = header
+		new_template._Template__load_from_header()
+	return load
+
+
+##########################################
+# Against the stand-in server
+##########################################
+
+def list_passes(context):
+	pt_service = _service(context)
+	return lambda: pt_service.list_passes(pageSize=100)
+
+
+def list_passes_compact(context):
+	pt_service = _service(context)
+	return lambda: pt_service.list_passes(pageSize=100, compact=True)
+
+
+def get_pass(context):
+	pt_service = _service(context)
+	pass_id = context["pass_ids"][0]
+	return lambda: pt_service.get_pass(pass_id)
+
+
+def get_pass_no_keepalive(context):
+	# Idle connections are never reused: a new connection per request, as before pooling
+	pt_service = _service(context, idle_timeout=-1)
+	pass_id = context["pass_ids"][0]
+	return lambda: pt_service.get_pass(pass_id)
+
+
+def get_pass_https(context):
+	pt_service = _tls_service(context)
+	pass_id = context["pass_ids"][0]
+	return lambda: pt_service.get_pass(pass_id)
+
+
+def get_pass_https_no_keepalive(context):
+	# A TCP connection and TLS handshake per request, as before pooling
+	pt_service = _tls_service(context, idle_timeout=-1)
+	pass_id = context["pass_ids"][0]
+	return lambda: pt_service.get_pass(pass_id)
+
+
+def download_pass(context):
+	pt_service = _service(context)
+	pass_id = context["pass_ids"][0]
+	return lambda: pt_service.download_pass(StringIO.StringIO(), pass_id)
+
+
+def create_pass(context):
+	pt_service = _service(context)
+	fields = make_fields("created")
+	return lambda: pt_service.create_pass(context["template_id"], fields)
+
+
+def update_pass(context):
+	pt_service = _service(context)
+	pass_ids = context["pass_ids"]
+	fields = make_fields("updated")
+	counter = iter(xrange(10 ** 9))
+	return lambda: pt_service.update_pass(pass_ids[next(counter) % len(pass_ids)], fields, refetch=False)
+
+
+def update_pass_large(log_level=None, **client_options):
+	def setup(context):
+		if log_level is not None:
+			_log_to_devnull(log_level)
+		pt_service = _service(context, **client_options)
+		pass_ids = context["pass_ids"]
+		fields = make_large_fields("updated")
+		counter = iter(xrange(10 ** 9))
+		return lambda: pt_service.update_pass(pass_ids[next(counter) % len(pass_ids)], fields, refetch=False)
+	return setup
+
+
+CASES = [
+	("encode_form", encode_form, 20000, 1),
+	("decode_pass", decode_pass, 20000, 1),
+	("decode_pass_list_5000_json", decode_pass_list("json"), 50, 1),
+	("decode_pass_list_5000_ujson", decode_pass_list("ujson"), 50, 1),
+	("load_pass", load_pass, 50000, 1),
+	("load_template_header", load_template_header, 50000, 1),
+	("list_passes_100", list_passes, 300, 1),
+	("list_passes_100_compact", list_passes_compact, 300, 1),
+	("hold_100k_passes", hold_listed_passes(False), 1, 1),
+	("hold_100k_pass_records", hold_listed_passes(True), 1, 1),
+	("get_pass", get_pass, 2000, 1),
+	("get_pass_no_keepalive", get_pass_no_keepalive, 2000, 1),
+	("get_pass_https", get_pass_https, 2000, 1),
+	("get_pass_https_no_keepalive", get_pass_https_no_keepalive, 2000, 1),
+	("download_pass_16k", download_pass, 2000, 1),
+	("create_pass", create_pass, 1000, 1),
+	("create_pass_x10", create_pass, 2000, 10),
+	("update_pass", update_pass, 2000, 1),
+	("update_pass_x10", update_pass, 4000, 10),
+	("update_pass_50k", update_pass_large(), 1000, 1),
+	("update_pass_50k_debug_log", update_pass_large(logging.DEBUG), 1000, 1),
+	("update_pass_50k_trace", update_pass_large(logging.INFO, trace=True), 1000, 1),
+]
@@ -0,0 +1,194 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+"""
+Runs benchmark cases, each in its own process so that peak memory is measured per case.
+
+"""
+
+import gc
+import json
+import multiprocessing
+import platform
+import Queue
+import resource
+import sys
+import threading
+import time
+
+import passtools
+
+QUANTILES = (50, 95, 99)
+# Seconds between checks that a case's process is still alive
+POLL_INTERVAL = 1.0
+
+
+def percentile(samples, quantile):
+	# samples must be sorted
+	index = min(len(samples) - 1, int(round(quantile / 100.0 * (len(samples) - 1))))
+	return samples[index]
+
+
+def _peak_rss_kb():
+	# ru_maxrss is in kilobytes on Linux, bytes on OS X
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == "darwin":
+		peak //= 1024
+	return peak
+
+
+def measure(name, op, iterations, concurrency=1, warmup=None):
+	"""
+	Call op() 'iterations' times, split over 'concurrency' threads, timing each call.
+
+	@return: Dict of the results: ops_per_sec, latency percentiles in microseconds, and peak memory in KB
+	         (peak_rss_kb for the process, memory_growth_kb over the peak before the run)
+	"""
+	if warmup is None:
+		warmup = min(iterations // 10, 100)
+	for i in xrange(warmup):
+		op()
+	gc.collect()
+	rss_before = _peak_rss_kb()
+	latencies = []
+
+	def run(count):
+		timings = []
+		for i in xrange(count):
+			start = time.time()
+			op()
+			timings.append(time.time() - start)
+		latencies.extend(timings)
+
+	start = time.time()
+	if concurrency == 1:
+		run(iterations)
+	else:
+		threads = [threading.Thread(target=run, args=(iterations // concurrency,)) for i in xrange(concurrency)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+	elapsed = time.time() - start
+
+	latencies.sort()
+	result = {"name": name,
+	          "iterations": len(latencies),
+	          "concurrency": concurrency,
+	          "seconds": elapsed,
+	          "ops_per_sec": len(latencies) / elapsed if elapsed > 0 else 0.0,
+	          "peak_rss_kb": _peak_rss_kb(),
+	          "memory_growth_kb": _peak_rss_kb() - rss_before}
+	for quantile in QUANTILES:
+		result["p%d_us" % quantile] = percentile(latencies, quantile) * 1e6
+	return result
+
+
+def _run_case(case, context, scale, results):
+	try:
+		name, setup, iterations, concurrency = case
+		op = setup(context)
+		results.put(measure(name, op, max(1, int(iterations * scale)), concurrency))
+	except Exception, e:
+		results.put({"name": case[0], "error": "%s: %s" % (type(e).__name__, e)})
+
+
+def run_cases(cases, context, scale=1.0):
+	"""
+	Run each case in a child process.
+
+	@type cases: list
+	@param cases: (name, setup, iterations, concurrency) tuples; setup(context) returns the operation to time
+	@type context: dict
+	@param context: Passed to every setup function
+	@type scale: float
+	@param scale: Factor applied to every case's iterations [Optional; Default = 1]
+	@return: List of result dicts, in case order
+	"""
+	all_results = []
+	for case in cases:
+		results = multiprocessing.Queue()
+		process = multiprocessing.Process(target=_run_case, args=(case, context, scale, results))
+		process.start()
+		result = _wait_for_result(process, results)
+		process.join()
+		if result is None:
+			result = {"name": case[0], "error": _exit_reason(process.exitcode)}
+		all_results.append(result)
+		print format_result(result)
+		sys.stdout.flush()
+	return all_results
+
+
+def _wait_for_result(process, results):
+	# A process killed before putting its result (e.g. by the OOM killer) would leave results.get() waiting forever
+	while True:
+		try:
+			return results.get(timeout=POLL_INTERVAL)
+		except Queue.Empty:
+			if not process.is_alive():
+				break
+	# The result may have been put just before the process exited
+	try:
+		return results.get(timeout=POLL_INTERVAL)
+	except Queue.Empty:
+		return None
+
+
+def _exit_reason(exitcode):
+	if exitcode < 0:
+		return "process killed by signal %d" % -exitcode
+	return "process exited with code %d without a result" % exitcode
+
+
+def format_result(result):
+	if "error" in result:
+		return "%-28s ERROR %s" % (result["name"], result["error"])
+	return "%-28s %10.0f ops/sec   p50 %8.1fus   p95 %8.1fus   p99 %8.1fus   peak %7dKB (+%dKB)" % (
+		result["name"], result["ops_per_sec"], result["p50_us"], result["p95_us"], result["p99_us"],
+		result["peak_rss_kb"], result["memory_growth_kb"])
+
+
+def report(results, label=None):
+	"""
+	@return: Dict of the results and the environment they were measured in, for saving as JSON
+	"""
+	return {"label": label or passtools.api_version,
+	        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+	        "python": platform.python_version(),
+	        "platform": platform.platform(),
+	        "results": results}
+
+
+def compare(results, baseline):
+	"""
+	Print the change in ops/sec and p99 latency of each case against a baseline report.
+	"""
+	previous = dict((result["name"], result) for result in baseline["results"] if "error" not in result)
+	print "Compared with %s (%s):" % (baseline.get("label"), baseline.get("created"))
+	for result in results:
+		old = previous.get(result["name"])
+		if old is None or "error" in result:
+			continue
+		print "%-28s ops/sec %+6.1f%%   p99 %+6.1f%%" % (result["name"],
+		                                               _change(old["ops_per_sec"], result["ops_per_sec"]),
+		                                               _change(old["p99_us"], result["p99_us"]))
+
+
+def _change(old, new):
+	if not old:
+		return 0.0
+	return (new - old) * 100.0 / old
+
+
+def save(report_dict, path):
+	with open(path, "w") as output:
+		json.dump(report_dict, output, indent=2, sort_keys=True)
+
+
+def load(path):
+	with open(path) as report_file:
+		return json.load(report_file)
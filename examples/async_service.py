@@ -0,0 +1,126 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import shutil
+import tempfile
+import time
+import types
+import unittest
+
+from passtools import exceptions, service
+from passtools.cache import TemplateCache
+from passtools.client import AsyncPassToolsClient
+
+import test
+
+PASSES = 6
+
+
+class TestAsyncService(test.StandInTestCase):
+	"""
+	Service calls run on worker threads, returning futures.
+	"""
+
+	def setUp(self):
+		super(TestAsyncService, self).setUp()
+		self.cache = TemplateCache()
+		self.async_service = service.AsyncService(test.API_KEY, concurrency=2, base_url=self.server.base_url,
+		                                          template_cache=self.cache)
+
+	def tearDown(self):
+		self.async_service.close()
+		super(TestAsyncService, self).tearDown()
+
+	def fill_server(self):
+		self.pass_ids = [self.server.add_pass(self.template_id) for i in xrange(PASSES)]
+
+	def test_concurrency(self):
+		self.server.latency = 0.2
+		start = time.time()
+		futures = [self.async_service.get_pass(pass_id) for pass_id in self.pass_ids]
+		self.assertTrue(time.time() - start < 0.1)
+		self.assertEqual([future.result(5).pass_id for future in futures], self.pass_ids)
+		# Two at a time
+		self.assertTrue(time.time() - start >= 0.2 * PASSES / 2)
+
+	def test_template_cache(self):
+		futures = [self.async_service.get_template(self.template_id) for i in xrange(3)]
+		for future in futures:
+			self.assertEqual(future.result(5).template_id, self.template_id)
+		self.assertTrue(self.server.requests["GET /template/<id>"] <= 2)
+		self.assertTrue(self.cache.counters.get("hits") >= 1)
+
+	def test_calls(self):
+		new_pass = self.async_service.create_pass(self.template_id, {"owner": {"value": "async"}}).result(5)
+		self.assertEqual(new_pass.pass_fields["owner"]["value"], "async")
+		updated = self.async_service.update_pass(new_pass.pass_id, {"owner": {"value": "updated"}}).result(5)
+		self.assertEqual(updated.pass_fields["owner"]["value"], "updated")
+		self.assertEqual(self.async_service.count_passes().result(5), PASSES + 1)
+		listed = self.async_service.list_all_passes(page_size=4, compact=True).result(5)
+		self.assertEqual(sorted(record.pass_id for record in listed), sorted(self.pass_ids + [new_pass.pass_id]))
+		self.async_service.delete_pass(new_pass.pass_id).result(5)
+		self.assertFalse(new_pass.pass_id in self.server.passes)
+
+		# Errors are raised from result()
+		future = self.async_service.get_pass(10 ** 6)
+		self.assertRaises(exceptions.InvalidRequestException, future.result, 5)
+
+	def test_generators(self):
+		passes = self.async_service.iter_passes(page_size=4)
+		self.assertTrue(isinstance(passes, types.GeneratorType))
+		self.assertEqual(sorted(p.pass_id for p in passes), sorted(self.pass_ids))
+		results = list(self.async_service.create_passes(self.template_id, [{"owner": {"value": "bulk"}}] * 3,
+		                                                ordered=True))
+		self.assertEqual([index for index, new_pass in results], range(3))
+
+	def test_download_passes(self):
+		directory = tempfile.mkdtemp()
+		try:
+			download_stats = self.async_service.download_passes(self.pass_ids, directory).result(5)
+			self.assertEqual(download_stats.completed, PASSES)
+		finally:
+			shutil.rmtree(directory)
+
+
+class TestAsyncClient(test.StandInTestCase):
+	"""
+	Requests run on worker threads, returning futures.
+	"""
+
+	def setUp(self):
+		super(TestAsyncClient, self).setUp()
+		self.async_client = AsyncPassToolsClient(test.API_KEY, concurrency=2, base_url=self.server.base_url)
+
+	def tearDown(self):
+		self.async_client.close()
+		super(TestAsyncClient, self).tearDown()
+
+	def test_requests(self):
+		response_code, response_data = self.async_client.post("/pass/%s" % self.template_id,
+		                                                      {"json": '{"owner": {"value": "posted"}}'}).result(5)
+		self.assertEqual(response_code, 200)
+		pass_id = self.async_client.api_client.codec.loads(response_data)["id"]
+		response_code, pass_dict = self.async_client.get("/pass/%s" % pass_id).result(5)
+		self.assertEqual(pass_dict["passFields"]["owner"]["value"], "posted")
+		self.assertEqual(self.async_client.put_json("/pass/%s" % pass_id,
+		                                            {"json": '{"owner": {"value": "put"}}'}).result(5)[0], 200)
+		self.assertEqual(self.server.passes[pass_id]["passFields"]["owner"]["value"], "put")
+		self.assertEqual(self.async_client.delete("/pass/%s" % pass_id, {}).result(5)[0], 200)
+		self.assertEqual(self.server.passes, {})
+
+	def test_shared_client(self):
+		# An AsyncPassToolsClient can run requests, or any call, through an existing client
+		pt_service = self.new_service()
+		async_client = AsyncPassToolsClient(concurrency=2, api_client=pt_service.api_client)
+		try:
+			self.assertTrue(async_client.submit(pt_service.is_service_up).result(5))
+			self.assertEqual(async_client.get_json("/template/%s" % self.template_id).result(5)[0], 200)
+		finally:
+			async_client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import unittest
+
+from passtools import bulk, stats
+
+import test
+
+PASSES = 500
+# Every item with an index divisible by this is prepared without a template_id, and fails
+BAD_EVERY = 50
+
+
+def build_fields(item):
+	# Runs in the runner's processes
+	template_id, index = item
+	if index % BAD_EVERY == 0:
+		return None, {}
+	return template_id, {"owner": {"value": "owner %d" % index}, "offer": {"value": "%d%% Off" % (index % 100)}}
+
+
+class TestProcessRunner(test.StandInTestCase):
+	"""
+	Bulk creates on a pool of processes.
+	"""
+
+	template_fields = {"owner": {"value": ""}, "offer": {"value": ""}}
+
+	def run_passes(self, ordered):
+		bulk_stats = stats.BulkStats()
+		errors = stats.ErrorSummary()
+		with bulk.ProcessRunner(test.API_KEY, processes=3, chunk_size=20, prepare=build_fields,
+		                        base_url=self.server.base_url) as runner:
+			items = ((self.template_id, index) for index in xrange(PASSES))
+			results = list(runner.create_passes(items, ordered=ordered, bulk_stats=bulk_stats, errors=errors))
+
+		failures = PASSES // BAD_EVERY
+		self.assertEqual(sorted(index for index, result in results), range(PASSES))
+		self.assertEqual(bulk_stats.completed, PASSES - failures)
+		self.assertEqual(bulk_stats.failed, failures)
+		self.assertEqual(len(errors), failures)
+		self.assertEqual(errors.groups()[0]["error"], "InvalidParameterException")
+		for index, result in results:
+			if index % BAD_EVERY:
+				self.assertEqual(result.template_id, self.template_id)
+				self.assertEqual(self.server.passes[result.pass_id]["passFields"]["owner"]["value"], "owner %d" % index)
+		print "%s: %s" % ("ordered" if ordered else "unordered", bulk_stats)
+		return results
+
+	def test_unordered(self):
+		self.run_passes(False)
+
+	def test_ordered(self):
+		results = self.run_passes(True)
+		self.assertEqual([index for index, result in results], range(PASSES))
+
+	def test_promote(self):
+		results = self.run_passes(True)
+		full_pass = results[1][1].promote()
+		self.assertEqual(full_pass.pass_fields["owner"]["value"], "owner 1")
+
+
+class TestCreatePasses(test.StandInTestCase):
+	"""
+	Bulk creates on threads, with Service.create_passes().
+	"""
+
+	def setUp(self):
+		super(TestCreatePasses, self).setUp()
+		self.service = self.new_service(max_retries=0)
+		self.consumed = 0
+
+	def models(self, count):
+		# Counts the input items taken by create_passes()
+		for index in xrange(count):
+			self.consumed += 1
+			yield {"owner": {"value": "owner %d" % index}}
+
+	def test_bounded_window(self):
+		self.server.latency = 0.2
+		results = self.service.create_passes(self.template_id, self.models(PASSES), concurrency=2)
+		next(results)
+		# Two creates running and two waiting, plus the item that had to wait for the first result
+		self.assertEqual(self.consumed, 5)
+		# Stopping early only lets the creates already submitted finish
+		results.close()
+		self.assertEqual(len(self.server.passes), 4)
+
+	def test_ordered(self):
+		# Concurrent creates complete in any order
+		self.server.latency = 0.05
+		bulk_stats = stats.BulkStats()
+		results = list(self.service.create_passes(self.template_id, self.models(50), concurrency=5, ordered=True,
+		                                          bulk_stats=bulk_stats))
+		self.assertEqual([index for index, new_pass in results], range(50))
+		for index, new_pass in results:
+			self.assertEqual(new_pass.pass_fields["owner"]["value"], "owner %d" % index)
+		self.assertEqual((bulk_stats.completed, bulk_stats.failed), (50, 0))
+
+	def test_errors(self):
+		self.server.fail_next(400, 3)
+		self.server.fail_next(503, 2)
+		bulk_stats = stats.BulkStats()
+		errors = stats.ErrorSummary()
+		results = list(self.service.create_passes(self.template_id, self.models(20), concurrency=1,
+		                                          bulk_stats=bulk_stats, errors=errors))
+		failed = [index for index, result in results if isinstance(result, Exception)]
+		self.assertEqual(sorted(failed), range(5))
+		self.assertEqual((bulk_stats.completed, bulk_stats.failed), (15, 5))
+		self.assertEqual(len(self.server.passes), 15)
+		self.assertEqual([(group["error"], group["status"], group["count"], group["indexes"]) for group in errors.groups()],
+		                 [("InvalidRequestException", 400, 3, [0, 1, 2]), ("InternalServerException", 503, 2, [3, 4])])
+
+
+if __name__ == '__main__':
+    unittest.main()
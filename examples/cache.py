@@ -0,0 +1,87 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import shutil
+import tempfile
+import unittest
+
+from passtools import exceptions
+from passtools.cache import FileResponseCache, MemoryResponseCache, TemplateCache
+
+import test
+
+
+class TestTemplateCache(test.StandInTestCase):
+	"""
+	Service.get_template() with a template cache.
+	"""
+
+	template_fields = {"owner": {"value": "nobody"}}
+
+	def setUp(self):
+		super(TestTemplateCache, self).setUp()
+		self.cache = TemplateCache()
+		self.service = self.new_service(template_cache=self.cache)
+
+	def test_hits(self):
+		first = self.service.get_template(self.template_id)
+		first.fields_model["owner"]["value"] = "changed by the caller"
+		second = self.service.get_template(str(self.template_id))
+		self.assertEqual(second.fields_model["owner"]["value"], "nobody")
+		self.assertEqual(self.server.requests["GET /template/<id>"], 1)
+		self.assertEqual(self.cache.counters.snapshot(), {"misses": 1, "hits": 1})
+
+	def test_invalid_id(self):
+		# Rejected the same way with or without a cache
+		uncached = self.new_service()
+		for template_id in ("abc", [1]):
+			self.assertRaises(exceptions.InvalidParameterException, self.service.get_template, template_id)
+			self.assertRaises(exceptions.InvalidParameterException, uncached.get_template, template_id)
+		self.assertEqual(self.server.requests, {})
+
+
+class TestResponseCache(test.StandInTestCase):
+	"""
+	GET responses revalidated with conditional requests.
+	"""
+
+	template_fields = {"owner": {"value": "nobody"}}
+
+	def fill_server(self):
+		self.pass_id = self.server.add_pass(self.template_id)
+
+	def check_revalidated(self, response_cache):
+		pt_service = self.new_service(response_cache=response_cache)
+		first = pt_service.get_pass(self.pass_id)
+		second = pt_service.get_pass(self.pass_id)
+		self.assertEqual(second.pass_fields, first.pass_fields)
+		self.assertEqual(self.server.requests["GET /pass/<id>"], 2)
+		self.assertEqual(pt_service.api_client.counters.get("not_modified"), 1)
+
+		# A changed pass is sent again, and replaces the cached copy
+		self.server.passes[self.pass_id]["passFields"]["owner"]["value"] = "somebody"
+		self.assertEqual(pt_service.get_pass(self.pass_id).pass_fields["owner"]["value"], "somebody")
+		self.assertEqual(pt_service.get_pass(self.pass_id).pass_fields["owner"]["value"], "somebody")
+		self.assertEqual(pt_service.api_client.counters.get("not_modified"), 2)
+		return pt_service
+
+	def test_memory(self):
+		self.check_revalidated(MemoryResponseCache())
+
+	def test_file(self):
+		directory = tempfile.mkdtemp()
+		try:
+			self.check_revalidated(FileResponseCache(directory))
+			# A new client using the same directory revalidates what the first one stored
+			pt_service = self.new_service(response_cache=FileResponseCache(directory))
+			self.assertEqual(pt_service.get_pass(self.pass_id).pass_fields["owner"]["value"], "somebody")
+			self.assertEqual(pt_service.api_client.counters.get("not_modified"), 1)
+		finally:
+			shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import ssl
+import time
+import unittest
+
+from passtools import exceptions, standin
+
+import test
+
+
+class TestConnections(test.StandInTestCase):
+	"""
+	Pooled keep-alive connections.
+	"""
+
+	def test_timed_out_create_not_resent(self):
+		pt_service = self.new_service(timeout=0.3)
+		pt_service.is_service_up()
+		self.server.latency = 0.6
+		self.assertRaises(exceptions.PassToolsException, pt_service.create_pass, self.template_id,
+		                  {"owner": {"value": "once"}})
+		time.sleep(0.6)
+		self.assertEqual(self.server.requests["POST /pass/<id>"], 1)
+		self.assertEqual(len(self.server.passes), 1)
+
+	def test_server_closed_idle_connection(self):
+		pt_service = self.new_service()
+		self.assertTrue(pt_service.is_service_up())
+		# Restart the server on the same port: the pooled connection is now closed at the other end
+		self.server.stop()
+		self.start_server(self.server.port)
+		self.assertTrue(pt_service.is_service_up())
+		new_pass = pt_service.create_pass(self.template_id, {"owner": {"value": "once"}})
+		self.assertEqual(new_pass.pass_fields["owner"]["value"], "once")
+		self.assertEqual(len(self.server.passes), 1)
+
+
+class TestHTTPSConnections(test.StandInTestCase):
+	"""
+	Pooled keep-alive connections to a stand-in serving HTTPS.
+	"""
+
+	server_options = {"certfile": standin.CERT_FILE}
+
+	def new_service(self, **client_options):
+		client_options.setdefault("ssl_context", ssl.create_default_context(cafile=standin.CERT_FILE))
+		return super(TestHTTPSConnections, self).new_service(**client_options)
+
+	def test_handshake_once(self):
+		pool_manager = self.new_service().api_client.pool_manager
+		url = "%s/template/%s?api_key=%s" % (self.server.base_url, self.template_id, test.API_KEY)
+		first = pool_manager.urlopen("GET", url)
+		first.read()
+		second = pool_manager.urlopen("GET", url)
+		second.read()
+		self.assertEqual((first.status, second.status), (200, 200))
+		# The second request reuses the connection and its TLS session
+		self.assertTrue("tls" in first.timings)
+		self.assertFalse("tls" in second.timings)
+
+	def test_untrusted(self):
+		pt_service = self.new_service(ssl_context=ssl.create_default_context(), max_retries=0)
+		self.assertRaises(exceptions.ConnectionException, pt_service.get_template, self.template_id)
+		self.assertEqual(self.server.requests, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import test
+
+PASSES = 20
+
+
+class TestDownloadPasses(test.StandInTestCase):
+	"""
+	Bulk downloads into a pass store.
+	"""
+
+	server_options = {"pkpass_size": 4096}
+
+	def setUp(self):
+		super(TestDownloadPasses, self).setUp()
+		self.service = self.new_service()
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		super(TestDownloadPasses, self).tearDown()
+		shutil.rmtree(self.directory)
+
+	def fill_server(self):
+		self.pass_ids = [self.server.add_pass(self.template_id) for i in xrange(PASSES)]
+
+	def test_skip_unchanged(self):
+		download_stats = self.service.download_passes(self.pass_ids, self.directory)
+		self.assertEqual((download_stats.completed, download_stats.skipped, download_stats.failed), (PASSES, 0, 0))
+		self.assertEqual(download_stats.bytes, PASSES * 4096)
+		for pass_id in self.pass_ids:
+			self.assertEqual(os.path.getsize(os.path.join(self.directory, "%s.pkpass" % pass_id)), 4096)
+
+		# Nothing changed: every pass is revalidated and skipped
+		download_stats = self.service.download_passes(self.pass_ids, self.directory)
+		self.assertEqual((download_stats.completed, download_stats.skipped, download_stats.bytes), (PASSES, PASSES, 0))
+
+		# Only the updated pass is downloaded again
+		self.service.update_pass(self.pass_ids[0], {"owner": {"value": "changed"}}, refetch=False)
+		download_stats = self.service.download_passes(self.pass_ids, self.directory)
+		self.assertEqual((download_stats.skipped, download_stats.bytes), (PASSES - 1, 4096))
+		self.assertEqual(self.server.requests["GET /pass/<id>/download"], 3 * PASSES)
+
+	def test_missing_file_downloaded_again(self):
+		self.service.download_passes(self.pass_ids, self.directory)
+		os.remove(os.path.join(self.directory, "%s.pkpass" % self.pass_ids[0]))
+		download_stats = self.service.download_passes(self.pass_ids, self.directory)
+		self.assertEqual((download_stats.skipped, download_stats.bytes), (PASSES - 1, 4096))
+		self.assertTrue(os.path.exists(os.path.join(self.directory, "%s.pkpass" % self.pass_ids[0])))
+
+	def test_failures_counted(self):
+		self.server.fail_next(400, 2)
+		download_stats = self.service.download_passes(self.pass_ids, self.directory, workers=1)
+		self.assertEqual((download_stats.completed, download_stats.failed), (PASSES - 2, 2))
+
+	def test_file_mode(self):
+		# Files get the mode open() would give them under the process umask
+		umask = os.umask(027)
+		try:
+			self.service.download_passes(self.pass_ids[:1], self.directory)
+			single_path = os.path.join(self.directory, "single.pkpass")
+			self.service.download_pass(single_path, self.pass_ids[1])
+		finally:
+			os.umask(umask)
+		for path in (os.path.join(self.directory, "%s.pkpass" % self.pass_ids[0]), single_path):
+			self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0640)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import os
+import tempfile
+import unittest
+
+from passtools import jobs, stats
+
+import test
+
+PASSES = 300
+
+
+class TestJobs(test.StandInTestCase):
+	"""
+	Interrupted and resumed bulk jobs.
+	"""
+
+	def setUp(self):
+		super(TestJobs, self).setUp()
+		self.service = self.new_service(max_retries=0)
+		handle, self.journal_path = tempfile.mkstemp(suffix=".jsonl")
+		os.close(handle)
+		os.remove(self.journal_path)
+
+	def tearDown(self):
+		super(TestJobs, self).tearDown()
+		if os.path.exists(self.journal_path):
+			os.remove(self.journal_path)
+
+	def items(self):
+		return ((self.template_id, {"owner": {"value": "owner %d" % index}}) for index in xrange(PASSES))
+
+	def test_resume_creates(self):
+		# Stop halfway through
+		with jobs.Job(self.service, self.journal_path) as job:
+			for count, (index, pass_id) in enumerate(job.create_passes(self.items())):
+				if count == PASSES // 2:
+					break
+		created = len(self.server.passes)
+		self.assertTrue(created >= PASSES // 2)
+
+		# Simulate a crash between sending a create and journaling its outcome
+		journal = jobs.Journal(self.journal_path)
+		remaining = sorted(index for index in xrange(PASSES) if "create-%d" % index not in journal.done)
+		in_doubt_key = "create-%d" % remaining[0]
+		self.service.api_client.post("/pass/%s" % self.template_id,
+		                             {"json": '{"owner": {"value": "owner %d"}}' % remaining[0]},
+		                             idempotency_key="%s:%s" % (journal.job_id, in_doubt_key))
+		journal.start(in_doubt_key)
+		journal.close()
+
+		# The stand-in honours idempotency keys, so the create in doubt can be sent again
+		job_stats = stats.JobStats()
+		with jobs.Job(self.service, self.journal_path, resend_in_doubt=True) as job:
+			results = list(job.create_passes(self.items(), job_stats=job_stats))
+		self.assertEqual(sorted(index for index, pass_id in results), remaining)
+		self.assertEqual(job_stats.resumed, PASSES - len(remaining))
+		self.assertEqual(job_stats.in_doubt, 1)
+		self.assertEqual(len(self.server.passes), PASSES)
+		owners = sorted(p["passFields"]["owner"]["value"] for p in self.server.passes.values())
+		self.assertEqual(owners, sorted("owner %d" % index for index in xrange(PASSES)))
+		self.assertEqual(len(jobs.Journal(self.journal_path).done), PASSES)
+		print job_stats
+
+	def test_in_doubt_left(self):
+		journal = jobs.Journal(self.journal_path)
+		journal.start("create-0")
+		journal.close()
+		with jobs.Job(self.service, self.journal_path) as job:
+			results = list(job.create_passes(self.items()))
+		self.assertEqual(len(results), PASSES - 1)
+		self.assertEqual(jobs.Journal(self.journal_path).in_doubt, set(["create-0"]))
+
+	def test_failures(self):
+		self.server.fail_next(400, 3)
+		with jobs.Job(self.service, self.journal_path, concurrency=1) as job:
+			results = list(job.create_passes(self.items()))
+		self.assertEqual(len([result for index, result in results if isinstance(result, Exception)]), 3)
+		self.assertEqual(len(jobs.Journal(self.journal_path).failed), 3)
+
+		# Failed items are retried unless retry_failed is off
+		with jobs.Job(self.service, self.journal_path, retry_failed=False) as job:
+			self.assertEqual(list(job.create_passes(self.items())), [])
+		with jobs.Job(self.service, self.journal_path) as job:
+			self.assertEqual(len(list(job.create_passes(self.items()))), 3)
+		self.assertEqual(len(self.server.passes), PASSES)
+		self.assertEqual(jobs.Journal(self.journal_path).failed, {})
+
+	def test_keyed_create_not_retried(self):
+		# A 5xx may come after the create succeeded: only retried if the server is known to honour the key
+		self.service.api_client.max_retries = 3
+		self.server.fail_next(503)
+		with jobs.Job(self.service, self.journal_path, concurrency=1) as job:
+			results = list(job.create_passes(self.items()))
+		self.assertEqual(len([result for index, result in results if isinstance(result, Exception)]), 1)
+		self.assertEqual(self.server.requests["POST /pass/<id>"], PASSES)
+		journal = jobs.Journal(self.journal_path)
+		self.assertEqual((len(journal.in_doubt), len(journal.failed)), (1, 0))
+		journal.close()
+
+		trusting = self.new_service(honours_idempotency_keys=True, backoff_factor=0.01)
+		self.server.fail_next(503)
+		self.assertEqual(trusting.api_client.post("/pass/%s" % self.template_id, {"json": "{}"},
+		                                          idempotency_key="retried")[0], 200)
+		self.assertEqual(trusting.api_client.counters.get("retried"), 1)
+
+	def test_connection_reset_in_doubt(self):
+		# The server creates the pass, then resets the connection instead of answering
+		self.server.reset_next()
+		with jobs.Job(self.service, self.journal_path, concurrency=1) as job:
+			errors = [result for index, result in job.create_passes(self.items()) if isinstance(result, Exception)]
+		self.assertEqual(len(errors), 1)
+		self.assertEqual(len(self.server.passes), PASSES)
+		journal = jobs.Journal(self.journal_path)
+		self.assertEqual((journal.in_doubt, journal.failed), (set(["create-0"]), {}))
+		journal.close()
+
+		# Not sent again by the next run, even though it retries failed items
+		with jobs.Job(self.service, self.journal_path) as job:
+			self.assertEqual(list(job.create_passes(self.items())), [])
+		self.assertEqual(len(self.server.passes), PASSES)
+
+	def test_resume_updates(self):
+		pass_ids = [self.server.add_pass(self.template_id) for index in xrange(PASSES)]
+		updates = [(pass_id, {"owner": {"value": "updated %d" % pass_id}}) for pass_id in pass_ids]
+		with jobs.Job(self.service, self.journal_path) as job:
+			for count, result in enumerate(job.update_passes(updates)):
+				if count == 10:
+					break
+		job_stats = stats.JobStats()
+		with jobs.Job(self.service, self.journal_path) as job:
+			list(job.update_passes(updates, job_stats=job_stats))
+		self.assertEqual(job_stats.completed + job_stats.resumed, PASSES)
+		for pass_id in pass_ids:
+			self.assertEqual(self.server.passes[pass_id]["passFields"]["owner"]["value"], "updated %d" % pass_id)
+
+	def test_torn_line(self):
+		with jobs.Job(self.service, self.journal_path) as job:
+			list(job.create_passes(self.items()))
+		with open(self.journal_path, "a") as journal_file:
+			journal_file.write('{"k": "create-1", "s": "er')
+		journal = jobs.Journal(self.journal_path)
+		self.assertEqual(len(journal.done), PASSES)
+		journal.record_done("extra", 1)
+		journal.close()
+		self.assertEqual(jobs.Journal(self.journal_path).done["extra"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import time
+import types
+import unittest
+
+from passtools.pt_pass import Pass, PassRecord
+from passtools.template import Template, TemplateRecord
+
+import test
+
+PASSES = 25
+TEMPLATES = 12
+
+
+class TestListings(test.StandInTestCase):
+	"""
+	Listings walking every page of passes and templates.
+	"""
+
+	def setUp(self):
+		super(TestListings, self).setUp()
+		self.service = self.new_service()
+
+	def fill_server(self):
+		self.pass_ids = [self.server.add_pass(self.template_id, {"owner": {"value": "owner %d" % i}})
+		                 for i in xrange(PASSES)]
+		self.template_ids = [self.template_id] + [self.server.add_template(name="Template %d" % i)
+		                                          for i in xrange(TEMPLATES - 1)]
+
+	def wait_for_requests(self, route, count):
+		# Pages are prefetched in the background: give the last fetch time to arrive
+		deadline = time.time() + 2
+		while self.server.requests.get(route, 0) < count and time.time() < deadline:
+			time.sleep(0.01)
+		time.sleep(0.1)
+		return self.server.requests.get(route, 0)
+
+	def test_iter_passes_short_last_page(self):
+		listed = [p.pass_id for p in self.service.iter_passes(page_size=10)]
+		self.assertEqual(listed, sorted(self.pass_ids, reverse=True))
+		# 10 + 10 + 5: the short page is the last
+		self.assertEqual(self.wait_for_requests("GET /pass", 3), 3)
+
+	def test_iter_passes_full_last_page(self):
+		listed = [p.pass_id for p in self.service.iter_passes(page_size=5, order="ID", direction="ASC")]
+		self.assertEqual(listed, sorted(self.pass_ids))
+		# Five full pages, then an empty one to find the end
+		self.assertEqual(self.wait_for_requests("GET /pass", 6), 6)
+
+	def test_iter_passes_from_page(self):
+		listed = [p.pass_id for p in self.service.iter_passes(page_size=10, page=3)]
+		self.assertEqual(listed, sorted(self.pass_ids, reverse=True)[20:])
+
+	def test_iter_passes_early_exit(self):
+		passes = self.service.iter_passes(page_size=5)
+		for count, listed in enumerate(passes):
+			if count == 2:
+				break
+		passes.close()
+		# The first page, and the second fetched ahead; no more
+		self.assertEqual(self.wait_for_requests("GET /pass", 2), 2)
+
+	def test_iter_templates(self):
+		listed = [t.template_id for t in self.service.iter_templates(page_size=4)]
+		self.assertEqual(listed, sorted(self.template_ids, reverse=True))
+		self.assertEqual(self.wait_for_requests("GET /template/headers", 4), 4)
+
+	def test_list_all_passes(self):
+		listed = self.service.list_all_passes(page_size=10, workers=3, order="ID", direction="ASC")
+		self.assertEqual([p.pass_id for p in listed], sorted(self.pass_ids))
+		# One request for the count, then the three pages
+		self.assertEqual(self.server.requests["GET /pass"], 4)
+
+	def test_list_all_passes_exact_pages(self):
+		listed = self.service.list_all_passes(page_size=5)
+		self.assertEqual([p.pass_id for p in listed], sorted(self.pass_ids, reverse=True))
+		self.assertEqual(self.server.requests["GET /pass"], 1 + PASSES // 5)
+
+	def test_list_all_passes_of_template(self):
+		other_template_id = self.server.add_template()
+		other_pass_ids = [self.server.add_pass(other_template_id) for i in xrange(7)]
+		listed = self.service.list_all_passes(other_template_id, page_size=3)
+		self.assertEqual([p.pass_id for p in listed], sorted(other_pass_ids, reverse=True))
+
+	def test_list_all_passes_stream(self):
+		passes = self.service.list_all_passes(page_size=5, workers=2, stream=True)
+		self.assertTrue(isinstance(passes, types.GeneratorType))
+		self.assertEqual([p.pass_id for p in passes], sorted(self.pass_ids, reverse=True))
+
+		# Stopping early only lets the pages already submitted finish: at most 2 * workers ahead of the one read
+		before = self.server.requests["GET /pass"]
+		passes = self.service.list_all_passes(page_size=2, workers=2, stream=True)
+		next(passes)
+		passes.close()
+		requests = self.wait_for_requests("GET /pass", 0) - before
+		self.assertTrue(requests <= 1 + 1 + 2 * 2)
+		self.assertTrue(requests < 1 + (PASSES + 1) // 2)
+
+	def test_compact_passes(self):
+		listings = [list(self.service.iter_passes(page_size=10, compact=True)),
+		            self.service.list_all_passes(page_size=10, compact=True),
+		            list(self.service.list_all_passes(page_size=10, compact=True, stream=True))]
+		for listed in listings:
+			self.assertEqual([type(record) for record in listed], [PassRecord] * PASSES)
+			self.assertEqual([record.pass_id for record in listed], sorted(self.pass_ids, reverse=True))
+		record = listings[0][-1]
+		self.assertFalse(hasattr(record, "__dict__"))
+		self.assertEqual(record.template_id, self.template_id)
+		self.assertEqual(record.created_raw, self.server.passes[record.pass_id]["createdAt"])
+
+		full_pass = record.promote()
+		self.assertTrue(isinstance(full_pass, Pass))
+		self.assertEqual(full_pass.pass_id, record.pass_id)
+		self.assertEqual(full_pass.pass_fields["owner"]["value"], "owner 0")
+		self.assertEqual(full_pass.created, record.created)
+
+	def test_compact_templates(self):
+		listed = list(self.service.iter_templates(page_size=5, compact=True))
+		self.assertEqual([type(record) for record in listed], [TemplateRecord] * TEMPLATES)
+		record = listed[-1]
+		self.assertEqual(record.template_id, self.template_id)
+		self.assertFalse(hasattr(record, "__dict__"))
+
+		full_template = record.promote()
+		self.assertTrue(isinstance(full_template, Template))
+		self.assertEqual(full_template.template_id, self.template_id)
+		self.assertEqual(full_template.fields_model, self.template_fields)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import sys
+import threading
+import unittest
+
+from passtools import push
+
+import test
+
+
+class TestPushQueue(test.StandInTestCase):
+	"""
+	Coalesced push updates.
+	"""
+
+	def setUp(self):
+		super(TestPushQueue, self).setUp()
+		self.service = self.new_service()
+
+	def fill_server(self):
+		self.pass_ids = [self.server.add_pass(self.template_id) for i in xrange(5)]
+
+	def test_coalesced(self):
+		queue = self.service.open_push_queue(window=0.2)
+		futures = [self.service.schedule_push(pass_id) for i in xrange(10) for pass_id in self.pass_ids]
+		self.assertEqual(len(set(futures)), len(self.pass_ids))
+		for future in futures:
+			self.assertTrue(future.result(5))
+		self.assertEqual(self.server.requests["PUT /pass/<id>/push"], len(self.pass_ids))
+		self.assertEqual(queue.counters.snapshot(),
+		                 {"requested": 50, "coalesced": 45, "pushed": 5})
+
+		# A push requested after the previous one was sent is sent again
+		self.service.schedule_push(self.pass_ids[0]).result(5)
+		self.assertEqual(self.server.requests["PUT /pass/<id>/push"], len(self.pass_ids) + 1)
+
+	def test_close_sends_pending(self):
+		queue = self.service.open_push_queue(window=60)
+		future = self.service.schedule_push(self.pass_ids[0])
+		self.assertEqual(queue.pending(), 1)
+		self.service.close()
+		self.assertTrue(future.done())
+		self.assertEqual(self.server.requests["PUT /pass/<id>/push"], 1)
+		# A closed service does not silently open a new queue
+		self.assertRaises(RuntimeError, self.service.schedule_push, self.pass_ids[0])
+		self.assertRaises(RuntimeError, self.service.open_push_queue)
+		self.assertEqual(self.service.push_queue, None)
+
+	def test_open_queues_tracked(self):
+		# Queues are closed at exit while open, and released once closed
+		queue = self.service.open_push_queue()
+		self.assertTrue(queue in push._open_queues)
+		replacement = self.service.open_push_queue()
+		self.assertFalse(queue in push._open_queues)
+		self.assertTrue(replacement in push._open_queues)
+		self.service.close()
+		self.assertFalse(replacement in push._open_queues)
+
+	def test_default_queue_first_use(self):
+		# Threads using schedule_push() for the first time at once all get the same, open, default queue
+		errors = []
+		start = threading.Event()
+
+		def push(pass_id):
+			start.wait()
+			try:
+				self.service.schedule_push(pass_id)
+			except:
+				errors.append(sys.exc_info()[1])
+
+		threads = [threading.Thread(target=push, args=(self.pass_ids[i % 5],)) for i in xrange(50)]
+		for thread in threads:
+			thread.start()
+		start.set()
+		for thread in threads:
+			thread.join()
+		self.assertEqual(errors, [])
+		self.assertEqual(self.service.push_queue.counters.get("requested"), 50)
+		self.service.push_queue.flush()
+		self.assertEqual(self.server.requests["PUT /pass/<id>/push"], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import time
+import unittest
+
+from passtools import exceptions
+
+import test
+
+
+class TestRetries(test.StandInTestCase):
+	"""
+	Retries of throttled and failed requests, and client-side rate limiting.
+	"""
+
+	def fill_server(self):
+		self.pass_id = self.server.add_pass(self.template_id)
+
+	def new_service(self, **client_options):
+		return super(TestRetries, self).new_service(backoff_factor=0.01, **client_options)
+
+	def test_throttled(self):
+		pt_service = self.new_service()
+		self.server.retry_after = 0.3
+		self.server.fail_next(429, 2)
+		start = time.time()
+		# 429s are retried for every method, waiting as long as Retry-After asks
+		new_pass = pt_service.create_pass(self.template_id, {"owner": {"value": "retried"}})
+		self.assertTrue(time.time() - start >= 0.6)
+		self.assertEqual(new_pass.pass_fields["owner"]["value"], "retried")
+		self.assertEqual(self.server.requests["POST /pass/<id>"], 3)
+		counters = pt_service.api_client.counters.snapshot()
+		self.assertEqual((counters["throttled"], counters["retried"]), (2, 2))
+
+	def test_retries_exhausted(self):
+		pt_service = self.new_service(max_retries=2)
+		self.server.fail_next(429, 3)
+		self.assertRaises(exceptions.TooManyRequestsException, pt_service.get_pass, self.pass_id)
+		self.assertEqual(self.server.requests["GET /pass/<id>"], 3)
+
+	def test_server_errors(self):
+		pt_service = self.new_service()
+		# Retried for GET, PUT and DELETE...
+		self.server.fail_next(503)
+		self.assertEqual(pt_service.get_pass(self.pass_id).pass_id, self.pass_id)
+		self.assertEqual(self.server.requests["GET /pass/<id>"], 2)
+		# ...but not for POST, which may have been applied
+		self.server.fail_next(503)
+		self.assertRaises(exceptions.InternalServerException, pt_service.create_pass, self.template_id,
+		                  {"owner": {"value": "once"}})
+		self.assertEqual(self.server.requests["POST /pass/<id>"], 1)
+
+	def test_push_not_retried(self):
+		# A push which failed with a 5xx may still have notified devices
+		pt_service = self.new_service()
+		self.server.fail_next(503)
+		self.assertRaises(exceptions.InternalServerException, pt_service.push_pass, self.pass_id)
+		self.assertEqual(self.server.requests["PUT /pass/<id>/push"], 1)
+		# Unless it carries an idempotency key the server honours
+		api_client = self.new_service(honours_idempotency_keys=True).api_client
+		self.server.fail_next(503)
+		response_code, response_data = api_client.put("/pass/%s/push" % self.pass_id, idempotency_key="push-1")
+		self.assertEqual(response_code, 200)
+		self.assertEqual(self.server.requests["PUT /pass/<id>/push"], 3)
+
+	def test_retry_after_capped(self):
+		pt_service = self.new_service(max_backoff=0.2)
+		self.server.retry_after = 60
+		self.server.fail_next(429)
+		start = time.time()
+		self.assertEqual(pt_service.get_pass(self.pass_id).pass_id, self.pass_id)
+		self.assertTrue(time.time() - start < 1)
+
+	def test_rate_limit(self):
+		pt_service = self.new_service(rate_limit=20, burst=1)
+		start = time.time()
+		for i in xrange(11):
+			pt_service.get_pass(self.pass_id)
+		self.assertTrue(time.time() - start >= 0.45)
+		self.assertEqual(pt_service.api_client.counters.get("rate_limited"), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
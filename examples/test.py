@@ -5,9 +5,14 @@
 ##########################################
 
 
+import atexit
+import copy
+import os
 import unittest
 import logging
-from passtools import service
+from passtools import service, standin
+
+logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.CRITICAL)
 
 # API User:
 # STEP 1: You must request an API key from Tello
@@ -15,7 +20,55 @@ API_KEY = '3384f7e5-e195-4c2f-94ac-5a1c7ae37b33'
 API_VERSION = "1.0.0"
 SAVED_TEMPLATE_ID = 13743
 
+# Set PASSTOOLS_STANDIN=1 to run the examples offline, against a local stand-in for the API
+STANDIN = None
+if os.environ.get("PASSTOOLS_STANDIN"):
+	STANDIN = standin.StandInServer(api_key=API_KEY)
+	STANDIN.add_template({"fname": {"value": ""}, "lname": {"value": ""}, "offer": {"value": "10% Off"}},
+	                     name="Saved template", template_id=SAVED_TEMPLATE_ID)
+	STANDIN.start()
+	atexit.register(STANDIN.stop)
+
 class PassToolsTestCase(unittest.TestCase):
 
 	def setUp(self, *args, **kwargs):
-		self.service = service.Service(API_KEY)
\ No newline at end of file
+		if STANDIN is None:
+			self.service = service.Service(API_KEY)
+		else:
+			self.service = service.Service(API_KEY, base_url=STANDIN.base_url)
+
+
+class StandInTestCase(unittest.TestCase):
+	"""
+	Base of the tests run against a local stand-in for the API, started afresh for each test.
+
+	setUp() starts self.server (built with server_options) holding a template, self.template_id, with
+	template_fields; subclasses add what else they need in fill_server(). Services made by new_service() are
+	closed by tearDown().
+	"""
+
+	server_options = {}
+	template_fields = {"owner": {"value": ""}}
+
+	def setUp(self):
+		self.services = []
+		self.start_server()
+
+	def tearDown(self):
+		for pt_service in self.services:
+			pt_service.close()
+		self.server.stop()
+
+	def start_server(self, port=0):
+		self.server = standin.StandInServer(api_key=API_KEY, port=port, **self.server_options)
+		self.template_id = self.server.add_template(copy.deepcopy(self.template_fields))
+		self.fill_server()
+		self.server.start()
+
+	def fill_server(self):
+		pass
+
+	def new_service(self, **client_options):
+		pt_service = service.Service(API_KEY, base_url=self.server.base_url, **client_options)
+		self.services.append(pt_service)
+		return pt_service
@@ -0,0 +1,126 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import StringIO
+import sys
+import threading
+import time
+import unittest
+
+from passtools import stats
+from passtools.cache import TemplateCache
+
+import test
+
+THREADS = 200
+ROUNDS = 5
+
+
+class TestSharedService(test.StandInTestCase):
+	"""
+	One Service shared by many threads, as in a multi-threaded web server.
+	Each thread creates, reads, updates, downloads and deletes its own passes, and checks it only ever sees its own data.
+	"""
+
+	template_fields = {"owner": {"value": ""}, "offer": {"value": "10% Off"}}
+
+	def setUp(self):
+		super(TestSharedService, self).setUp()
+		self.service = self.new_service(template_cache=TemplateCache(), max_connections=20, single_flight=True)
+		self.latencies = stats.LatencyAggregator()
+		self.service.api_client.add_hook('after_response', self.latencies)
+
+	def run_thread(self, index):
+		for round in xrange(ROUNDS):
+			owner = "thread %d round %d" % (index, round)
+			template = self.service.get_template(self.template_id)
+			template.fields_model["owner"]["value"] = owner
+			new_pass = self.service.create_pass(self.template_id, template.fields_model)
+			self.created.append(new_pass.pass_id)
+
+			retrieved = self.service.get_pass(new_pass.pass_id)
+			self.assertEqual(retrieved.pass_fields["owner"]["value"], owner)
+			retrieved.pass_fields["offer"]["value"] = "%d%% Off for %s" % (index, owner)
+			updated = self.service.update_pass(retrieved.pass_id, retrieved, changed_only=True)
+			self.assertEqual(updated.pass_fields["offer"]["value"], "%d%% Off for %s" % (index, owner))
+			self.assertEqual(updated.pass_fields["owner"]["value"], owner)
+
+			self.service.list_passes(pageSize=10)
+			self.assertEqual(self.service.download_pass(StringIO.StringIO(), new_pass.pass_id), self.server.pkpass_size)
+			self.service.delete_pass(new_pass.pass_id)
+
+	def test_shared_service(self):
+		self.created = []
+		errors = []
+
+		def run(index):
+			try:
+				self.run_thread(index)
+			except:
+				errors.append(sys.exc_info())
+
+		threads = [threading.Thread(target=run, args=(i,)) for i in xrange(THREADS)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		for exc_info in errors[:1]:
+			raise exc_info[0], exc_info[1], exc_info[2]
+		self.assertEqual(len(self.created), THREADS * ROUNDS)
+		self.assertEqual(len(set(self.created)), THREADS * ROUNDS)
+		self.assertEqual(self.server.requests["POST /pass/<id>"], THREADS * ROUNDS)
+		self.assertEqual(self.server.passes, {})
+		# Every template lookup after the first is served by the shared cache (or shares its request)
+		self.assertTrue(self.server.requests["GET /template/<id>"] <= 20)
+		print "%d threads, %d passes: %s" % (THREADS, len(self.created), self.service.api_client.counters.snapshot())
+		for endpoint, summary in sorted(self.latencies.percentiles().items()):
+			print "%-28s %6d requests, p50 %.1fms, p99 %.1fms" % (endpoint, summary["count"],
+			                                                    summary["p50"] * 1000, summary["p99"] * 1000)
+
+
+class TestSingleFlight(test.StandInTestCase):
+	"""
+	Concurrent identical GETs sharing one request.
+	"""
+
+	template_fields = {"owner": {"value": "first"}}
+
+	def setUp(self):
+		super(TestSingleFlight, self).setUp()
+		self.service = self.new_service(single_flight=True)
+
+	def fill_server(self):
+		self.pass_id = self.server.add_pass(self.template_id)
+
+	def get_in_background(self):
+		# Start a GET of the pass which the server answers slowly, with the state it found on arrival
+		self.server.latency = 0.5
+		thread = threading.Thread(target=self.service.get_pass, args=(self.pass_id,))
+		thread.start()
+		while not self.server.requests.get("GET /pass/<id>"):
+			time.sleep(0.01)
+		self.server.latency = 0
+		return thread
+
+	def test_collapsed(self):
+		thread = self.get_in_background()
+		self.assertEqual(self.service.get_pass(self.pass_id).pass_fields["owner"]["value"], "first")
+		thread.join()
+		self.assertEqual(self.server.requests["GET /pass/<id>"], 1)
+		self.assertEqual(self.service.api_client.counters.get("collapsed"), 1)
+
+	def test_read_after_write(self):
+		thread = self.get_in_background()
+		updated = self.service.update_pass(self.pass_id, {"owner": {"value": "second"}})
+		self.assertEqual(updated.pass_fields["owner"]["value"], "second")
+		thread.join()
+		self.assertEqual(self.server.requests["GET /pass/<id>"], 2)
+		self.assertEqual(self.service.api_client.counters.get("collapsed"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import datetime
+import unittest
+
+from passtools import timestamps
+from passtools.pt_pass import Pass
+from passtools.template import Template
+
+import test
+
+
+class Stamped(object):
+	__slots__ = ("created_raw", "_created_parsed")
+
+	created = timestamps.LazyTimestamp("created")
+
+
+class TestTimestamps(unittest.TestCase):
+	"""
+	Parsing of API timestamps, and the lazy attributes holding them.
+	"""
+
+	def test_formats(self):
+		parse = timestamps.parse_timestamp
+		self.assertEqual(parse("2012-11-01 10:20:30.123"), datetime.datetime(2012, 11, 1, 10, 20, 30, 123000))
+		self.assertEqual(parse("2012-11-01 10:20:30.5"), datetime.datetime(2012, 11, 1, 10, 20, 30, 500000))
+		self.assertEqual(parse("2012-11-01 10:20:30.000001"), datetime.datetime(2012, 11, 1, 10, 20, 30, 1))
+		self.assertEqual(parse(u"2012-11-01 10:20:30.123"), datetime.datetime(2012, 11, 1, 10, 20, 30, 123000))
+		self.assertEqual(parse(None), None)
+		self.assertEqual(parse(""), None)
+		# Same result as strptime, which the fast path replaces
+		for value in ("1999-12-31 23:59:59.999", "2012-02-29 00:00:00.0", "2012-01-02 03:04:05.060708"):
+			self.assertEqual(parse(value), datetime.datetime.strptime(value, timestamps.TIMESTAMP_FORMAT))
+
+	def test_invalid(self):
+		for value in ("2012-02-30 10:00:00.000", "2012-11-01 10:00:00", "2012-11-01T10:00:00.000",
+		              "2012-11-01 10:00:00.1234567", "not a timestamp"):
+			self.assertRaises(ValueError, timestamps.parse_timestamp, value)
+
+	def test_lazy(self):
+		stamped = Stamped()
+		self.assertEqual(stamped.created, None)
+		stamped.created = "2012-11-01 10:20:30.123"
+		self.assertEqual(stamped.created_raw, "2012-11-01 10:20:30.123")
+		self.assertEqual(stamped._created_parsed, None)
+		created = stamped.created
+		self.assertEqual(created, datetime.datetime(2012, 11, 1, 10, 20, 30, 123000))
+		self.assertTrue(stamped.created is created)
+
+		now = datetime.datetime.now()
+		stamped.created = now
+		self.assertEqual((stamped.created_raw, stamped.created), (None, now))
+		stamped.created = None
+		self.assertEqual(stamped.created, None)
+
+	def test_raw_copied(self):
+		# Copying the raw string from another instance replaces a value already parsed
+		source, copy = Stamped(), Stamped()
+		source.created = "2012-11-01 10:20:30.123"
+		self.assertEqual(copy.created, None)
+		copy.created_raw = source.created_raw
+		self.assertEqual(copy.created, datetime.datetime(2012, 11, 1, 10, 20, 30, 123000))
+
+
+class TestCopiedTimestamps(test.StandInTestCase):
+	"""
+	Timestamps of passes and templates built by copying a fetched instance.
+	"""
+
+	def test_created(self):
+		pt_service = self.new_service()
+		new_pass = Pass(self.template_id, {"owner": {"value": "copied"}}, api_client=pt_service.api_client)
+		stored = self.server.passes[new_pass.pass_id]
+		self.assertEqual(new_pass.created, timestamps.parse_timestamp(stored["createdAt"]))
+		self.assertEqual(new_pass.updated, timestamps.parse_timestamp(stored["updatedAt"]))
+
+		template = Template(self.template_id, api_client=pt_service.api_client)
+		header = self.server.templates[self.template_id]["templateHeader"]
+		self.assertEqual(template.created, timestamps.parse_timestamp(header["createdAt"]))
+		self.assertEqual(template.updated, timestamps.parse_timestamp(header["updatedAt"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+import unittest
+
+from passtools import stats
+
+import test
+
+PASSES = 10
+
+
+class TestUpdates(test.StandInTestCase):
+	"""
+	Updates sending only the fields changed since a pass was retrieved.
+	"""
+
+	template_fields = {"owner": {"value": ""}, "offer": {"value": "10% Off"}, "lines": {"value": [{"text": "first"}]}}
+
+	def setUp(self):
+		super(TestUpdates, self).setUp()
+		self.service = self.new_service()
+
+	def fill_server(self):
+		self.pass_ids = [self.server.add_pass(self.template_id) for i in xrange(PASSES)]
+
+	def test_changed_fields(self):
+		retrieved = self.service.get_pass(self.pass_ids[0])
+		self.assertEqual(retrieved.changed_fields(), {})
+		retrieved.pass_fields["offer"]["value"] = "20% Off"
+		# A change within a list of a field is seen too: the snapshot taken on load is a deep copy
+		retrieved.pass_fields["lines"]["value"][0]["text"] = "second"
+		changed = {"offer": {"value": "20% Off"}, "lines": {"value": [{"text": "second"}]}}
+		self.assertEqual(retrieved.changed_fields(), changed)
+
+		self.service.update_pass(retrieved.pass_id, retrieved, refetch=False, changed_only=True)
+		self.assertEqual(self.server.updates, [(retrieved.pass_id, changed)])
+		self.assertEqual(self.server.passes[retrieved.pass_id]["passFields"]["owner"], {"value": ""})
+
+		# Sent changes are no longer changes
+		self.assertEqual(retrieved.changed_fields(), {})
+		self.assertEqual(self.service.update_pass(retrieved.pass_id, retrieved, changed_only=True), None)
+		self.assertEqual(self.server.requests["PUT /pass/<id>"], 1)
+
+	def test_skip_unchanged(self):
+		passes = [self.service.get_pass(pass_id) for pass_id in self.pass_ids]
+		for changed in passes[:3]:
+			changed.pass_fields["owner"]["value"] = "owner %d" % changed.pass_id
+		update_stats = stats.UpdateStats()
+		results = dict(self.service.update_passes(passes, update_stats=update_stats))
+		self.assertEqual(sorted(pass_id for pass_id, result in results.items() if result is not None),
+		                 sorted(self.pass_ids[:3]))
+		self.assertEqual((update_stats.completed, update_stats.skipped, update_stats.failed), (PASSES, PASSES - 3, 0))
+		self.assertEqual(sorted(self.server.updates),
+		                 sorted((pass_id, {"owner": {"value": "owner %d" % pass_id}}) for pass_id in self.pass_ids[:3]))
+
+	def test_body_reused(self):
+		# The same change, as tuples and as changed passes, is encoded once
+		offer = {"offer": {"value": "50% Off"}}
+		updates = [(pass_id, offer) for pass_id in self.pass_ids[:5]]
+		for pass_id in self.pass_ids[5:]:
+			retrieved = self.service.get_pass(pass_id)
+			retrieved.pass_fields["offer"]["value"] = "50% Off"
+			updates.append(retrieved)
+		update_stats = stats.UpdateStats()
+		list(self.service.update_passes(updates, update_stats=update_stats))
+		self.assertEqual(update_stats.bodies, 1)
+		self.assertEqual(update_stats.bytes, PASSES * len(self.service.api_client.codec.dumps(offer)))
+		self.assertEqual(sorted(self.server.updates), sorted((pass_id, offer) for pass_id in self.pass_ids))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -41,7 +41,7 @@ class TestUserPasses(test.PassToolsTestCase):
 		for user_record in user_db:
 		    self.template.fields_model["fname"]["value"] = user_record["first_name"]
 		    self.template.fields_model["lname"]["value"] = user_record["last_name"]
-		    new_pass = pt_pass.Pass(selected_template_id, self.template.fields_model)
+		    new_pass = pt_pass.Pass(selected_template_id, self.template.fields_model, api_client=self.service.api_client)
 		    new_pass.download("/tmp/%s_%s.pkpass" % (user_record["first_name"], user_record["last_name"]))
 
 		# Now distribute the passes to your users!
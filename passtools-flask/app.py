@@ -7,12 +7,19 @@ except ImportError:
     import json
 
 import passtools
+from passtools.cache import TemplateCache
 
 
 app = flask.Flask(__name__)
 
 API_KEY = '3384f7e5-e195-4c2f-94ac-5a1c7ae37b33'
 
+# Shared across requests, so issuing passes doesn't re-fetch the same template every time
+TEMPLATE_CACHE = TemplateCache()
+
+# One Service (and so one connection pool) for all requests; it is safe to share between threads
+PT_SERVICE = passtools.Service(API_KEY, template_cache=TEMPLATE_CACHE)
+
 """
 	Template Views 
 """
@@ -20,21 +27,18 @@ API_KEY = '3384f7e5-e195-4c2f-94ac-5a1c7ae37b33'
 @app.route('/')
 def templates():
 	context = { 'page': 'templates' }
-	pt_service = passtools.Service(API_KEY)
-	context['templates'] = pt_service.list_templates()
+	context['templates'] = PT_SERVICE.list_templates()
 	return flask.render_template('templates.html', **context)
 
 @app.route('/template/<int:template_id>')
 def template(template_id):
 	context = { 'page': 'template' }
-	pt_service = passtools.Service(API_KEY)
-	context['template'] = pt_service.get_template(template_id)
+	context['template'] = PT_SERVICE.get_template(template_id)
 	return flask.render_template('template.html', **context)
 
 @app.route('/template/<int:template_id>/delete')
 def delete_template(template_id):
-	pt_service = passtools.Service(API_KEY)
-	pt_service.delete_template(template_id)
+	PT_SERVICE.delete_template(template_id)
 	return flask.redirect('/')
 
 
@@ -45,37 +49,32 @@ def delete_template(template_id):
 @app.route('/passes')
 def passes():
 	context = { 'page': 'passes' }
-	pt_service = passtools.Service(API_KEY)
-	context['passes']  = pt_service.list_passes()
-	context['api_key'] = pt_service.api_client.api_key
+	context['passes']  = PT_SERVICE.list_passes()
+	context['api_key'] = PT_SERVICE.api_client.api_key
 	return flask.render_template('passes.html', **context)
 
 @app.route('/pass/<int:pass_id>')
 def pt_pass(pass_id):
 	context = { 'page': 'pass' }
-	pt_service = passtools.Service(API_KEY)
-	context['pt_pass'] = pt_service.get_pass(pass_id)
+	context['pt_pass'] = PT_SERVICE.get_pass(pass_id)
 	return flask.render_template('pass.html', **context)
 
 @app.route('/template/<int:template_id>/pass')
 def create_pass(template_id):
-	pt_service = passtools.Service(API_KEY)
-	pass_template = pt_service.get_template(template_id) # TODO: this shouldn't be necessary
-	new_pass  = pt_service.create_pass(template_id, template_fields_model=pass_template.fields_model)
+	pass_template = PT_SERVICE.get_template(template_id) # TODO: this shouldn't be necessary
+	new_pass  = PT_SERVICE.create_pass(template_id, template_fields_model=pass_template.fields_model)
 	return flask.redirect('/pass/%s' % new_pass.pass_id)	
 
 @app.route('/pass/<int:pass_id>/update')
 def update_pass(pass_id):
-	pt_service = passtools.Service(API_KEY)
 	update_fields = json.loads(flask.request.args.get('fields'))
-	pt_service.update_pass(pass_id, update_fields)
-	pt_service.push_pass(pass_id)
+	PT_SERVICE.update_pass(pass_id, update_fields, refetch=False)
+	PT_SERVICE.push_pass(pass_id)
 	return flask.redirect('/pass/%s' % pass_id)	
 
 @app.route('/pass/<int:pass_id>/delete')
 def delete_pass(pass_id):
-	pt_service = passtools.Service(API_KEY)
-	pt_service.delete_pass(pass_id)
+	PT_SERVICE.delete_pass(pass_id)
 	return flask.redirect('/')	
 
 
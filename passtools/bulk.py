@@ -0,0 +1,216 @@
+##########################################
+# bulk.py
+#
+# Process-pool bulk runner
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Bulk pass creation on a pool of processes.
+
+Service.create_passes() runs creates on threads, which is enough while the time goes to waiting on the API.
+When building the field models and encoding them takes a good share of the CPU, threads queue up behind
+the GIL; ProcessRunner instead shards the input over a pool of processes, each with its own
+client.PassToolsClient (and so its own keep-alive connections) and its own threads for concurrent requests.
+
+"""
+
+import collections
+import logging
+import multiprocessing
+import pickle
+import Queue
+
+from client import PassToolsClient
+from pt_pass import PassRecord
+import exceptions
+import stats
+import workers
+
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_CHUNK_SIZE = 50
+
+# Pass attributes sent back from the processes; the rest of the pass stays there
+_RECORD_KEYS = ("id", "templateId", "url", "createdAt", "updatedAt")
+
+# Set up in each process of the pool by _init_process()
+_process = {}
+
+
+def _init_process(api_key, client_options, concurrency, prepare):
+    _process["client"] = PassToolsClient(api_key=api_key, **client_options)
+    _process["pool"] = workers.WorkerPool(concurrency) if concurrency > 1 else None
+    _process["prepare"] = prepare
+
+
+def _picklable(error):
+    # Errors go back to the parent process; one that can't be pickled is sent as a PassToolsException
+    try:
+        pickle.dumps(error, pickle.HIGHEST_PROTOCOL)
+        return error
+    except Exception:
+        return exceptions.PassToolsException("%s: %s" % (type(error).__name__, error))
+
+
+def _create(item):
+    index, value = item
+    api_client = _process["client"]
+    try:
+        if _process["prepare"] is not None:
+            value = _process["prepare"](value)
+        template_id, template_fields_model = value
+        if template_id is None:
+            raise exceptions.InvalidParameterException("ProcessRunner.create_passes() called with an item without template_id")
+        response_code, response_data = api_client.post("/pass/%s" % (str(template_id)),
+                                                       {"json": api_client.codec.dumps(template_fields_model)})
+        if response_code != 200:
+            return index, None
+        pass_dict = api_client.codec.loads(response_data)
+        return index, dict((key, pass_dict.get(key)) for key in _RECORD_KEYS)
+    except Exception, e:
+        return index, _picklable(e)
+
+
+def _create_chunk(chunk):
+    pool = _process["pool"]
+    if pool is None or len(chunk) == 1:
+        return [_create(item) for item in chunk]
+    return pool.map(_create, chunk)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ProcessRunner(object):
+    """
+    Creates passes in bulk on a pool of processes.
+
+    Input items are sent to the processes in chunks of chunk_size; each process runs the creates of a chunk
+    on 'concurrency' threads, so at most processes * concurrency requests are in flight. Only a few chunks
+    per process are handed out ahead, so input is consumed lazily.
+
+    The processes are started when the runner is created: create it before starting threads of your own,
+    and close() it (or use it as a context manager) when done.
+    """
+
+    def __init__(self, api_key=None, processes=None, concurrency=DEFAULT_CONCURRENCY, chunk_size=DEFAULT_CHUNK_SIZE,
+                 prepare=None, **client_options):
+        """
+        @type api_key: string
+        @param api_key: Passtools API Key
+        @type processes: int
+        @param processes: Number of processes [Optional; Default = number of CPUs]
+        @type concurrency: int
+        @param concurrency: Number of concurrent creates in each process [Optional; Default = 4]
+        @type chunk_size: int
+        @param chunk_size: Number of items sent to a process at a time [Optional; Default = 50]
+        @type prepare: callable
+        @param prepare: Module-level function run in the processes on each input item, returning the
+                        (template_id, template_fields_model) to create it from; use it to move the work of
+                        building field models off the calling process [Optional]
+        @type client_options: kwargs
+        @param client_options: Settings passed to the client.PassToolsClient of each process [Optional]
+        @return: None
+        """
+        self.processes = processes or multiprocessing.cpu_count()
+        self.chunk_size = chunk_size
+        self.__pool = multiprocessing.Pool(self.processes, _init_process,
+                                           (api_key, client_options, concurrency, prepare))
+        # Client of the calling process, given to the returned records for PassRecord.promote()
+        self.api_client = PassToolsClient(api_key=api_key, **client_options)
+
+    def create_passes(self, items, ordered=False, bulk_stats=None, errors=None):
+        """
+        Create a pass for every input item.
+
+        API call used is v1/pass/<template_id> (POST)
+
+        @type items: iterable
+        @param items: (template_id, template_fields_model) tuples, or whatever 'prepare' turns into them
+        @type ordered: bool
+        @param ordered: Yield results in input order, rather than as soon as each chunk completes [Optional; Default = False]
+        @type bulk_stats: stats.BulkStats
+        @param bulk_stats: Updated with progress and throughput as results arrive [Optional]
+        @type errors: stats.ErrorSummary
+        @param errors: Failures are added to it, grouped by cause [Optional]
+        @return: Generator of (index, result) tuples, where index is the 0-based position of the input and
+                 result is a pt_pass.PassRecord of the new pass, or the exception raised for it
+        """
+        if bulk_stats is None:
+            bulk_stats = stats.BulkStats()
+        if errors is None:
+            errors = stats.ErrorSummary()
+        window = 2 * self.processes
+        pending = collections.deque()
+        completed = Queue.Queue()
+        try:
+            for chunk in _chunks(enumerate(items), self.chunk_size):
+                if len(pending) >= window:
+                    for result in self.__next_results(pending, ordered, completed, bulk_stats, errors):
+                        yield result
+                pending.append(self.__pool.apply_async(_create_chunk, (chunk,),
+                                                       callback=None if ordered else lambda results: completed.put(None)))
+            while pending:
+                for result in self.__next_results(pending, ordered, completed, bulk_stats, errors):
+                    yield result
+        finally:
+            bulk_stats.finish()
+            logging.info("ProcessRunner.create_passes: %s", bulk_stats)
+            if len(errors):
+                logging.info("ProcessRunner.create_passes errors:\n%s", errors)
+
+    def __next_results(self, pending, ordered, completed, bulk_stats, errors):
+        # Wait for the next chunk to finish (the oldest one, if ordered) and return its results
+        if ordered:
+            async_result = pending.popleft()
+        else:
+            while not any(async_result.ready() for async_result in pending):
+                try:
+                    completed.get(timeout=1)
+                except Queue.Empty:
+                    pass
+            async_result = next(async_result for async_result in pending if async_result.ready())
+            pending.remove(async_result)
+        results = []
+        for index, outcome in async_result.get():
+            if isinstance(outcome, Exception):
+                bulk_stats.add(failed=1)
+                errors.add(index, outcome)
+            else:
+                bulk_stats.add(completed=1)
+                if outcome is not None:
+                    outcome = PassRecord(outcome, api_client=self.api_client)
+            results.append((index, outcome))
+        return results
+
+    def close(self):
+        """
+        Wait for the processes to finish their work, then stop them.
+        """
+        self.__pool.close()
+        self.__pool.join()
+
+    def terminate(self):
+        """
+        Stop the processes at once, abandoning work in progress.
+        """
+        self.__pool.terminate()
+        self.__pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
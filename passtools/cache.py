@@ -0,0 +1,190 @@
+##########################################
+# cache.py
+#
+# In-process caches
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Caches used to avoid re-fetching unchanged PassTools objects.
+
+"""
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import collections
+import copy
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+import stats
+
+
+class TemplateCache(object):
+    """
+    Thread-safe LRU cache of templates keyed by template id.
+
+    Holds at most max_size templates, each for at most ttl seconds. Templates are copied on the way in
+    and on the way out, so callers can freely modify the fields_model of the template they get back
+    without affecting the cached copy.
+
+    Counts of 'hits', 'misses', 'evictions' (dropped for size) and 'expirations' (dropped for age)
+    are kept in the 'counters' attribute.
+    """
+
+    def __init__(self, max_size=128, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.counters = stats.Counters()
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, template_id):
+        """
+        @type template_id: int
+        @param template_id: ID of the desired template
+        @return: Copy of the cached template.Template instance, or None
+        """
+        key = int(template_id)
+        with self.__lock:
+            entry = self.__entries.pop(key, None)
+            if entry is not None and entry[0] < time.time():
+                self.counters.increment("expirations")
+                entry = None
+            if entry is None:
+                self.counters.increment("misses")
+                return None
+            # Re-insert to mark as most recently used
+            self.__entries[key] = entry
+            self.counters.increment("hits")
+        return copy.deepcopy(entry[1])
+
+    def set(self, template_id, template):
+        """
+        Cache a copy of template under template_id, evicting the least recently used template if full.
+        """
+        entry = (time.time() + self.ttl, copy.deepcopy(template))
+        key = int(template_id)
+        with self.__lock:
+            self.__entries.pop(key, None)
+            self.__entries[key] = entry
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.counters.increment("evictions")
+
+    def invalidate(self, template_id=None):
+        """
+        Drop template_id from the cache, or every template if template_id is None.
+        """
+        with self.__lock:
+            if template_id is None:
+                self.__entries.clear()
+            else:
+                self.__entries.pop(int(template_id), None)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def stats(self):
+        """
+        @return: Dict of hits, misses, evictions, expirations and current size
+        """
+        counts = self.counters.snapshot()
+        result = dict((name, counts.get(name, 0)) for name in ("hits", "misses", "evictions", "expirations"))
+        result["size"] = len(self)
+        return result
+
+
+class MemoryResponseCache(object):
+    """
+    In-process store of GET responses and their validators (ETag / Last-Modified), for use as
+    PassToolsClient.response_cache. Holds at most max_size responses, dropping the least recently used.
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, url):
+        """
+        @type url: str
+        @param url: Full request URL
+        @return: Tuple of (etag, last_modified, body), or None
+        """
+        with self.__lock:
+            entry = self.__entries.pop(url, None)
+            if entry is not None:
+                self.__entries[url] = entry
+            return entry
+
+    def set(self, url, etag, last_modified, body):
+        with self.__lock:
+            self.__entries.pop(url, None)
+            self.__entries[url] = (etag, last_modified, body)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def delete(self, url):
+        with self.__lock:
+            self.__entries.pop(url, None)
+
+
+class FileResponseCache(object):
+    """
+    On-disk store of GET responses and their validators (ETag / Last-Modified), for use as
+    PassToolsClient.response_cache. Several processes may share the same directory: entries are
+    written to a temporary file and renamed into place, so readers never see a partial entry.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __path(self, url):
+        # The URL includes the api_key, so it is hashed rather than used as a file name
+        return os.path.join(self.directory, hashlib.sha1(url).hexdigest())
+
+    def get(self, url):
+        """
+        @type url: str
+        @param url: Full request URL
+        @return: Tuple of (etag, last_modified, body), or None
+        """
+        try:
+            fh = open(self.__path(url), "rb")
+        except IOError:
+            return None
+        try:
+            validators = json.loads(fh.readline())
+            body = fh.read()
+        except ValueError:
+            return None
+        finally:
+            fh.close()
+        return validators.get("etag"), validators.get("last_modified"), body
+
+    def set(self, url, etag, last_modified, body):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            fh = os.fdopen(fd, "wb")
+            fh.write(json.dumps({"etag": etag, "last_modified": last_modified}) + "\n")
+            fh.write(body)
+            fh.close()
+            os.rename(temp_path, self.__path(url))
+        except:
+            os.remove(temp_path)
+            raise
+
+    def delete(self, url):
+        try:
+            os.remove(self.__path(url))
+        except OSError:
+            pass
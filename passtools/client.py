@@ -16,15 +16,65 @@ try:
 except ImportError:
     import json
 
-import copy
+import email.utils
+import errno
+import httplib
 import logging
+import os
+import random
+import re
+import socket
+import tempfile
+import threading
+import time
 import urllib
 import urllib2
+import urlparse
 
+import connection
 import exceptions
+import jsoncodec
+import ratelimit
+import stats
+import workers
 
 
 BASE_URL = 'https://api.passtools.com/v1'
+USER_AGENT = 'PassTools-Python/1.0.1'
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_MAX_BACKOFF = 30.0
+# Server errors are only retried for methods which are safe to repeat; 429s are always retried
+IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+# ...except for pushes, PUTs which notify devices: repeating one that failed after being sent could notify twice
+NOT_RETRIED_PATH = re.compile(r'^/pass/[^/]+/push$')
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+DOWNLOAD_CHUNK_SIZE = 65536
+HOOK_EVENTS = ('before_request', 'after_response', 'on_error')
+FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded', 'Accept': '*/*'}
+
+
+def make_temp_file(directory, suffix='.part'):
+    """
+    Create a new file in directory, open for writing. Unlike tempfile.mkstemp, which makes files readable by
+    their owner only, it gets the mode open() would give it, 0666 less the process umask.
+
+    @type directory: str
+    @param directory: Directory to create the file in
+    @type suffix: str
+    @param suffix: End of the file name [Optional; Default = .part]
+    @return: Tuple of (file descriptor, path)
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    for attempt in xrange(tempfile.TMP_MAX):
+        path = os.path.join(directory, "tmp%s%s" % (os.urandom(6).encode('hex'), suffix))
+        try:
+            return os.open(path, flags, 0666), path
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+    raise IOError(errno.EEXIST, "No usable temporary file name found in %s" % directory)
 
 #########################
 # CLASS PassToolsClient
@@ -33,8 +83,147 @@ BASE_URL = 'https://api.passtools.com/v1'
 #########################
 class PassToolsClient(object):
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, base_url=None, max_connections=connection.DEFAULT_MAX_CONNECTIONS,
+                 idle_timeout=connection.DEFAULT_IDLE_TIMEOUT, timeout=None, rate_limit=None, burst=None,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 max_backoff=DEFAULT_MAX_BACKOFF, response_cache=None, trace=False, codec=None, single_flight=False,
+                 honours_idempotency_keys=False, ssl_context=None):
+        """
+        Init new PassToolsClient instance.
+        Requests made through the client share a pool of keep-alive connections and a rate limiter.
+        A client is safe to share between threads, and meant to be: create one per process and reuse it.
+        Its settings are fixed at construction, all state shared by requests (connection pool, rate limiter,
+        counters, hooks, response cache) is locked, and nothing about a request is stored on the client.
+
+        Responses with status 429 (and 5xx, for GET/PUT/DELETE other than pushes, and for POSTs and pushes with an
+        idempotency_key if honours_idempotency_keys) are retried up to max_retries times, waiting backoff_factor *
+        2^attempt seconds with random jitter, or as long as the Retry-After header asks, up to max_backoff.
+        A 429 holds back every thread using the client until the wait is over.
+        If a response_cache is given (see cache.MemoryResponseCache and cache.FileResponseCache), GET responses
+        carrying an ETag or Last-Modified header are stored, and later GETs of the same URL are sent as
+        conditional requests; a 304 (Not Modified) answer is served from the cache.
+        With single_flight, a GET issued while an identical GET (same URL and parameters) is in flight waits for
+        that request and shares its response, or its exception, instead of being sent. A GET never shares a
+        request sent before a PUT, POST or DELETE made through the client completed, so reads following a
+        write through the client see it.
+
+        Counts of 'throttled' (answered 429), 'retried', 'rate_limited' (held back by rate_limit or a 429 pause),
+        'not_modified' (served from response_cache) and 'collapsed' (answered by another in-flight GET) requests
+        are kept in the 'counters' attribute.
+
+        Functions registered with add_hook() are called with a stats.RequestEvent before each request is sent
+        ('before_request'), when its response arrives ('after_response') and when it fails ('on_error').
+
+        Request and response bodies are only logged (at DEBUG level) when debug logging is enabled. With trace,
+        bodies are never logged; instead one INFO line per request records its method, path, status, payload
+        sizes and timings.
+
+        @type api_key: string
+        @param api_key: Passtools API Key
+        @type base_url: str
+        @param base_url: URL prepended to request paths [Optional; Default = BASE_URL]
+        @type max_connections: int
+        @param max_connections: Maximum number of open connections per host [Optional; Default = 10]
+        @type idle_timeout: int
+        @param idle_timeout: Seconds an idle connection is kept for reuse [Optional; Default = 60]
+        @type timeout: float
+        @param timeout: Socket timeout in seconds [Optional; Default = system default]
+        @type rate_limit: float
+        @param rate_limit: Maximum average requests per second [Optional; Default = unlimited]
+        @type burst: int
+        @param burst: Maximum requests sent back-to-back under rate_limit [Optional; Default = rate_limit]
+        @type max_retries: int
+        @param max_retries: Maximum retries of a throttled or failed request [Optional; Default = 3]
+        @type backoff_factor: float
+        @param backoff_factor: Base delay in seconds between retries [Optional; Default = 0.5]
+        @type max_backoff: float
+        @param max_backoff: Maximum delay in seconds between retries, also capping Retry-After [Optional;
+                            Default = 30]
+        @type response_cache: cache.MemoryResponseCache or cache.FileResponseCache
+        @param response_cache: Store of GET responses revalidated with conditional requests [Optional]
+        @type trace: bool
+        @param trace: Log a summary of each request instead of its payloads [Optional; Default = False]
+        @type codec: jsoncodec.JSONCodec or jsoncodec.UJSONCodec
+        @param codec: JSON codec used for requests and responses [Optional; Default = jsoncodec.JSONCodec()]
+        @type single_flight: bool
+        @param single_flight: Share one request between concurrent identical GETs [Optional; Default = False]
+        @type honours_idempotency_keys: bool
+        @param honours_idempotency_keys: The server answers a repeated Idempotency-Key with the outcome of the
+                                         first request, so POSTs carrying one can be retried on 5xx. The
+                                         PassTools API does not document such support [Optional; Default = False]
+        @type ssl_context: ssl.SSLContext
+        @param ssl_context: Settings of HTTPS connections, e.g. to trust a private CA [Optional; Default = ssl
+                            module defaults]
+        @return: None
+        """
         self.api_key = api_key
+        self.base_url = base_url or BASE_URL
+        self.__base_path = urlparse.urlsplit(self.base_url).path
+        self.pool_manager = connection.PoolManager(max_connections=max_connections,
+                                                   idle_timeout=idle_timeout,
+                                                   timeout=timeout,
+                                                   ssl_context=ssl_context)
+        self.rate_limiter = ratelimit.TokenBucket(rate_limit, burst)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.response_cache = response_cache
+        self.codec = codec or jsoncodec.get_codec()
+        self.counters = stats.Counters()
+        self.single_flight = workers.SingleFlight() if single_flight else None
+        self.honours_idempotency_keys = honours_idempotency_keys
+        # Number of PUT/POST/DELETE requests completed; GETs only share requests started since the last one
+        self.__writes = 0
+        self.__writes_lock = threading.Lock()
+        self.hooks = dict((event_name, ()) for event_name in HOOK_EVENTS)
+        self.__hooks_lock = threading.Lock()
+        self.trace = trace
+        if trace:
+            self.add_hook('after_response', stats.log_request)
+            self.add_hook('on_error', stats.log_request)
+
+    def add_hook(self, event_name, hook):
+        """
+        Register a function to be called with a stats.RequestEvent for every request.
+        Exceptions raised by hooks are logged and otherwise ignored.
+
+        @type event_name: str
+        @param event_name: One of 'before_request', 'after_response', 'on_error'
+        @type hook: callable
+        @param hook: Function taking a stats.RequestEvent, e.g. a stats.LatencyAggregator
+        @return: None
+        """
+        if event_name not in self.hooks:
+            raise exceptions.InvalidParameterException("Unknown hook event: %s" % event_name)
+        # Replace rather than modify the tuple, so that requests in flight keep iterating over a stable one
+        with self.__hooks_lock:
+            self.hooks[event_name] += (hook,)
+
+    def remove_hook(self, event_name, hook):
+        with self.__hooks_lock:
+            hooks = list(self.hooks[event_name])
+            hooks.remove(hook)
+            self.hooks[event_name] = tuple(hooks)
+
+    def __log_payloads(self):
+        return not self.trace and logging.getLogger().isEnabledFor(logging.DEBUG)
+
+    def __fire(self, event_name, event):
+        for hook in self.hooks[event_name]:
+            try:
+                hook(event)
+            except Exception:
+                logging.exception("PassToolsClient %s hook failed", event_name)
+
+    def __deepcopy__(self, memo):
+        # The client (and its connection pool) is shared, never copied along with passes and templates
+        return self
+
+    def close(self):
+        """
+        Close all idle pooled connections.
+        """
+        self.pool_manager.close()
 
     def get_json(self, path, **kwargs):
         """
@@ -51,16 +240,44 @@ class PassToolsClient(object):
         kwargs['api_key'] = self.api_key
 
         # Assemble request url
-        request_url = "%s%s?%s" % (BASE_URL, path, urllib.urlencode(kwargs))
+        request_url = "%s%s?%s" % (self.base_url, path, urllib.urlencode(kwargs))
+
+        if self.single_flight is None:
+            return self.__get_url(request_url)
+        future, shared = self.single_flight.do((request_url, self.__writes), self.__get_url, request_url)
+        if shared:
+            self.counters.increment("collapsed")
+        return future.result()
+
+    def __get_url(self, request_url):
+        # Revalidate any cached response instead of fetching it again
+        headers = {}
+        cached = None
+        if self.response_cache is not None:
+            cached = self.response_cache.get(request_url)
+            if cached is not None:
+                etag, last_modified, cached_data = cached
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
 
         # create request
-        req = urllib2.Request(request_url)
-        logging.debug("PassToolsClient request_url: %s" % request_url)
+        req = urllib2.Request(request_url, headers=headers)
+        logging.debug("PassToolsClient request_url: %s", request_url)
 
         # and make the request
-        response_code, response_data = self.__run_request(req)
-        if response_code == 200:
-            logging.debug("PassToolsClient response:\n%s" % (response_data))
+        response_code, response_data, response_headers = self.__send(req)
+        if response_code == 304 and cached is not None:
+            self.counters.increment("not_modified")
+            response_code, response_data = 200, cached_data
+        elif response_code == 200 and self.response_cache is not None:
+            etag = response_headers.get('etag')
+            last_modified = response_headers.get('last-modified')
+            if etag or last_modified:
+                self.response_cache.set(request_url, etag, last_modified, response_data)
+        if response_code == 200 and self.__log_payloads():
+            logging.debug("PassToolsClient response:\n%s", response_data)
 
         return response_code, response_data
 
@@ -76,10 +293,10 @@ class PassToolsClient(object):
         """
         response_code, response_data = self.get_json(request_url, **kwargs)
         if response_code == 200:
-            response_data = json.loads(response_data, encoding="ISO-8859-1")
+            response_data = self.codec.loads(response_data)
         return response_code, response_data
 
-    def post(self, path, kwargs):
+    def post(self, path, kwargs, idempotency_key=None):
         """
         Make an HTTP POST request of specified URL
 
@@ -87,33 +304,31 @@ class PassToolsClient(object):
         @param path: target URL (base_url will be prepended)
         @type kwargs: kwargs
         @param kwargs: any desired URL parameters
+        @type idempotency_key: str
+        @param idempotency_key: Sent as the Idempotency-Key header, telling a server that honours it that
+                                repeats of the request are one request. With honours_idempotency_keys,
+                                the request is also retried on 5xx like GET/PUT/DELETE [Optional]
         @return: HTTP request status code and response data as json.
         """
         # Assemble request url
-        request_url = "%s%s" % (BASE_URL, path)
-
-        kwargs = copy.deepcopy(kwargs)
-        # Append api_key to request
-        self.__api_key_check()
-        kwargs["api_key"] = self.api_key
-
-        # Format the input data
-        encoded_kwargs = urllib.urlencode(kwargs)
-        logging.debug("encoded kwargs: %s" % encoded_kwargs)
+        request_url = "%s%s" % (self.base_url, path)
 
-        # Prepare headers
-        headers = {}
-        headers['Content-Type'] = 'application/x-www-form-urlencoded'
-        headers['Accept'] = '*/*'
+        # Format the input data, with api_key appended
+        encoded_kwargs = self.__encode_form(kwargs)
+        if self.__log_payloads():
+            logging.debug("encoded kwargs: %s", encoded_kwargs)
 
         # create a request
+        headers = FORM_HEADERS
+        if idempotency_key is not None:
+            headers = dict(FORM_HEADERS, **{IDEMPOTENCY_HEADER: idempotency_key})
         req = urllib2.Request(request_url, encoded_kwargs, headers=headers)
-        logging.debug("pt_post request_url: %s" % request_url)
+        logging.debug("pt_post request_url: %s", request_url)
 
         # and make the request
         response_code, response_data = self.__run_request(req)
-        if response_code == 200:
-            logging.debug("pt_post response:\n%s" % (response_data))
+        if response_code == 200 and self.__log_payloads():
+            logging.debug("pt_post response:\n%s", response_data)
 
         return response_code, response_data
 
@@ -129,10 +344,10 @@ class PassToolsClient(object):
         """
         response_code, response_data = self.post_json(request_url, kwargs)
         if response_code == 200:
-            response_data = json.loads(response_data, encoding="ISO-8859-1")
+            response_data = self.codec.loads(response_data)
         return response_code, response_data
 
-    def put(self, path, kwargs = {}):
+    def put(self, path, kwargs = {}, idempotency_key=None):
         """
         Make an HTTP PUT request of specified URL
 
@@ -140,30 +355,26 @@ class PassToolsClient(object):
         @param path: target URL (base_url will be prepended)
         @type kwargs: kwargs
         @param kwargs: any desired URL parameters
+        @type idempotency_key: str
+        @param idempotency_key: Sent as the Idempotency-Key header (see post). With honours_idempotency_keys,
+                                a push is then retried on 5xx like other PUTs [Optional]
         @return: HTTP request status code and response data as json.
         """
         # Assemble request url
-        request_url = "%s%s" % (BASE_URL, path)
-
-
-        kwargs = copy.deepcopy(kwargs)
-        # Append api_key to request
-        self.__api_key_check()
-        kwargs["api_key"] = self.api_key
-
-        # Format the input data
-        encoded_kwargs = urllib.urlencode(kwargs)
-        logging.debug("encoded kwargs: %s" % encoded_kwargs)
+        request_url = "%s%s" % (self.base_url, path)
 
-        # Prepare headers
-        headers = {}
-        headers['Content-Type'] = 'application/x-www-form-urlencoded'
-        headers['Accept'] = '*/*'
+        # Format the input data, with api_key appended
+        encoded_kwargs = self.__encode_form(kwargs)
+        if self.__log_payloads():
+            logging.debug("encoded kwargs: %s", encoded_kwargs)
 
         # create a request
+        headers = FORM_HEADERS
+        if idempotency_key is not None:
+            headers = dict(FORM_HEADERS, **{IDEMPOTENCY_HEADER: idempotency_key})
         req = urllib2.Request(request_url, encoded_kwargs, headers=headers)
         req.get_method = lambda: 'PUT'
-        logging.debug("pt_put request_url: %s" % request_url)
+        logging.debug("pt_put request_url: %s", request_url)
 
         # and make the request
         response_code, response_data = self.__run_request(req)
@@ -181,10 +392,12 @@ class PassToolsClient(object):
         @return: HTTP request status code and response data as python dict.
         """
         response_code, response_data = self.put(request_url, kwargs)
+        response_data_json = None
         if response_code == 200:
-            response_data_json = json.loads(response_data, encoding="ISO-8859-1")
-            logging.debug("pt_put response:\n%s" %
-                             json.dumps(response_data, sort_keys = True, indent = 2))
+            response_data_json = self.codec.loads(response_data)
+            if self.__log_payloads():
+                logging.debug("pt_put response:\n%s",
+                              json.dumps(response_data_json, sort_keys = True, indent = 2))
         return response_code, response_data_json
 
     def delete(self, path, kwargs):
@@ -198,7 +411,7 @@ class PassToolsClient(object):
         @return: HTTP request status code and response data as json.
         """
         # Assemble request url
-        request_url = "%s%s?api_key=%s" % (BASE_URL, path, self.api_key)
+        request_url = "%s%s?api_key=%s" % (self.base_url, path, self.api_key)
 
         # Append any request data
         for keyName in kwargs:
@@ -212,7 +425,7 @@ class PassToolsClient(object):
         # create a request
         req = urllib2.Request(request_url)
         req.get_method = lambda: 'DELETE'
-        logging.debug("pt_put request_url: %s" % request_url)
+        logging.debug("pt_put request_url: %s", request_url)
 
         # and make the request
         response_code, response_data = self.__run_request(req)
@@ -230,13 +443,90 @@ class PassToolsClient(object):
         @return: HTTP request status code and response data as python dict.
         """
         response_code, response_data = self.delete(request_url, kwargs)
+        response_data_json = None
         if response_code == 200:
-            response_data_json = json.loads(response_data, encoding="ISO-8859-1")
-            logging.debug("pt_delete response:\n%s" %
-                             json.dumps(response_data, sort_keys = True, indent = 2))
+            response_data_json = self.codec.loads(response_data)
+            if self.__log_payloads():
+                logging.debug("pt_delete response:\n%s",
+                              json.dumps(response_data_json, sort_keys = True, indent = 2))
         return response_code, response_data_json
 
 
+    def download(self, path, destination, chunk_size=DOWNLOAD_CHUNK_SIZE, headers=None, **kwargs):
+        """
+        Make an HTTP GET request of specified URL, streaming the response body to destination
+        in chunks of chunk_size bytes, so that at most one chunk is held in memory.
+
+        If destination is a file path, the body is written to a temporary file in the same directory
+        which is renamed to destination once complete, so destination never holds a partial file.
+        Otherwise destination may be any object with a write() method (for a socket, use socket.makefile('wb')).
+
+        @type path: str
+        @param path: target URL (base_url will be prepended)
+        @type destination: str or file-like object
+        @param destination: path of file to receive the body, or writable file-like object
+        @type chunk_size: int
+        @param chunk_size: Maximum number of bytes read and written at once [Optional; Default = 65536]
+        @type headers: dict
+        @param headers: Extra request headers, e.g. If-None-Match [Optional]
+        @type kwargs: kwargs
+        @param kwargs: any desired URL parameters
+        @return: HTTP request status code, number of bytes written, and dict of response headers.
+                 On a 304 (Not Modified) answer to a conditional request, nothing is written.
+        """
+        kwargs['api_key'] = self.api_key
+        request_url = "%s%s?%s" % (self.base_url, path, urllib.urlencode(kwargs))
+        req = urllib2.Request(request_url, headers=headers or {})
+        logging.debug("PassToolsClient download request_url: %s", request_url)
+
+        response_code, response, response_headers = self.__send(req, preload=False)
+        if response_code == 304:
+            return response_code, 0, response_headers
+        if response_code >= 300:
+            raise exceptions.PassToolsException(message = "Download failed: HTTP %s" % response_code,
+                                                http_status = response_code)
+        try:
+            if hasattr(destination, 'write'):
+                bytes_written = self.__copy_response(response, destination, chunk_size)
+            else:
+                directory = os.path.dirname(os.path.abspath(destination))
+                fd, temp_path = make_temp_file(directory)
+                try:
+                    fh = os.fdopen(fd, 'wb')
+                    try:
+                        bytes_written = self.__copy_response(response, fh, chunk_size)
+                    finally:
+                        fh.close()
+                    os.rename(temp_path, destination)
+                except:
+                    os.remove(temp_path)
+                    raise
+        finally:
+            response.close()
+
+        return response_code, bytes_written, response_headers
+
+    def __copy_response(self, response, destination, chunk_size):
+        bytes_written = 0
+        for chunk in response.stream(chunk_size):
+            destination.write(chunk)
+            bytes_written += len(chunk)
+        content_length = response.getheader('content-length')
+        if content_length is not None and int(content_length) != bytes_written:
+            raise exceptions.PassToolsException(message = "Incomplete download: received %d of %s bytes" %
+                                                (bytes_written, content_length))
+        return bytes_written
+
+    def __encode_form(self, kwargs):
+        # Encode kwargs as a form body and append the api_key, without copying or modifying the caller's dict
+        self.__api_key_check()
+        if "api_key" in kwargs:
+            kwargs = [(key, value) for key, value in kwargs.iteritems() if key != "api_key"]
+        encoded_kwargs = urllib.urlencode(kwargs)
+        if encoded_kwargs:
+            encoded_kwargs += "&"
+        return encoded_kwargs + "api_key=" + urllib.quote_plus(self.api_key)
+
     def __api_key_check(self):
         if not self.api_key:
             raise exceptions.AuthenticationException("No API secret key provided. Did you create a service instance?")
@@ -267,58 +557,231 @@ class PassToolsClient(object):
             raise exceptions.APIException()
 
     def __run_request(self, request):
-        response_code = None
-        response_data = {}
+        # Used by post(), put() and delete(): GETs sent after this don't share requests sent before it
         try:
-            # Open the request on the url
-            http_verbosity = 0     # For debugging purposes...turn it up to 10
-            opener = urllib2.build_opener(urllib2.HTTPHandler(http_verbosity))
-            request_handle = opener.open(request)
-
-            # Get the data from the response
-            response_code = request_handle.code
-            response_data = request_handle.read()
-            request_handle.close()
-            logging.debug("Response code: %d" % response_code)
-        except urllib2.URLError, e:
-            fail_msg = "Error"
-            # If exception includes no status code but a reason, it's a URLError
-            if hasattr(e, 'reason') and hasattr(e.reason, 'errno'):
-                response_code = e.reason.errno
-                fail_msg = "Communication with host '%s' failed: %s (errno %s)" % (request.host, e.reason.strerror, response_code)
-             # else if exception includes an HTTP status code, it's an HTTPError
-            elif hasattr(e, 'code'):
-                fail_msg = self.__req_error(e)
-
-            logging.error(fail_msg)
-
-            if response_code != 200:
-                self.__dispatch_exception(response_code, fail_msg, request)
-
+            response_code, response_data, response_headers = self.__send(request)
+        finally:
+            with self.__writes_lock:
+                self.__writes += 1
         return response_code, response_data
 
+    def __send(self, request, preload=True):
+        # With preload=False, a successful response is returned unread, in place of its data
+        response_code = None
+        response_data = {}
+        response_headers = {}
+        method = request.get_method()
+        headers = dict(request.header_items())
+        headers.setdefault('User-agent', USER_AGENT)
+        # urllib2 capitalizes header names
+        idempotent = self.honours_idempotency_keys and IDEMPOTENCY_HEADER.capitalize() in headers
+        body = request.get_data()
+        event = stats.RequestEvent(method, urlparse.urlsplit(request.get_full_url()).path[len(self.__base_path):],
+                                   len(body or ""))
+        self.__fire('before_request', event)
+        retry_server_errors = idempotent or (method in IDEMPOTENT_METHODS and not NOT_RETRIED_PATH.match(event.path))
+        start = time.time()
+        attempt = 0
+        while True:
+            if self.rate_limiter.acquire():
+                self.counters.increment("rate_limited")
+            try:
+                # Send the request over a pooled connection
+                response = self.pool_manager.urlopen(method, request.get_full_url(), body, headers)
+
+                # Get the data from the response
+                response_code = response.status
+                response_headers = response.headers
+                if preload or response_code >= 300:
+                    response_data = response.read()
+                    event.bytes_in = len(response_data)
+                else:
+                    response_data = response
+                    event.bytes_in = int(response.getheader('content-length') or 0)
+                logging.debug("Response code: %d", response_code)
+            except (socket.error, httplib.HTTPException), e:
+                error_number = getattr(e, 'errno', None)
+                fail_msg = "Communication with host '%s' failed: %s (errno %s)" % (request.get_host(), e, error_number)
+                logging.error(fail_msg)
+                event.timings["total"] = time.time() - start
+                event.retries = attempt
+                self.__fail(event, None, fail_msg, request, exceptions.ConnectionException(fail_msg, error_number))
+
+            if response_code == 429:
+                self.counters.increment("throttled")
+            if attempt >= self.max_retries:
+                break
+            if not (response_code == 429 or (response_code >= 500 and retry_server_errors)):
+                break
+            delay = self.__retry_delay(attempt, response.getheader('Retry-After'))
+            logging.warning("HTTP %s from %s, retrying in %.2fs", response_code, request.get_selector(), delay)
+            self.counters.increment("retried")
+            if response_code == 429:
+                # Hold back every thread sharing this client, not just this one
+                self.rate_limiter.pause(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+        event.status = response_code
+        event.retries = attempt
+        event.timings.update(response.timings)
+        event.timings["total"] = time.time() - start
+        if response_code >= 400:
+            fail_msg = self.__req_error(response_code, response.reason, response_data)
+            logging.error(fail_msg)
+            self.__fail(event, response_code, fail_msg, request)
+        self.__fire('after_response', event)
 
+        return response_code, response_data, response_headers
 
-    def __req_error(self, e):
-        response_code = e.code
+    def __fail(self, event, response_code, fail_msg, request, error=None):
+        try:
+            if error is not None:
+                raise error
+            self.__dispatch_exception(response_code, fail_msg, request)
+        except exceptions.PassToolsException, e:
+            event.error = e
+            self.__fire('on_error', event)
+            raise
+
+    def __retry_delay(self, attempt, retry_after=None):
+        # Exponential backoff with full jitter, unless the server said how long to wait (within max_backoff)
+        delay = random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                retry_date = email.utils.parsedate_tz(retry_after)
+                if retry_date:
+                    delay = max(delay, email.utils.mktime_tz(retry_date) - time.time())
+        return min(delay, self.max_backoff)
+
+    def __req_error(self, response_code, reason, response_data):
         fail_msg = "HTTPError (%s)" % response_code
         if response_code < 500:
         # If not a server error, read error details from the returned page
             try:
-                err_page = json.load(e)
-                if 'description' in err_page:
-                    fail_msg += (" %s" % err_page['description'])
-                if 'details' in err_page:
-                    if err_page['details'] == "field errors" and "fieldErrors" in err_page:
-                        fail_msg += " Details:\n"
-                        for err_item in err_page['fieldErrors']:
-                            fail_msg += err_item["message"] + "\n"
-                    else:
-                        fail_msg += (" Details: '%s'" % err_page['details'])
-            except: 
-                raise
+                err_page = self.codec.loads(response_data)
+            except ValueError:
+                err_page = {}
+            if 'description' in err_page:
+                fail_msg += (" %s" % err_page['description'])
+            if 'details' in err_page:
+                if err_page['details'] == "field errors" and "fieldErrors" in err_page:
+                    fail_msg += " Details:\n"
+                    for err_item in err_page['fieldErrors']:
+                        fail_msg += err_item["message"] + "\n"
+                else:
+                    fail_msg += (" Details: '%s'" % err_page['details'])
         else: # For a server error, don't count on an error page
-             if hasattr(e, 'msg'):
-                fail_msg += (": %s" % e.msg)                
+             if reason:
+                fail_msg += (": %s" % reason)
         return fail_msg
 
+
+#########################
+# CLASS AsyncPassToolsClient
+#
+#
+#########################
+class AsyncPassToolsClient(object):
+
+    def __init__(self, api_key=None, concurrency=workers.DEFAULT_WORKERS, api_client=None, **client_options):
+        """
+        Init new AsyncPassToolsClient instance.
+        Requests are run on a pool of worker threads and return workers.Future instances;
+        at most 'concurrency' requests are in flight at once.
+
+        @type api_key: string
+        @param api_key: Passtools API Key
+        @type concurrency: int
+        @param concurrency: Maximum number of concurrent requests [Optional; Default = 10]
+        @type api_client: PassToolsClient
+        @param api_client: Client used to run requests [Optional; Default = new client sized to concurrency]
+        @type client_options: kwargs
+        @param client_options: Connection settings passed to a new PassToolsClient [Optional]
+        @return: None
+        """
+        if api_client is None:
+            client_options.setdefault("max_connections", concurrency)
+            api_client = PassToolsClient(api_key=api_key, **client_options)
+        self.api_client = api_client
+        self.worker_pool = workers.WorkerPool(concurrency)
+
+    def get_json(self, path, **kwargs):
+        """
+        Asynchronous PassToolsClient.get_json
+
+        @return: workers.Future of (HTTP status code, response data as json)
+        """
+        return self.worker_pool.submit(self.api_client.get_json, path, **kwargs)
+
+    def get(self, request_url, **kwargs):
+        """
+        Asynchronous PassToolsClient.get
+
+        @return: workers.Future of (HTTP status code, response data as python dict)
+        """
+        return self.worker_pool.submit(self.api_client.get, request_url, **kwargs)
+
+    def post(self, path, kwargs, idempotency_key=None):
+        """
+        Asynchronous PassToolsClient.post
+
+        @return: workers.Future of (HTTP status code, response data as json)
+        """
+        return self.worker_pool.submit(self.api_client.post, path, kwargs, idempotency_key)
+
+    def put(self, path, kwargs = {}, idempotency_key=None):
+        """
+        Asynchronous PassToolsClient.put
+
+        @return: workers.Future of (HTTP status code, response data as json)
+        """
+        return self.worker_pool.submit(self.api_client.put, path, kwargs, idempotency_key)
+
+    def put_json(self, request_url, kwargs = {}):
+        """
+        Asynchronous PassToolsClient.put_json
+
+        @return: workers.Future of (HTTP status code, response data as python dict)
+        """
+        return self.worker_pool.submit(self.api_client.put_json, request_url, kwargs)
+
+    def delete(self, path, kwargs):
+        """
+        Asynchronous PassToolsClient.delete
+
+        @return: workers.Future of (HTTP status code, response data as json)
+        """
+        return self.worker_pool.submit(self.api_client.delete, path, kwargs)
+
+    def delete_json(self, request_url, kwargs):
+        """
+        Asynchronous PassToolsClient.delete_json
+
+        @return: workers.Future of (HTTP status code, response data as python dict)
+        """
+        return self.worker_pool.submit(self.api_client.delete_json, request_url, kwargs)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the client's workers, e.g. a call making several requests through api_client
+
+        @return: workers.Future of the return value of fn
+        """
+        return self.worker_pool.submit(fn, *args, **kwargs)
+
+    def close(self):
+        """
+        Wait for in-flight requests, then stop the workers and close idle connections.
+        """
+        self.worker_pool.shutdown()
+        self.api_client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,402 @@
+##########################################
+# connection.py
+#
+# Pooled, keep-alive HTTP connections
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Thread-safe pool of persistent HTTP(S) connections, used by PassToolsClient so that consecutive
+requests to the same host reuse an open TCP/TLS connection instead of paying a new handshake each time.
+
+"""
+
+import base64
+import collections
+import errno
+import httplib
+import select
+import socket
+import ssl
+import threading
+import time
+import urllib
+import urlparse
+
+
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_IDLE_TIMEOUT = 60
+MAX_REDIRECTS = 5
+# Requests which may be sent again over a fresh connection if a reused one turns out to be dead
+REPLAYABLE_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+_DEAD_CONNECTION_ERRNOS = (errno.ECONNRESET, errno.EPIPE)
+
+
+def _never_handled(error, sent):
+    # True if the error shows the server closed the connection before it could handle the request:
+    # the connection was reset while sending it, or closed without a single byte of response
+    if not sent:
+        return (isinstance(error, socket.error) and not isinstance(error, socket.timeout)
+                and error.errno in _DEAD_CONNECTION_ERRNOS)
+    if isinstance(error, httplib.BadStatusLine):
+        return error.line in ("", "''") or error.line.startswith("No status line received")
+    return False
+
+
+def _is_closed(conn):
+    # An idle keep-alive connection is readable only if the server closed it (or sent something unasked)
+    if conn.sock is None:
+        return True
+    try:
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (select.error, socket.error, ValueError):
+        return True
+
+
+def _proxy_for(scheme, host):
+    # (host, port, Proxy-Authorization header or None) of the proxy set in the environment for this host
+    proxy_url = urllib.getproxies().get(scheme)
+    if not proxy_url or urllib.proxy_bypass(host):
+        return None
+    if "://" not in proxy_url:
+        proxy_url = "http://" + proxy_url
+    parts = urlparse.urlsplit(proxy_url)
+    authorization = None
+    if parts.username:
+        credentials = "%s:%s" % (urllib.unquote(parts.username), urllib.unquote(parts.password or ""))
+        authorization = "Basic " + base64.b64encode(credentials)
+    return parts.hostname, parts.port or 80, authorization
+
+
+def _timed_socket(conn):
+    # Resolve and connect separately, recording how long each step took
+    start = time.time()
+    addresses = socket.getaddrinfo(conn.host, conn.port, 0, socket.SOCK_STREAM)
+    resolved = time.time()
+    conn.timings["dns"] = resolved - start
+    error = socket.error("getaddrinfo returned an empty list")
+    for family, socktype, proto, canonname, address in addresses:
+        sock = socket.socket(family, socktype, proto)
+        if conn.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+            sock.settimeout(conn.timeout)
+        try:
+            sock.connect(address)
+        except socket.error, e:
+            sock.close()
+            error = e
+            continue
+        conn.timings["connect"] = time.time() - resolved
+        return sock
+    raise error
+
+
+class TimedHTTPConnection(httplib.HTTPConnection):
+    """
+    HTTPConnection recording DNS and connect times of its last connection in 'timings'.
+    """
+
+    def connect(self):
+        self.timings = {}
+        self.sock = _timed_socket(self)
+        if self._tunnel_host:
+            self._tunnel()
+
+
+class TimedHTTPSConnection(httplib.HTTPSConnection):
+    """
+    HTTPSConnection recording DNS, connect and TLS handshake times of its last connection in 'timings'.
+    """
+
+    def connect(self):
+        self.timings = {}
+        sock = _timed_socket(self)
+        if self._tunnel_host:
+            self.sock = sock
+            self._tunnel()
+        start = time.time()
+        context = getattr(self, "_context", None)
+        if context is not None:
+            self.sock = context.wrap_socket(sock, server_hostname=self._tunnel_host or self.host)
+        else:
+            self.sock = ssl.wrap_socket(sock, self.key_file, self.cert_file)
+        self.timings["tls"] = time.time() - start
+
+
+class PooledResponse(object):
+    """
+    Wrapper around httplib.HTTPResponse which returns its connection to the pool once the body has been consumed.
+    """
+
+    def __init__(self, pool, conn, response, timings):
+        self.pool = pool
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = dict(response.getheaders())
+        self.timings = timings
+        self.__conn = conn
+        self.__response = response
+
+    def getheader(self, name, default=None):
+        return self.__response.getheader(name, default)
+
+    def read(self):
+        """
+        Read the full response body and release the connection.
+
+        @return: Response body as str
+        """
+        try:
+            data = self.__response.read()
+        except:
+            self.close()
+            raise
+        self.release()
+        return data
+
+    def stream(self, chunk_size=65536):
+        """
+        Iterate over the response body in chunks of at most chunk_size bytes, releasing the connection
+        when the body is exhausted.
+
+        @type chunk_size: int
+        @param chunk_size: Maximum size of each chunk
+        @return: Generator of str
+        """
+        try:
+            while True:
+                chunk = self.__response.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        except:
+            self.close()
+            raise
+        self.release()
+
+    def release(self):
+        """
+        Return the underlying connection to the pool, or discard it if the server asked to close it.
+        """
+        if self.__conn is None:
+            return
+        conn, self.__conn = self.__conn, None
+        if self.__response.will_close or not self.__response.isclosed():
+            self.pool.discard(conn)
+        else:
+            self.pool.put(conn)
+
+    def close(self):
+        """
+        Discard the underlying connection without reading the remainder of the body.
+        """
+        if self.__conn is None:
+            return
+        conn, self.__conn = self.__conn, None
+        self.pool.discard(conn)
+
+
+class ConnectionPool(object):
+    """
+    Pool of keep-alive connections to a single scheme/host/port.
+
+    At most max_connections connections are open at once; callers block in get() until one is free.
+    Connections idle for longer than idle_timeout seconds, or closed by the server while idle, are closed
+    instead of being reused.
+
+    With a proxy ((host, port, Proxy-Authorization header or None)), connections are made to the proxy:
+    HTTPS requests are tunnelled through it with CONNECT, HTTP requests are sent to it with absolute URLs
+    (see PoolManager). HTTPS connections use ssl_context if given, else the ssl module's defaults.
+    """
+
+    def __init__(self, scheme, host, port=None, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=None, proxy=None, ssl_context=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.proxy = proxy
+        self.ssl_context = ssl_context
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.__idle = collections.deque()
+        self.__lock = threading.Lock()
+        self.__slots = threading.BoundedSemaphore(max_connections)
+
+    def __new_conn(self):
+        kwargs = {}
+        if self.scheme == "https":
+            conn_class = TimedHTTPSConnection
+            if self.ssl_context is not None:
+                kwargs["context"] = self.ssl_context
+        else:
+            conn_class = TimedHTTPConnection
+        host, port = self.host, self.port
+        if self.proxy is not None:
+            host, port = self.proxy[:2]
+        if self.timeout is not None:
+            kwargs["timeout"] = self.timeout
+        conn = conn_class(host, port, **kwargs)
+        if self.proxy is not None and self.scheme == "https":
+            tunnel_headers = None
+            if self.proxy[2]:
+                tunnel_headers = {"Proxy-Authorization": self.proxy[2]}
+            conn.set_tunnel(self.host, self.port, tunnel_headers)
+        return conn
+
+    def get(self):
+        """
+        Check out a connection, blocking until one is available.
+
+        @return: Tuple of (connection, reused), where reused is True if the connection was previously used
+        """
+        self.__slots.acquire()
+        now = time.time()
+        with self.__lock:
+            while self.__idle:
+                conn, last_used = self.__idle.pop()
+                if now - last_used <= self.idle_timeout and not _is_closed(conn):
+                    return conn, True
+                conn.close()
+        return self.__new_conn(), False
+
+    def put(self, conn):
+        """
+        Check a connection back in for reuse.
+        """
+        with self.__lock:
+            self.__idle.append((conn, time.time()))
+        self.__slots.release()
+
+    def discard(self, conn):
+        """
+        Close a checked-out connection and free its slot.
+        """
+        conn.close()
+        self.__slots.release()
+
+    def urlopen(self, method, selector, body=None, headers=None):
+        """
+        Send a request over a pooled connection.
+
+        A reused connection may have been closed by the server while idle. If it turns out to be dead before
+        the server could handle the request (reset while sending it, or closed without any response), a
+        request with a method in REPLAYABLE_METHODS is sent again over a fresh connection. Requests are never
+        sent again after a timeout, or when the method is not replayable (POST).
+
+        The response carries 'timings' of the request in seconds: 'first_byte' (from sending the request to
+        receiving the response headers) and, if a new connection was opened for it, 'dns', 'connect' and 'tls'.
+
+        @type method: str
+        @param method: HTTP method
+        @type selector: str
+        @param selector: Path and query string of the request
+        @type body: str
+        @param body: Request body [Optional]
+        @type headers: dict
+        @param headers: Request headers [Optional]
+        @return: PooledResponse instance
+        """
+        while True:
+            conn, reused = self.get()
+            sent = False
+            try:
+                start = time.time()
+                conn.request(method, selector, body, headers or {})
+                sent = True
+                response = conn.getresponse()
+                elapsed = time.time() - start
+                timings = {}
+                if not reused:
+                    timings.update(getattr(conn, "timings", None) or {})
+                # Connection setup happens inside request(); don't count it as waiting for the server
+                timings["first_byte"] = elapsed - sum(timings.values())
+            except (socket.error, httplib.HTTPException), e:
+                self.discard(conn)
+                if reused and method in REPLAYABLE_METHODS and _never_handled(e, sent):
+                    continue
+                raise
+            except:
+                self.discard(conn)
+                raise
+            return PooledResponse(self, conn, response, timings)
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        with self.__lock:
+            while self.__idle:
+                conn, last_used = self.__idle.pop()
+                conn.close()
+
+
+class PoolManager(object):
+    """
+    Keeps one ConnectionPool per scheme/host/port, all sharing the same settings.
+
+    Like the urllib2 opener it replaces, it uses the proxies set in the environment (http_proxy, https_proxy,
+    no_proxy) unless use_proxies is False, and follows up to MAX_REDIRECTS redirects of GET and HEAD requests.
+    Redirects of other methods are returned as they are.
+    """
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS, idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=None,
+                 use_proxies=True, ssl_context=None):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.use_proxies = use_proxies
+        self.ssl_context = ssl_context
+        self.__pools = {}
+        self.__lock = threading.Lock()
+
+    def connection_pool(self, scheme, host, port=None):
+        key = (scheme, host, port)
+        with self.__lock:
+            pool = self.__pools.get(key)
+        if pool is None:
+            proxy = _proxy_for(scheme, host) if self.use_proxies else None
+            with self.__lock:
+                pool = self.__pools.get(key)
+                if pool is None:
+                    pool = ConnectionPool(scheme, host, port,
+                                          max_connections=self.max_connections,
+                                          idle_timeout=self.idle_timeout,
+                                          timeout=self.timeout,
+                                          proxy=proxy,
+                                          ssl_context=self.ssl_context)
+                    self.__pools[key] = pool
+        return pool
+
+    def urlopen(self, method, url, body=None, headers=None):
+        """
+        Send a request to an absolute URL over the appropriate pool, following redirects of GET and HEAD.
+
+        @return: PooledResponse instance
+        """
+        for redirect in xrange(MAX_REDIRECTS + 1):
+            parts = urlparse.urlsplit(url)
+            pool = self.connection_pool(parts.scheme, parts.hostname, parts.port)
+            request_headers = headers
+            if pool.proxy is not None and parts.scheme == "http":
+                # Plain HTTP goes to the proxy with the absolute URL
+                selector = url
+                if pool.proxy[2]:
+                    request_headers = dict(headers or {}, **{"Proxy-Authorization": pool.proxy[2]})
+            else:
+                selector = parts.path or "/"
+                if parts.query:
+                    selector += "?" + parts.query
+            response = pool.urlopen(method, selector, body, request_headers)
+            location = response.getheader("location")
+            if (response.status not in REDIRECT_STATUSES or not location or method not in ("GET", "HEAD")
+                    or redirect == MAX_REDIRECTS):
+                return response
+            response.read()
+            url = urlparse.urljoin(url, location)
+
+    def close(self):
+        with self.__lock:
+            pools, self.__pools = self.__pools.values(), {}
+        for pool in pools:
+            pool.close()
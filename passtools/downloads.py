@@ -0,0 +1,143 @@
+##########################################
+# downloads.py
+#
+# Content-addressed store of pkpass files
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Directory of downloaded pkpass files, in which identical payloads are stored only once.
+
+Layout of the directory:
+    objects/<xx>/<sha256>.pkpass - one file per distinct payload, named by the hash of its bytes
+    <pass_id>.pkpass             - hard link to the payload of each pass
+    index.json                   - validators (ETag / Last-Modified) and payload hash of each pass
+
+"""
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+import client
+
+
+class HashingWriter(object):
+    """
+    File-like wrapper computing the SHA-256 of everything written through it.
+    """
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+        self.fh.write(data)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+class PassStore(object):
+
+    def __init__(self, directory):
+        """
+        Open (creating if needed) a pass store in directory.
+
+        @type directory: str
+        @param directory: Root directory of the store
+        @return: None
+        """
+        self.directory = directory
+        self.objects_directory = os.path.join(directory, "objects")
+        self.index_path = os.path.join(directory, "index.json")
+        if not os.path.isdir(self.objects_directory):
+            os.makedirs(self.objects_directory)
+        self.__lock = threading.Lock()
+        try:
+            fh = open(self.index_path, "rb")
+        except IOError:
+            self.__index = {}
+        else:
+            try:
+                self.__index = json.load(fh)
+            finally:
+                fh.close()
+
+    def pass_path(self, pass_id):
+        return os.path.join(self.directory, "%s.pkpass" % pass_id)
+
+    def validators(self, pass_id):
+        """
+        @return: Headers for a conditional request of pass_id, or empty dict if the pass isn't stored
+        """
+        entry = self.__index.get(str(pass_id))
+        headers = {}
+        if entry is None or not os.path.exists(self.pass_path(pass_id)):
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def new_object(self):
+        """
+        @return: Tuple of (temporary path, HashingWriter) to receive a new payload
+        """
+        fd, temp_path = client.make_temp_file(self.objects_directory)
+        return temp_path, HashingWriter(os.fdopen(fd, "wb"))
+
+    def add(self, pass_id, temp_path, writer, etag=None, last_modified=None):
+        """
+        Move a completed payload into the store and link it as the file of pass_id.
+        """
+        writer.fh.close()
+        digest = writer.hexdigest()
+        object_directory = os.path.join(self.objects_directory, digest[:2])
+        object_path = os.path.join(object_directory, "%s.pkpass" % digest)
+        with self.__lock:
+            if not os.path.isdir(object_directory):
+                os.makedirs(object_directory)
+            if os.path.exists(object_path):
+                os.remove(temp_path)
+            else:
+                os.rename(temp_path, object_path)
+            pass_path = self.pass_path(pass_id)
+            if not (os.path.exists(pass_path) and os.path.samefile(pass_path, object_path)):
+                # Replace the pass file atomically, so readers see either the old or the new payload
+                link_path = pass_path + ".part"
+                if os.path.exists(link_path):
+                    os.remove(link_path)
+                if hasattr(os, "link"):
+                    os.link(object_path, link_path)
+                else:
+                    shutil.copyfile(object_path, link_path)
+                os.rename(link_path, pass_path)
+            self.__index[str(pass_id)] = {"etag": etag, "last_modified": last_modified, "digest": digest}
+
+    def discard(self, temp_path, writer):
+        writer.fh.close()
+        os.remove(temp_path)
+
+    def save(self):
+        """
+        Write the index to disk.
+        """
+        with self.__lock:
+            data = json.dumps(self.__index)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        fh = os.fdopen(fd, "wb")
+        try:
+            fh.write(data)
+        finally:
+            fh.close()
+        os.rename(temp_path, self.index_path)
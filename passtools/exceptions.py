@@ -21,6 +21,12 @@ class PassToolsException(Exception):
 class APIException(PassToolsException):
   pass
 
+class ConnectionException(PassToolsException):
+  # Raised when no HTTP response was received; errno is that of the socket error, if any
+  def __init__(self, message=None, errno=None):
+    super(ConnectionException, self).__init__(message)
+    self.errno = errno
+
 class AuthenticationException(PassToolsException):
   pass
 
@@ -34,7 +40,7 @@ class TooManyRequestsException(PassToolsException):
     pass
 
 class InvalidRequestException(PassToolsException):
-  def __init__(self, message, param, http_body=None, http_status=None, json_body=None):
+  def __init__(self, message, param=None, http_body=None, http_status=None, json_body=None):
     super(InvalidRequestException, self).__init__(message, http_body, http_status, json_body)
     self.param = param
 
@@ -0,0 +1,306 @@
+##########################################
+# jobs.py
+#
+# Resumable bulk jobs
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Bulk creates and updates that can be resumed after an interruption.
+
+A Job records the outcome of every item in a Journal, an append-only file of one JSON object per line.
+Run again with the same journal and the same input, it skips the items already done and carries on with
+the rest, so a job that died halfway through does not create its first half again.
+
+Every item has a key, by default its position in the input. A create is journaled as started before it is
+sent, and is sent with an Idempotency-Key made of the job's id and the item's key. If the job dies while a
+create is in flight, the journal shows it started but not finished: the create is "in doubt", as it may or
+may not have created a pass (an interruption leaves at most 'concurrency' creates in doubt). So is a create
+which failed with a 5xx or a connection error. In doubt creates are left in journal.in_doubt for you to
+check. Only if the server honours the key, answering with the pass already created rather than creating
+another, is it safe to pass resend_in_doubt=True and send them again (and to create the client with
+honours_idempotency_keys, so that creates failing with 5xx are retried too). The PassTools API does not
+document support for the key.
+
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+
+import exceptions
+import jsoncodec
+import stats
+import workers
+
+
+START = "start"
+OK = "ok"
+FAILED = "err"
+
+
+class Journal(object):
+    """
+    Append-only record of the outcome of each item of a job, one JSON object per line:
+    the job's id ({"job": id}, first line only), creates started ({"k": key, "s": "start"}),
+    items done ({"k": key, "s": "ok", "id": pass_id}) and items failed
+    ({"k": key, "s": "err", "e": exception class, "status": HTTP status, "m": message}).
+
+    Lines are handed to the operating system as they are written, so they survive the process being killed.
+    To also survive the machine going down, set sync_interval: the file is then fsynced whenever that many
+    seconds have passed since the last sync.
+
+    On opening an existing journal, 'done' maps the keys of items done to their pass id, 'failed' the keys of
+    failed items to their (exception class, HTTP status, message), and 'in_doubt' holds the keys of creates
+    started but not finished. A line cut short by a crash is ignored.
+    """
+
+    def __init__(self, path, sync_interval=None):
+        """
+        @type path: str
+        @param path: Path of the journal file; created if missing
+        @type sync_interval: float
+        @param sync_interval: Seconds between fsyncs of the file [Optional; Default = never fsync]
+        """
+        self.path = path
+        self.sync_interval = sync_interval
+        self.codec = jsoncodec.get_codec()
+        self.job_id = None
+        self.done = {}
+        self.failed = {}
+        self.in_doubt = set()
+        self.__lock = threading.Lock()
+        self.__last_sync = time.time()
+        ends_with_newline = self.__load()
+        self.__file = open(path, "a")
+        if not ends_with_newline:
+            self.__file.write("\n")
+        if self.job_id is None:
+            self.job_id = uuid.uuid4().hex
+            self.__write({"job": self.job_id})
+
+    def __load(self):
+        # Returns False if the file ends in the middle of a line
+        if not os.path.exists(self.path):
+            return True
+        line = "\n"
+        with open(self.path) as journal_file:
+            for line in journal_file:
+                try:
+                    entry = self.codec.loads(line)
+                except ValueError:
+                    continue
+                if "job" in entry:
+                    self.job_id = entry["job"]
+                    continue
+                key, state = entry["k"], entry["s"]
+                if state == START:
+                    self.in_doubt.add(key)
+                    continue
+                self.in_doubt.discard(key)
+                if state == OK:
+                    self.done[key] = entry.get("id")
+                    self.failed.pop(key, None)
+                else:
+                    self.failed[key] = (entry.get("e"), entry.get("status"), entry.get("m"))
+        return line.endswith("\n")
+
+    def __write(self, entry):
+        line = self.codec.dumps(entry) + "\n"
+        with self.__lock:
+            self.__file.write(line)
+            self.__file.flush()
+            if self.sync_interval is not None and time.time() - self.__last_sync >= self.sync_interval:
+                os.fsync(self.__file.fileno())
+                self.__last_sync = time.time()
+
+    def start(self, key):
+        self.__write({"k": key, "s": START})
+
+    def record_done(self, key, pass_id=None):
+        self.__write({"k": key, "s": OK, "id": pass_id})
+
+    def record_failed(self, key, error):
+        self.__write({"k": key, "s": FAILED, "e": type(error).__name__,
+                      "status": getattr(error, "http_status", None), "m": str(error)})
+
+    def close(self):
+        with self.__lock:
+            if not self.__file.closed:
+                self.__file.flush()
+                os.fsync(self.__file.fileno())
+                self.__file.close()
+
+
+class Job(object):
+    """
+    Resumable bulk creates and updates, journaled to a file.
+
+    Items are run on 'concurrency' threads through the Service's client, and consumed lazily.
+    Use one journal per job: keys only need to be unique within a job.
+    """
+
+    def __init__(self, service, journal_path, concurrency=workers.DEFAULT_WORKERS, retry_failed=True,
+                 resend_in_doubt=False, sync_interval=None):
+        """
+        @type service: service.Service
+        @param service: Service whose client makes the requests
+        @type journal_path: str
+        @param journal_path: Path of the Journal; an existing journal is resumed
+        @type concurrency: int
+        @param concurrency: Number of concurrent requests [Optional; Default = 10]
+        @type retry_failed: bool
+        @param retry_failed: Retry items an earlier run recorded as failed [Optional; Default = True]
+        @type resend_in_doubt: bool
+        @param resend_in_doubt: Send again creates an earlier run started but did not finish, with the same
+                                Idempotency-Key; else skip them, leaving them in journal.in_doubt. Only
+                                safe if the server honours the key [Optional; Default = False]
+        @type sync_interval: float
+        @param sync_interval: Seconds between fsyncs of the journal [Optional; Default = never fsync]
+        """
+        self.api_client = service.api_client
+        self.journal = Journal(journal_path, sync_interval)
+        self.concurrency = concurrency
+        self.retry_failed = retry_failed
+        self.resend_in_doubt = resend_in_doubt
+
+    def create_passes(self, items, key=None, job_stats=None):
+        """
+        Create a pass for every input item not created by an earlier run of the job.
+
+        API call used is v1/pass/<template_id> (POST)
+
+        @type items: iterable
+        @param items: (template_id, template_fields_model) tuples
+        @type key: callable
+        @param key: Function called with the index and the item, returning the item's key (str)
+                    [Optional; Default = 'create-<index>']
+        @type job_stats: stats.JobStats
+        @param job_stats: Updated with progress and throughput as results complete [Optional]
+        @return: Generator of (index, result) tuples for the items run, where result is the ID of the new
+                 pass or the exceptions.PassToolsException raised for it
+        """
+        api_client = self.api_client
+        journal = self.journal
+
+        def create(item):
+            item_key, (template_id, template_fields_model) = item
+            journal.start(item_key)
+            response_code, response_data = api_client.post("/pass/%s" % (str(template_id)),
+                                                           {"json": api_client.codec.dumps(template_fields_model)},
+                                                           idempotency_key="%s:%s" % (journal.job_id, item_key))
+            pass_id = None
+            if response_code == 200:
+                pass_id = api_client.codec.loads(response_data)["id"]
+            journal.record_done(item_key, pass_id)
+            return pass_id
+
+        return self.__run("create_passes", create, items, key or _create_key, job_stats, True)
+
+    def update_passes(self, updates, key=None, job_stats=None):
+        """
+        Apply every update not applied by an earlier run of the job.
+
+        API call used is v1/pass/<pass_id> (PUT)
+
+        @type updates: iterable
+        @param updates: (pass_id, pass_fields dict) tuples
+        @type key: callable
+        @param key: Function called with the index and the update, returning the update's key (str)
+                    [Optional; Default = 'update-<index>']
+        @type job_stats: stats.JobStats
+        @param job_stats: Updated with progress and throughput as results complete [Optional]
+        @return: Generator of (index, result) tuples for the updates run, where result is the dict of the API
+                 response, or the exceptions.PassToolsException raised for it
+        """
+        api_client = self.api_client
+        journal = self.journal
+
+        def update(item):
+            item_key, (pass_id, pass_fields) = item
+            if pass_id is None:
+                raise exceptions.InvalidParameterException("Job.update_passes() called with an update without pass_id")
+            response_code, response_data = api_client.put("/pass/%s" % (str(pass_id)),
+                                                          {"json": api_client.codec.dumps(pass_fields)})
+            result = None
+            if response_code == 200:
+                result = api_client.codec.loads(response_data)
+            journal.record_done(item_key, pass_id)
+            return result
+
+        return self.__run("update_passes", update, updates, key or _update_key, job_stats, False)
+
+    def __run(self, name, fn, items, key, job_stats, creates):
+        if job_stats is None:
+            job_stats = stats.JobStats()
+        journal = self.journal
+
+        def run(item):
+            try:
+                return fn(item)
+            except exceptions.PassToolsException, e:
+                # A create failing with a server or connection error may have created the pass all the same
+                # (a connection reset after the server read the request, say):
+                # leave it started, hence in doubt
+                if not (creates and _may_have_succeeded(e)):
+                    journal.record_failed(item[0], e)
+                raise
+
+        def pending():
+            # (key, item) of every input item still to be run, with its index
+            for index, item in enumerate(items):
+                item_key = key(index, item)
+                if item_key in journal.done or (item_key in journal.failed and not self.retry_failed):
+                    job_stats.add_skipped(resumed=1)
+                    continue
+                if creates and item_key in journal.in_doubt:
+                    job_stats.add_skipped(in_doubt=1)
+                    if not self.resend_in_doubt:
+                        continue
+                indexes[item_key] = index
+                yield item_key, item
+
+        indexes = {}
+        pool = workers.WorkerPool(self.concurrency)
+        try:
+            for item, future in workers.imap_unordered(pool, run, pending()):
+                index = indexes.pop(item[0])
+                try:
+                    result = future.result()
+                except exceptions.PassToolsException, e:
+                    job_stats.add(failed=1)
+                    result = e
+                else:
+                    job_stats.add(completed=1)
+                yield index, result
+        finally:
+            pool.shutdown()
+            job_stats.finish()
+            logging.info("Job.%s: %s", name, job_stats)
+
+    def close(self):
+        """
+        Sync and close the journal.
+        """
+        self.journal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _may_have_succeeded(error):
+    # No HTTP status: a connection error (exceptions.ConnectionException)
+    return error.http_status is None or error.http_status >= 500
+
+
+def _create_key(index, item):
+    return "create-%d" % index
+
+
+def _update_key(index, item):
+    return "update-%d" % index
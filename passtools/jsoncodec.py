@@ -0,0 +1,74 @@
+##########################################
+# jsoncodec.py
+#
+# JSON encoding and decoding
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+JSON codecs used by PassToolsClient to decode responses and encode request payloads.
+
+Codecs work directly on the bytes received from and sent to the API: loads() takes a response body
+as received, and dumps() returns the str to be sent.
+
+"""
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JSONCodec(object):
+    """
+    Codec using simplejson if installed, else the standard library json module.
+    Byte strings are read as ISO-8859-1, as the SDK always has.
+    """
+
+    name = "json"
+
+    def loads(self, data):
+        return json.loads(data, encoding="ISO-8859-1")
+
+    def dumps(self, obj):
+        return json.dumps(obj, encoding="ISO-8859-1")
+
+
+class UJSONCodec(object):
+    """
+    Codec using ujson, several times faster than json at decoding large responses.
+    Unlike JSONCodec, byte strings within payloads are read as UTF-8: payloads holding ISO-8859-1 byte
+    strings fail to encode (OverflowError) and responses in ISO-8859-1 fail to decode (ValueError), so it
+    is only used when asked for by name.
+    """
+
+    name = "ujson"
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+    def dumps(self, obj):
+        return ujson.dumps(obj)
+
+
+CODECS = {"json": JSONCodec, "ujson": UJSONCodec}
+
+
+def get_codec(name=None):
+    """
+    Return codec instance by name.
+
+    @type name: str
+    @param name: One of 'json', 'ujson' [Optional; Default = 'json']
+    @return: Codec instance
+    """
+    if name is None:
+        name = "json"
+    if name == "ujson" and ujson is None:
+        raise ImportError("ujson codec requested, but ujson is not installed")
+    return CODECS[name]()
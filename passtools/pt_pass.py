@@ -16,11 +16,58 @@ try:
 except ImportError:
     import json
 
-import datetime
 import exceptions
+import timestamps
+
+class PassRecord(object):
+    """
+    Compact summary of a pass, as returned by Pass.list(compact=True).
+    Carries the same attributes as a listed pass.Pass, without a per-instance __dict__.
+    """
+    __slots__ = ("pass_id", "template_id", "url", "created_raw", "_created_parsed",
+                 "updated_raw", "_updated_parsed", "api_client")
+
+    created = timestamps.LazyTimestamp("created")
+    updated = timestamps.LazyTimestamp("updated")
+
+    def __init__(self, pass_dict, api_client=None):
+        self.pass_id = pass_dict.get("id")
+        self.template_id = pass_dict.get("templateId")
+        self.url = pass_dict.get("url")
+        self.created = pass_dict.get("createdAt")
+        self.updated = pass_dict.get("updatedAt")
+        self.api_client = api_client
+
+    def __str__(self):
+        return "id: %s\ntemplate_id: %s\nurl: %s" % (self.pass_id, self.template_id, self.url)
+
+    def promote(self):
+        """
+        Retrieve the full pass this record summarizes
+
+        API call used is v1/pass/<pass_id> (GET)
+
+        @return: pass.Pass instance
+        """
+        return Pass(api_client=self.api_client).get(self.pass_id)
+
+
+_CONTAINERS = (dict, list)
+
+
+def _copy_json(value):
+    # Deep copy of decoded JSON, much cheaper than copy.deepcopy; only recurses into dicts and lists
+    if type(value) is dict:
+        return {key: _copy_json(item) if type(item) in _CONTAINERS else item for key, item in value.iteritems()}
+    return [_copy_json(item) if type(item) in _CONTAINERS else item for item in value]
+
 
 class Pass(object):
 
+    # Timestamps are kept as strings ('created_raw', 'updated_raw') until first read
+    created = timestamps.LazyTimestamp("created")
+    updated = timestamps.LazyTimestamp("updated")
+
     def __init__(self, template_id = None, template_fields_model = None, api_client=None):
         """
         Init, optionally populate, new pass.Pass instance
@@ -38,6 +85,14 @@ class Pass(object):
         super(Pass, self).__init__()
         from client import PassToolsClient
         self.api_client = api_client or PassToolsClient()
+        self.pass_id = None
+        self.template_id = None
+        self.url = None
+        self.pass_fields = None
+        self.created = None
+        self.updated = None
+        # Copy of pass_fields as last retrieved from (or sent to) the API, for changed_fields()
+        self.__loaded_fields = None
         if template_id and template_fields_model:
             new_pass = self.create(template_id, template_fields_model)
             if new_pass:
@@ -67,9 +122,35 @@ class Pass(object):
                 # if the object attribute is not set, set it
                 obj_val = pass_dict.get(db_field,None)
                 if obj_val:
-                    if obj_field in ["created","updated"]:
-                        obj_val = datetime.datetime.strptime(obj_val, '%Y-%m-%d %H:%M:%S.%f')   
                     setattr(self, obj_field, obj_val)
+        self.reset_changes()
+
+    def __diff(self, pass_fields):
+        loaded = self.__loaded_fields
+        if loaded is None:
+            return dict(pass_fields)
+        return dict((name, field) for name, field in pass_fields.iteritems()
+                    if name not in loaded or loaded[name] != field)
+
+    def changed_fields(self):
+        """
+        Pass fields changed since the pass was retrieved from the API (or last updated)
+
+        Fields are compared whole: a changed field is returned with all of its keys. Fields removed from
+        pass_fields are not reported.
+
+        @return: Dict of changed pass_fields; all pass_fields if the pass was not retrieved from the API
+        """
+        return self.__diff(self.pass_fields or {})
+
+    def reset_changes(self):
+        """
+        Treat the current pass_fields as unchanged, so that changed_fields() is empty
+        """
+        if self.pass_fields is None:
+            self.__loaded_fields = None
+        else:
+            self.__loaded_fields = _copy_json(self.pass_fields)
 
     def create(self, template_id = None, template_fields_model = None):
         """
@@ -93,35 +174,63 @@ class Pass(object):
             raise exceptions.InvalidParameterException("Pass.create() called without required parameter: template_fields_model")
 
         request_url = "/pass/%s" % (str(template_id))
-        request = {"json":json.dumps(template_fields_model, encoding="ISO-8859-1")}
+        request = {"json":self.api_client.codec.dumps(template_fields_model)}
         response_code, response_data = self.api_client.post(request_url, request)
 
         new_pass = None
         if response_code == 200:
             new_pass = Pass(api_client=self.api_client)
-            new_pass.__load_from_dict(json.loads(response_data))
+            new_pass.__load_from_dict(self.api_client.codec.loads(response_data))
 
         return new_pass
 
-    def update(self, update_fields = None):
+    def update(self, update_fields = None, refetch = True, changed_only = False):
         """
         Update existing pass
 
+        With changed_only, only the fields changed since the pass was retrieved are sent (see changed_fields());
+        fields left out keep their current values. If nothing changed, no request is made.
+
         API call used is v1/pass/<pass_id> (PUT)
 
-        @type update_fields: dict
-        @param update_fields: Pass.pass_fields dict
-        @return: pass.Pass instance
+        @type update_fields: pass.Pass or dict
+        @param update_fields: Pass whose pass_fields are to be applied, or Pass.pass_fields dict
+        @type refetch: bool
+        @param refetch: Retrieve the updated pass after the update [Optional; Default = True]
+        @type changed_only: bool
+        @param changed_only: Send only changed fields: those of update_fields if it is a Pass, else those differing
+                             from this pass as retrieved [Optional; Default = False]
+        @return: pass.Pass instance if refetch, else dict of the API response to the update;
+                 None if changed_only and nothing changed
         """
         updated_pass = None
-        if update_fields is None or update_fields.pass_id is None:
+        if isinstance(update_fields, Pass):
+            if update_fields.pass_id is None:
+                raise exceptions.InvalidParameterException("Pass.update() called without required parameter: update_fields")
+            if changed_only:
+                pass_fields = update_fields.changed_fields()
+            else:
+                pass_fields = update_fields.pass_fields
+        elif update_fields is None:
             raise exceptions.InvalidParameterException("Pass.update() called without required parameter: update_fields")
+        elif changed_only:
+            pass_fields = self.__diff(update_fields)
+        else:
+            pass_fields = update_fields
+        self.__validate_pass_id(self.pass_id)
+        if changed_only and not pass_fields:
+            return None
 
         request_url = "/pass/%s" % (str(self.pass_id))
-        request = {"json":json.dumps(update_fields.pass_fields, encoding="ISO-8859-1")}
+        request = {"json":self.api_client.codec.dumps(pass_fields)}
         response_code, response_data = self.api_client.put(request_url, request)
         if response_code == 200:
-            updated_pass = self.get()
+            if isinstance(update_fields, Pass):
+                update_fields.reset_changes()
+            if refetch:
+                updated_pass = self.get()
+            else:
+                updated_pass = self.api_client.codec.loads(response_data)
         return updated_pass
 
     def push_update(self, pass_id = None):
@@ -173,7 +282,7 @@ class Pass(object):
 
         new_pass = None
         if response_code == 200:
-            new_pass = Pass()
+            new_pass = Pass(api_client=self.api_client)
             new_pass.__load_from_dict(response_data)
 
         return new_pass
@@ -193,7 +302,7 @@ class Pass(object):
         if template_id:
             request["templateId"] = template_id
         request_url = "/pass"
-        response_code, response_data = self.api_client.get(request_url, request)
+        response_code, response_data = self.api_client.get(request_url, **request)
 
         ret_val = 0
         if response_code == 200:
@@ -201,16 +310,19 @@ class Pass(object):
 
         return ret_val
 
-    def list(self, **kwargs):
+    def list(self, compact = False, **kwargs):
         """
         Retrieve list of existing passes created by owner of API-key
         If template_id is specified, retrieve only passes associated with that template
         Other parameters are translated into query-modifiers
 
         Note that list() returns abbreviated form of passes. Use get() to retrieve full pass.
+        With compact, each item is a lightweight pass.PassRecord; use its promote() to retrieve the full pass.
 
         API call used is v1/pass (GET)
 
+        @type compact: bool
+        @param compact: Return pass.PassRecord instances instead of pass.Pass [Optional; Default = False]
         @type templateId: int
         @param templateId: ID of the template used to create new pass
         @type pageSize: int
@@ -221,16 +333,18 @@ class Pass(object):
         @param order: Name of field on which to sort list [Optional; From (ID, Name, Created, Updated)]
         @type direction: string
         @param direction: Direction which to sort list [Optional; From (ASC, DESC); Default = DESC]
-        @return: List of pass.Pass instances
+        @return: List of pass.Pass (or pass.PassRecord, if compact) instances
         """
 
         request_url = "/pass"
         response_code, response_data = self.api_client.get(request_url, **kwargs)
 
         pass_list = []
-        if response_code == 200:
+        if response_code == 200 and compact:
+            pass_list = [PassRecord(p, self.api_client) for p in response_data["Passes"]]
+        elif response_code == 200:
             for p in response_data["Passes"]:
-                new_pass = Pass()
+                new_pass = Pass(api_client=self.api_client)
                 new_pass.__load_from_dict(p)
                 pass_list.append(new_pass)
 
@@ -240,12 +354,16 @@ class Pass(object):
         """
         Download pkpass file corresponding to existing pass with specified ID
 
+        The file is streamed to disk in fixed-size chunks, and only appears at destination_path once complete.
+
         API call used is v1/pass/<pass_id>/download (GET)
 
-        @type destination_path: str
-        @param destination_path: path to receive pass file. Path must exist, and filename must end with ".pkpass"
+        @type destination_path: str or file-like object
+        @param destination_path: path to receive pass file, or writable file-like object.
+                                 Path must exist, and filename must end with ".pkpass"
         @type pass_id: int
         @param pass_id: pass_id of pass.Pass instance desired  [Optional: If not supplied, = self.pass_id]
+        @return: Number of bytes downloaded
         """
         if pass_id is None:
             if self.pass_id:
@@ -257,12 +375,8 @@ class Pass(object):
             raise exceptions.InvalidParameterException("Pass.download() called without required parameter: destination_path")
 
         request_url = "/pass/%s/download" % (str(pass_id))
-        response_code, response_data = self.api_client.get_json(request_url)
-
-        if response_code == 200:
-            fh = open(destination_path, "wb")
-            fh.write(response_data)
-            fh.close()
+        response_code, bytes_written, response_headers = self.api_client.download(request_url, destination_path)
+        return bytes_written
 
     def delete(self, pass_id = None):
         """
@@ -284,5 +398,5 @@ class Pass(object):
         try:
             test = float(pass_id)
         except (ValueError, TypeError):
-            raise exceptions.exceptions.InvalidParameterException("Non-numeric parameter: pass_id ('%s')" % pass_id)
+            raise exceptions.InvalidParameterException("Non-numeric parameter: pass_id ('%s')" % pass_id)
 
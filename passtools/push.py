@@ -0,0 +1,170 @@
+##########################################
+# push.py
+#
+# Coalescing push scheduler
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Scheduler for pass push updates, used by Service.schedule_push().
+
+A pass changed several times in quick succession only needs to be pushed once, after the last change.
+PushQueue holds each requested push for a coalescing window, folds further requests for the same pass into
+it, then sends the push on a pool of workers at a capped rate.
+
+"""
+
+import atexit
+import collections
+import logging
+import sys
+import threading
+import time
+import weakref
+
+from pt_pass import Pass
+import ratelimit
+import stats
+import workers
+
+
+DEFAULT_WINDOW = 5.0
+
+
+# Queues not closed yet, closed at interpreter exit
+_open_queues = weakref.WeakSet()
+
+
+def _close_open_queues():
+    for queue in list(_open_queues):
+        queue.close()
+
+atexit.register(_close_open_queues)
+
+
+class PushQueue(object):
+    """
+    Coalescing, rate-capped queue of pass pushes.
+
+    A push requested with push() is sent 'window' seconds after it was first requested; requests for the
+    same pass in the meantime share it. Pushes are sent by 'concurrency' workers, at most 'rate' per second
+    (in addition to any rate limit of the client itself). Pending pushes are sent by flush(), by close() and
+    at interpreter exit.
+
+    'counters' counts pushes 'requested', 'coalesced' into a pending push, 'pushed' and 'failed'.
+    """
+
+    def __init__(self, api_client, window=DEFAULT_WINDOW, concurrency=workers.DEFAULT_WORKERS, rate=None, burst=None):
+        self.api_client = api_client
+        self.window = window
+        self.rate_limiter = ratelimit.TokenBucket(rate, burst)
+        self.counters = stats.Counters()
+        # Pass ids in order of first request, hence of due time, and the future of each pending push
+        self.__order = collections.deque()
+        self.__pending = {}
+        self.__in_flight = 0
+        self.__flushing = 0
+        self.__closed = False
+        self.__cond = threading.Condition()
+        self.__pool = workers.WorkerPool(concurrency)
+        self.__thread = threading.Thread(target=self.__schedule)
+        self.__thread.daemon = True
+        self.__thread.start()
+        _open_queues.add(self)
+
+    def push(self, pass_id):
+        """
+        Request a push update of the pass, coalescing with a pending request for the same pass.
+
+        @type pass_id: int
+        @param pass_id: ID of the pt_pass.Pass to push
+        @return: workers.Future of the push_update() result, shared by coalesced requests
+        """
+        with self.__cond:
+            if self.__closed:
+                raise RuntimeError("Cannot push to a closed PushQueue")
+            self.counters.increment("requested")
+            future = self.__pending.get(pass_id)
+            if future is not None:
+                self.counters.increment("coalesced")
+                return future
+            future = workers.Future()
+            self.__pending[pass_id] = future
+            self.__order.append((pass_id, time.time() + self.window))
+            self.__cond.notify_all()
+        return future
+
+    def pending(self):
+        """
+        @return: Number of pushes waiting for their window to end, or being sent
+        """
+        with self.__cond:
+            return len(self.__order) + self.__in_flight
+
+    def __schedule(self):
+        while True:
+            with self.__cond:
+                while True:
+                    if self.__order:
+                        delay = self.__order[0][1] - time.time()
+                        if delay <= 0 or self.__flushing:
+                            break
+                        self.__cond.wait(delay)
+                    elif self.__closed:
+                        return
+                    else:
+                        self.__cond.wait()
+            # Wait for the rate limit with the push still pending, so that it keeps absorbing requests
+            self.rate_limiter.acquire()
+            with self.__cond:
+                pass_id, due = self.__order.popleft()
+                future = self.__pending.pop(pass_id)
+                self.__in_flight += 1
+            self.__pool.submit(self.__push, pass_id, future)
+
+    def __push(self, pass_id, future):
+        try:
+            result = Pass(api_client=self.api_client).push_update(pass_id)
+        except:
+            self.counters.increment("failed")
+            logging.error("PushQueue: push of pass %s failed: %s", pass_id, sys.exc_info()[1])
+            future.set_exc_info(sys.exc_info())
+        else:
+            self.counters.increment("pushed")
+            future.set_result(result)
+        finally:
+            with self.__cond:
+                self.__in_flight -= 1
+                self.__cond.notify_all()
+
+    def flush(self):
+        """
+        Send all pending pushes now, without waiting for their window to end, and wait until they complete.
+        """
+        with self.__cond:
+            self.__flushing += 1
+            self.__cond.notify_all()
+            try:
+                while self.__order or self.__in_flight:
+                    self.__cond.wait()
+            finally:
+                self.__flushing -= 1
+
+    def close(self):
+        """
+        Flush pending pushes, then stop the workers. Further push() calls raise RuntimeError.
+        """
+        with self.__cond:
+            if self.__closed:
+                return
+            self.__closed = True
+        _open_queues.discard(self)
+        self.flush()
+        self.__thread.join()
+        self.__pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
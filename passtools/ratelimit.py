@@ -0,0 +1,60 @@
+##########################################
+# ratelimit.py
+#
+# Client-side request rate limiting
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Token-bucket rate limiter shared by all threads using a PassToolsClient.
+
+"""
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    Allows on average 'rate' requests per second, with bursts of up to 'burst' requests.
+    With rate None the bucket never limits, but pause() still holds back every caller,
+    which is how a server-side 429 delays all threads sharing the client.
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate or 1))
+        self.__tokens = float(self.burst)
+        self.__updated = time.time()
+        self.__resume_at = 0
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request may be sent.
+
+        @return: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self.__lock:
+                now = time.time()
+                delay = self.__resume_at - now
+                if delay <= 0:
+                    if self.rate is None:
+                        return waited
+                    self.__tokens = min(self.burst, self.__tokens + (now - self.__updated) * self.rate)
+                    self.__updated = now
+                    if self.__tokens >= 1:
+                        self.__tokens -= 1
+                        return waited
+                    delay = (1 - self.__tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """
+        Hold back all callers of acquire() for at least 'seconds'.
+        """
+        with self.__lock:
+            self.__resume_at = max(self.__resume_at, time.time() + seconds)
@@ -12,24 +12,46 @@ Models PassTools Service, providing access to the PassTools API.
 For details refer to the documentation: https://passtools.com/docs#api-intro
 
 """
-from client import PassToolsClient
+import logging
+import threading
+
+from client import AsyncPassToolsClient, PassToolsClient
 from template import Template
 from pt_pass import Pass
+import downloads
+import exceptions
+import push
+import stats
+import workers
+
+
+ITER_PAGE_SIZE = 100
 
 
 class Service(object):
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, template_cache=None, **client_options):
         """
         Initiate new Passtools Service instance
+        A Service, like its client.PassToolsClient, is safe to share between threads; web applications should
+        create one per process rather than one per request. The pt_pass.Pass and template.Template instances
+        it returns are plain objects, not meant to be modified from several threads at once.
 
         @type api_key: string
         @param api_key: Passtools API Key
+        @type template_cache: cache.TemplateCache
+        @param template_cache: Cache consulted by get_template() before calling the API [Optional]
+        @type client_options: kwargs
+        @param client_options: Connection, rate limit, retry and response cache settings passed to client.PassToolsClient [Optional]
         @return: None
         """
         super(Service, self).__init__()
         # Share the api_key and base_url with all importers of the module
-        self.api_client = PassToolsClient(api_key=api_key)
+        self.api_client = PassToolsClient(api_key=api_key, **client_options)
+        self.template_cache = template_cache
+        self.push_queue = None
+        self.__push_lock = threading.Lock()
+        self.__closed = False
 
     def is_service_up(self):
         """
@@ -46,6 +68,7 @@ class Service(object):
     def get_template(self, template_id = None):
         """
         Retrieve Template specified by template_id
+        If the service has a template_cache, a cached copy is returned when available.
 
         API call used is v1/template (GET)
 
@@ -53,6 +76,12 @@ class Service(object):
         @param template_id: ID of the desired template
         @return: template.Template instance
         """
+        if self.template_cache is not None and template_id is not None and _is_integer(template_id):
+            new_template = self.template_cache.get(template_id)
+            if new_template is None:
+                new_template = Template(template_id, api_client=self.api_client)
+                self.template_cache.set(template_id, new_template)
+            return new_template
         new_template = Template(template_id, api_client=self.api_client)
         return new_template
 
@@ -68,6 +97,8 @@ class Service(object):
         """
         temp_template = Template(api_client=self.api_client)
         temp_template.delete(template_id)
+        if self.template_cache is not None:
+            self.template_cache.invalidate(template_id)
 
     def count_templates(self):
         """
@@ -89,6 +120,8 @@ class Service(object):
 
         API call used is v1/template/headers (GET)
 
+        @type compact: bool
+        @param compact: Return template.TemplateRecord instances instead of Template [Optional; Default = False]
         @type pageSize: int
         @param pageSize: Maximum length of list to return [Optional; Default = 10]
         @type page: int
@@ -102,6 +135,29 @@ class Service(object):
         temp_template = Template(api_client=self.api_client)
         return temp_template.list(**kwargs)
 
+    def iter_templates(self, page_size = ITER_PAGE_SIZE, **kwargs):
+        """
+        Iterate over all existing templates created by owner of API-key, fetching one page at a time.
+        The next page is fetched in the background while the current one is consumed, and at most two pages
+        are held in memory. Optional parameters are translated into query-modifiers, as for list_templates().
+
+        API call used is v1/template/headers (GET)
+
+        @type page_size: int
+        @param page_size: Number of templates fetched per request [Optional; Default = 100]
+        @type compact: bool
+        @param compact: Yield template.TemplateRecord instances instead of Template [Optional; Default = False]
+        @type page: int
+        @param page: 1-based index of first page to fetch [Optional; Default = 1]
+        @type order: string
+        @param order: Name of field on which to sort list [Optional; From (ID, Name, Created, Updated)]
+        @type direction: string
+        @param direction: Direction which to sort list [Optional; From (ASC, DESC)]
+        @return: Generator of template.Template instances
+        """
+        temp_template = Template(api_client=self.api_client)
+        return _iter_pages(temp_template.list, page_size, kwargs)
+
     def create_pass(self, template_id = None, template_fields_model = None):
         """
         Create new Pass from specified template.
@@ -117,21 +173,151 @@ class Service(object):
         new_pass = Pass(template_id, template_fields_model or {},api_client=self.api_client)
         return new_pass
 
-    def update_pass(self, pass_id, update_fields = None):
+    def create_passes(self, template_id, template_fields_models, concurrency = workers.DEFAULT_WORKERS, bulk_stats = None,
+                      ordered = False, errors = None):
+        """
+        Create many new Passes from specified template, concurrently.
+
+        Input is consumed lazily and results are yielded as soon as each create completes, so neither
+        the input nor the output is ever held in memory as a whole: at most 2 * concurrency creates are
+        pending at a time. Unless ordered, order of results is not preserved; use the returned index to
+        match results to inputs.
+
+        Creates answered with 429 (Too Many Requests) are retried by the client, which holds back
+        every worker until the throttle clears (see client.PassToolsClient).
+
+        API call used is v1/pass/<template_id> (POST)
+
+        @type template_id: int
+        @param template_id: ID of the template used to create new passes
+        @type template_fields_models: iterable
+        @param template_fields_models: template_fields_model dicts, one per pass to create
+        @type concurrency: int
+        @param concurrency: Number of concurrent creates [Optional; Default = 10]
+        @type bulk_stats: stats.BulkStats
+        @param bulk_stats: Updated with progress and throughput as results complete [Optional]
+        @type ordered: bool
+        @param ordered: Yield results in input order, rather than as soon as each create completes [Optional; Default = False]
+        @type errors: stats.ErrorSummary
+        @param errors: Failures are added to it, grouped by cause [Optional]
+        @return: Generator of (index, result) tuples, where index is the 0-based position of the input and
+                 result is either a pt_pass.Pass instance or the exceptions.PassToolsException raised for it
+        """
+        if bulk_stats is None:
+            bulk_stats = stats.BulkStats()
+        if errors is None:
+            errors = stats.ErrorSummary()
+
+        def create(item):
+            index, template_fields_model = item
+            try:
+                return index, Pass(api_client=self.api_client).create(template_id, template_fields_model)
+            except exceptions.PassToolsException, e:
+                return index, e
+
+        pool = workers.WorkerPool(concurrency)
+        items = enumerate(template_fields_models)
+        if ordered:
+            results = workers.imap(pool, create, items)
+        else:
+            results = (future.result() for item, future in workers.imap_unordered(pool, create, items))
+        try:
+            for index, result in results:
+                if isinstance(result, exceptions.PassToolsException):
+                    bulk_stats.add(failed=1)
+                    errors.add(index, result)
+                else:
+                    bulk_stats.add(completed=1)
+                yield index, result
+        finally:
+            pool.shutdown()
+            bulk_stats.finish()
+            logging.info("create_passes: %s", bulk_stats)
+            if len(errors):
+                logging.info("create_passes errors:\n%s", errors)
+
+    def update_pass(self, pass_id, update_fields = None, refetch = True, changed_only = False):
         """
         Update existing pass
 
+        The update is sent directly for pass_id, without retrieving the pass first.
+
         API call used is v1/pass/<pass_id> (PUT)
 
         @type pass_id: int
         @param pass_id: ID of pt_pass.Pass to update
-        @type update_fields: dict
-        @param update_fields: template_fields_model dict of the template used to create new pass
-        @return: pt_pass.Pass instance
+        @type update_fields: pt_pass.Pass or dict
+        @param update_fields: Pass whose pass_fields are to be applied, or pass_fields dict
+        @type refetch: bool
+        @param refetch: Retrieve the updated pass after the update [Optional; Default = True]
+        @type changed_only: bool
+        @param changed_only: If update_fields is a Pass, send only its changed fields, and skip the request if
+                             there are none (see pt_pass.Pass.changed_fields()) [Optional; Default = False]
+        @return: pt_pass.Pass instance if refetch, else dict of the API response to the update;
+                 None if changed_only and nothing changed
         """
         temp_pass = Pass(api_client=self.api_client)
-        new_pass = temp_pass.get(pass_id)
-        return new_pass.update(update_fields)
+        temp_pass.pass_id = pass_id
+        return temp_pass.update(update_fields, refetch, changed_only)
+
+    def update_passes(self, updates, concurrency = workers.DEFAULT_WORKERS, update_stats = None):
+        """
+        Update many existing passes, concurrently, sending only what changed
+
+        Each update is either a pt_pass.Pass, of which only the changed fields are sent (passes with no changes
+        are skipped without a request), or a (pass_id, pass_fields dict) tuple, sent as is. Identical updates
+        are encoded once and the same body is sent for every pass they apply to, so e.g. setting one offer
+        field on many passes costs a single encode.
+
+        Input is consumed lazily and results are yielded as each update completes, in no particular order.
+
+        API call used is v1/pass/<pass_id> (PUT)
+
+        @type updates: iterable
+        @param updates: pt_pass.Pass instances and/or (pass_id, pass_fields) tuples
+        @type concurrency: int
+        @param concurrency: Number of concurrent updates [Optional; Default = 10]
+        @type update_stats: stats.UpdateStats
+        @param update_stats: Updated with progress and throughput as results complete [Optional]
+        @return: Generator of (pass_id, result) tuples, where result is the dict of the API response, None if
+                 the pass was skipped as unchanged, or the exceptions.PassToolsException raised for it
+        """
+        if update_stats is None:
+            update_stats = stats.UpdateStats()
+        bodies = _BodyCache(self.api_client.codec, update_stats)
+
+        def update(item):
+            if isinstance(item, Pass):
+                pass_id, pass_fields = item.pass_id, item.changed_fields()
+            else:
+                pass_id, pass_fields = item
+            if pass_id is None:
+                raise exceptions.InvalidParameterException("Service.update_passes() called with an update without pass_id")
+            if not pass_fields:
+                update_stats.add_update(skipped=1)
+                return pass_id, None
+            body = bodies.encode(pass_fields)
+            response_code, response_data = self.api_client.put("/pass/%s" % (str(pass_id)), {"json": body})
+            result = None
+            if response_code == 200:
+                if isinstance(item, Pass):
+                    item.reset_changes()
+                result = self.api_client.codec.loads(response_data)
+            update_stats.add_update(bytes=len(body))
+            return pass_id, result
+
+        try:
+            for item, future in _run_unordered(update, updates, concurrency):
+                try:
+                    pass_id, result = future.result()
+                except exceptions.PassToolsException, e:
+                    update_stats.add(failed=1)
+                    pass_id = item.pass_id if isinstance(item, Pass) else item[0]
+                    result = e
+                yield pass_id, result
+        finally:
+            update_stats.finish()
+            logging.info("update_passes: %s", update_stats)
 
     def push_pass(self, target_pass_id):
         """
@@ -144,8 +330,63 @@ class Service(object):
         @return: Dict
         """
         temp_pass = Pass(api_client=self.api_client)
-        new_pass = temp_pass.get(target_pass_id)
-        return new_pass.push()
+        return temp_pass.push_update(target_pass_id)
+
+    def open_push_queue(self, window = push.DEFAULT_WINDOW, concurrency = workers.DEFAULT_WORKERS, rate = None, burst = None):
+        """
+        Start the queue used by schedule_push(), flushing and replacing any current one
+
+        @type window: float
+        @param window: Seconds a push is held to absorb further requests for the same pass [Optional; Default = 5]
+        @type concurrency: int
+        @param concurrency: Number of concurrent pushes [Optional; Default = 10]
+        @type rate: float
+        @param rate: Maximum pushes per second [Optional; Default = no limit]
+        @type burst: int
+        @param burst: Maximum pushes sent at once when under the rate [Optional; Default = rate]
+        @return: push.PushQueue instance
+        """
+        queue = push.PushQueue(self.api_client, window, concurrency, rate, burst)
+        with self.__push_lock:
+            closed = self.__closed
+            if not closed:
+                old_queue, self.push_queue = self.push_queue, queue
+        if closed:
+            queue.close()
+            raise RuntimeError("Cannot open a push queue on a closed Service")
+        if old_queue is not None:
+            old_queue.close()
+        return queue
+
+    def schedule_push(self, pass_id):
+        """
+        Push update to existing pass, coalescing repeated requests
+
+        The push is sent once the push queue's window has passed since it was first requested; further
+        requests for the same pass in the meantime are folded into it. A default queue is opened on first use;
+        call open_push_queue() beforehand to configure it. Pending pushes are sent by close(), after which
+        schedule_push() raises RuntimeError.
+
+        API call used is v1/pass/<pass_id>/push (PUT)
+
+        @type pass_id: int
+        @param pass_id: ID of pt_pass.Pass to push
+        @return: workers.Future of Dict, shared by coalesced requests
+        """
+        while True:
+            with self.__push_lock:
+                if self.__closed:
+                    raise RuntimeError("Cannot schedule a push on a closed Service")
+                if self.push_queue is None:
+                    self.push_queue = push.PushQueue(self.api_client)
+                queue = self.push_queue
+            try:
+                return queue.push(pass_id)
+            except RuntimeError:
+                # The queue was closed by open_push_queue() or close() since; push to its replacement
+                with self.__push_lock:
+                    if self.push_queue is queue:
+                        raise
 
     def get_pass(self, pass_id = None):
         """
@@ -202,6 +443,8 @@ class Service(object):
 
         @type templateId: int
         @param templateId: ID of the template used to create new pass
+        @type compact: bool
+        @param compact: Return pt_pass.PassRecord instances instead of Pass [Optional; Default = False]
         @type pageSize: int
         @param pageSize: Maximum length of list to return [Optional; Default = 10]
         @type page: int
@@ -215,6 +458,76 @@ class Service(object):
         temp_pass = Pass(api_client=self.api_client)
         return temp_pass.list(**kwargs)
 
+    def iter_passes(self, page_size = ITER_PAGE_SIZE, **kwargs):
+        """
+        Iterate over all existing passes created by owner of API-key, fetching one page at a time.
+        The next page is fetched in the background while the current one is consumed, and at most two pages
+        are held in memory. Optional parameters are translated into query-modifiers, as for list_passes().
+
+        API call used is v1/pass (GET)
+
+        @type page_size: int
+        @param page_size: Number of passes fetched per request [Optional; Default = 100]
+        @type compact: bool
+        @param compact: Yield pt_pass.PassRecord instances instead of Pass [Optional; Default = False]
+        @type templateId: int
+        @param templateId: ID of the template used to create new pass [Optional]
+        @type page: int
+        @param page: 1-based index of first page to fetch [Optional; Default = 1]
+        @type order: string
+        @param order: Name of field on which to sort list [Optional; From (ID, Name, Created, Updated)]
+        @type direction: string
+        @param direction: Direction which to sort list [Optional; From (ASC, DESC)]
+        @return: Generator of pt_pass.Pass instances
+        """
+        temp_pass = Pass(api_client=self.api_client)
+        return _iter_pages(temp_pass.list, page_size, kwargs)
+
+    def list_all_passes(self, template_id = None, page_size = ITER_PAGE_SIZE, workers = workers.DEFAULT_WORKERS,
+                        order = None, direction = None, stream = False, compact = False):
+        """
+        Retrieve every existing pass created by owner of API-key, fetching pages concurrently
+        If template_id is specified, retrieve only passes associated with that template
+
+        The number of pages is taken from count_passes() up front. Pages are fetched by a pool of workers and
+        merged back in page order, so the result follows the requested order/direction. Passes created or
+        deleted while the listing runs may shift items across page boundaries.
+
+        API call used is v1/pass (GET)
+
+        @type template_id: int
+        @param template_id: ID of the template used to create the passes [Optional]
+        @type page_size: int
+        @param page_size: Number of passes fetched per request [Optional; Default = 100]
+        @type workers: int
+        @param workers: Number of pages fetched concurrently [Optional; Default = 10]
+        @type order: string
+        @param order: Name of field on which to sort list [Optional; From (ID, Name, Created, Updated)]
+        @type direction: string
+        @param direction: Direction which to sort list [Optional; From (ASC, DESC)]
+        @type stream: bool
+        @param stream: Return a generator yielding passes as their pages arrive, instead of a list
+                       [Optional; Default = False]
+        @type compact: bool
+        @param compact: Return pt_pass.PassRecord instances instead of Pass, to keep large listings small in
+                        memory [Optional; Default = False]
+        @return: List (or generator, if stream) of pt_pass.Pass (or PassRecord, if compact) instances
+        """
+        total = self.count_passes(template_id)
+        kwargs = {"pageSize": page_size, "compact": compact}
+        if template_id:
+            kwargs["templateId"] = template_id
+        if order:
+            kwargs["order"] = order
+        if direction:
+            kwargs["direction"] = direction
+        temp_pass = Pass(api_client=self.api_client)
+        pages = xrange(1, (total + page_size - 1) // page_size + 1)
+        all_passes = _fetch_pages(temp_pass.list, pages, workers, kwargs)
+        if stream:
+            return all_passes
+        return list(all_passes)
+
     def download_pass(self, destination_path = None, pass_id = None):
         """
         Download pkpass file corresponding to existing pass with specified ID
@@ -223,8 +536,371 @@ class Service(object):
 
         @type pass_id: int
         @param pass_id: pass_id of pt_pass.Pass instance desired
-        @type destination_path: str
-        @param destination_path: path to receive pass file. Path must exist, and filename must end with ".pkpass"
+        @type destination_path: str or file-like object
+        @param destination_path: path to receive pass file, or writable file-like object.
+                                 Path must exist, and filename must end with ".pkpass"
+        @return: Number of bytes downloaded
         """
         temp_pass = Pass(api_client=self.api_client)
         return temp_pass.download(destination_path, pass_id)
+
+    def download_passes(self, pass_ids, directory, workers = workers.DEFAULT_WORKERS):
+        """
+        Download pkpass files of many passes into directory, concurrently
+
+        Files are kept in a content-addressed store (see downloads.PassStore): each distinct payload is stored
+        once and hard-linked as <directory>/<pass_id>.pkpass. Passes already in the store are requested
+        conditionally, and skipped if unchanged. Failures are logged and counted; other passes continue.
+
+        API call used is v1/pass/<pass_id>/download (GET)
+
+        @type pass_ids: iterable
+        @param pass_ids: IDs of the passes to download
+        @type directory: str
+        @param directory: Directory of the pass store (created if needed)
+        @type workers: int
+        @param workers: Number of concurrent downloads [Optional; Default = 10]
+        @return: stats.DownloadStats of files, bytes and throughput
+        """
+        store = downloads.PassStore(directory)
+        download_stats = stats.DownloadStats()
+
+        def download(pass_id):
+            request_url = "/pass/%s/download" % (str(pass_id))
+            temp_path, writer = store.new_object()
+            try:
+                response_code, bytes_written, response_headers = self.api_client.download(
+                    request_url, writer, headers=store.validators(pass_id))
+            except:
+                store.discard(temp_path, writer)
+                raise
+            if response_code == 304:
+                store.discard(temp_path, writer)
+                download_stats.add_download(skipped=1)
+            else:
+                store.add(pass_id, temp_path, writer,
+                          response_headers.get('etag'), response_headers.get('last-modified'))
+                download_stats.add_download(bytes=bytes_written)
+
+        try:
+            for pass_id, future in _run_unordered(download, pass_ids, workers):
+                error = future.exception()
+                if error is not None:
+                    download_stats.add(failed=1)
+                    logging.error("download_passes: pass %s failed: %s", pass_id, error)
+        finally:
+            store.save()
+            download_stats.finish()
+            logging.info("download_passes: %s", download_stats)
+        return download_stats
+
+    def close(self):
+        """
+        Send pending scheduled pushes, then close idle connections. Pushes can no longer be scheduled.
+        """
+        with self.__push_lock:
+            self.__closed = True
+            queue, self.push_queue = self.push_queue, None
+        if queue is not None:
+            queue.close()
+        self.api_client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _is_integer(value):
+    # Cache keys are int(template_id); other ids skip the cache, and Template.get() rejects them as it would anyway
+    try:
+        int(value)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+
+def _iter_pages(list_page, page_size, kwargs):
+    # Walk pages until a short one, always keeping the fetch of the next page in flight
+    page = kwargs.pop("page", 1)
+    kwargs["pageSize"] = page_size
+    next_page = workers.background(list_page, page=page, **kwargs)
+    while next_page is not None:
+        items = next_page.result()
+        if len(items) < page_size:
+            next_page = None
+        else:
+            page += 1
+            next_page = workers.background(list_page, page=page, **kwargs)
+        for item in items:
+            yield item
+
+
+
+def _freeze(value):
+    # Hashable equivalent of a decoded JSON value, for grouping identical updates
+    if isinstance(value, dict):
+        return frozenset((key, _freeze(item)) for key, item in value.iteritems())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    # Keep the type, so that e.g. 1, 1.0 and True stay distinct
+    return type(value), value
+
+
+class _BodyCache(object):
+    # Encoded request bodies of recent distinct updates, keyed by their frozen value
+    max_size = 1024
+
+    def __init__(self, codec, update_stats):
+        self.codec = codec
+        self.update_stats = update_stats
+        self.__bodies = {}
+        self.__lock = threading.Lock()
+
+    def encode(self, pass_fields):
+        key = _freeze(pass_fields)
+        with self.__lock:
+            body = self.__bodies.get(key)
+        if body is None:
+            body = self.codec.dumps(pass_fields)
+            self.update_stats.add_body()
+            with self.__lock:
+                if len(self.__bodies) >= self.max_size:
+                    self.__bodies.clear()
+                self.__bodies[key] = body
+        return body
+
+
+def _run_unordered(fn, items, concurrency):
+    pool = workers.WorkerPool(concurrency)
+    try:
+        for item, future in workers.imap_unordered(pool, fn, items):
+            yield item, future
+    finally:
+        pool.shutdown()
+
+
+def _fetch_pages(list_page, pages, concurrency, kwargs):
+    pool = workers.WorkerPool(concurrency)
+    try:
+        for items in workers.imap(pool, lambda page: list_page(page=page, **kwargs), pages):
+            for item in items:
+                yield item
+    finally:
+        pool.shutdown()
+
+
+class AsyncService(object):
+
+    def __init__(self, api_key=None, concurrency=workers.DEFAULT_WORKERS, template_cache=None, **client_options):
+        """
+        Initiate new asynchronous Passtools Service instance
+        Every method returning a value mirrors the Service method of the same name, but runs it on the workers
+        of a client.AsyncPassToolsClient and immediately returns a workers.Future. At most 'concurrency' calls
+        run at once. Methods returning generators (iter_passes, create_passes, ...) run concurrently already,
+        and are handed through.
+
+        @type api_key: string
+        @param api_key: Passtools API Key
+        @type concurrency: int
+        @param concurrency: Maximum number of concurrent calls [Optional; Default = 10]
+        @type template_cache: cache.TemplateCache
+        @param template_cache: Cache consulted by get_template() before calling the API [Optional]
+        @type client_options: kwargs
+        @param client_options: Connection, rate limit, retry and response cache settings passed to client.PassToolsClient [Optional]
+        @return: None
+        """
+        super(AsyncService, self).__init__()
+        client_options.setdefault("max_connections", concurrency)
+        self.service = Service(api_key, template_cache=template_cache, **client_options)
+        self.api_client = self.service.api_client
+        self.async_client = AsyncPassToolsClient(concurrency=concurrency, api_client=self.api_client)
+
+    def __submit(self, method, *args, **kwargs):
+        return self.async_client.submit(method, *args, **kwargs)
+
+    def is_service_up(self):
+        """
+        Asynchronous Service.is_service_up
+
+        @return: workers.Future of bool
+        """
+        return self.__submit(self.service.is_service_up)
+
+    def get_template(self, template_id = None):
+        """
+        Asynchronous Service.get_template
+
+        @return: workers.Future of template.Template instance
+        """
+        return self.__submit(self.service.get_template, template_id)
+
+    def delete_template(self, template_id = None):
+        """
+        Asynchronous Service.delete_template
+
+        @return: workers.Future of None
+        """
+        return self.__submit(self.service.delete_template, template_id)
+
+    def count_templates(self):
+        """
+        Asynchronous Service.count_templates
+
+        @return: workers.Future of Integer
+        """
+        return self.__submit(self.service.count_templates)
+
+    def list_templates(self, **kwargs):
+        """
+        Asynchronous Service.list_templates
+
+        @return: workers.Future of List of template.Template instances
+        """
+        return self.__submit(self.service.list_templates, **kwargs)
+
+
+    def iter_templates(self, page_size = ITER_PAGE_SIZE, **kwargs):
+        """
+        Service.iter_templates, which already fetches pages in the background
+
+        @return: Generator of template.Template instances
+        """
+        return self.service.iter_templates(page_size, **kwargs)
+    def create_pass(self, template_id = None, template_fields_model = None):
+        """
+        Asynchronous Service.create_pass
+
+        @return: workers.Future of pt_pass.Pass instance
+        """
+        return self.__submit(self.service.create_pass, template_id, template_fields_model)
+
+
+    def create_passes(self, template_id, template_fields_models, concurrency = workers.DEFAULT_WORKERS, bulk_stats = None,
+                      ordered = False, errors = None):
+        """
+        Service.create_passes, which already runs creates concurrently
+
+        @return: Generator of (index, result) tuples
+        """
+        return self.service.create_passes(template_id, template_fields_models, concurrency, bulk_stats, ordered, errors)
+    def update_pass(self, pass_id, update_fields = None, refetch = True, changed_only = False):
+        """
+        Asynchronous Service.update_pass
+
+        @return: workers.Future of pt_pass.Pass instance, or dict if not refetch (None if nothing changed)
+        """
+        return self.__submit(self.service.update_pass, pass_id, update_fields, refetch, changed_only)
+
+
+    def update_passes(self, updates, concurrency = workers.DEFAULT_WORKERS, update_stats = None):
+        """
+        Service.update_passes, which already runs updates concurrently
+
+        @return: Generator of (pass_id, result) tuples
+        """
+        return self.service.update_passes(updates, concurrency, update_stats)
+    def push_pass(self, target_pass_id):
+        """
+        Asynchronous Service.push_pass
+
+        @return: workers.Future of Dict
+        """
+        return self.__submit(self.service.push_pass, target_pass_id)
+
+
+    def open_push_queue(self, window = push.DEFAULT_WINDOW, concurrency = workers.DEFAULT_WORKERS, rate = None, burst = None):
+        """
+        Service.open_push_queue
+
+        @return: push.PushQueue instance
+        """
+        return self.service.open_push_queue(window, concurrency, rate, burst)
+
+    def schedule_push(self, pass_id):
+        """
+        Service.schedule_push, which is already asynchronous
+
+        @return: workers.Future of Dict
+        """
+        return self.service.schedule_push(pass_id)
+
+    def get_pass(self, pass_id = None):
+        """
+        Asynchronous Service.get_pass
+
+        @return: workers.Future of pt_pass.Pass instance
+        """
+        return self.__submit(self.service.get_pass, pass_id)
+
+    def delete_pass(self, pass_id = None):
+        """
+        Asynchronous Service.delete_pass
+
+        @return: workers.Future of None
+        """
+        return self.__submit(self.service.delete_pass, pass_id)
+
+    def count_passes(self, template_id = None):
+        """
+        Asynchronous Service.count_passes
+
+        @return: workers.Future of Integer
+        """
+        return self.__submit(self.service.count_passes, template_id)
+
+    def list_passes(self, **kwargs):
+        """
+        Asynchronous Service.list_passes
+
+        @return: workers.Future of List of pt_pass.Pass instances
+        """
+        return self.__submit(self.service.list_passes, **kwargs)
+
+
+    def iter_passes(self, page_size = ITER_PAGE_SIZE, **kwargs):
+        """
+        Service.iter_passes, which already fetches pages in the background
+
+        @return: Generator of pt_pass.Pass instances
+        """
+        return self.service.iter_passes(page_size, **kwargs)
+
+    def list_all_passes(self, template_id = None, page_size = ITER_PAGE_SIZE, workers = workers.DEFAULT_WORKERS,
+                        order = None, direction = None, compact = False):
+        """
+        Asynchronous Service.list_all_passes; use Service.list_all_passes(stream=True) to stream the passes
+
+        @return: workers.Future of List of pt_pass.Pass (or PassRecord, if compact) instances
+        """
+        return self.__submit(self.service.list_all_passes, template_id, page_size, workers, order, direction,
+                             compact=compact)
+    def download_pass(self, destination_path = None, pass_id = None):
+        """
+        Asynchronous Service.download_pass
+
+        @return: workers.Future of Integer
+        """
+        return self.__submit(self.service.download_pass, destination_path, pass_id)
+
+
+    def download_passes(self, pass_ids, directory, workers = workers.DEFAULT_WORKERS):
+        """
+        Asynchronous Service.download_passes
+
+        @return: workers.Future of stats.DownloadStats instance
+        """
+        return self.__submit(self.service.download_passes, pass_ids, directory, workers)
+    def close(self):
+        """
+        Wait for pending calls, then stop the workers, send scheduled pushes and close idle connections.
+        """
+        self.async_client.close()
+        self.service.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
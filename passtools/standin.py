@@ -0,0 +1,584 @@
+##########################################
+# standin.py
+#
+# Local stand-in for the PassTools API
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+In-memory HTTP server mimicking the PassTools API, for running the examples offline and for load testing
+the SDK without touching the live service.
+
+It answers the same routes with the same JSON shapes and error codes as the API, and can inject latency
+and failures. Start it in-process:
+
+    server = standin.StandInServer(api_key="test-key")
+    server.start()
+    service = Service("test-key", base_url=server.base_url)
+
+or from the command line: python -m passtools.standin --port 8000 --latency 0.05
+
+"""
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import BaseHTTPServer
+import SocketServer
+import datetime
+import hashlib
+import logging
+import optparse
+import os
+import random
+import socket
+import ssl
+import struct
+import sys
+import threading
+import time
+import urlparse
+
+
+BASE_PATH = "/v1"
+DEFAULT_PKPASS_SIZE = 16384
+# Self-signed certificate and key for 127.0.0.1 and localhost
+CERT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "standin.pem")
+
+_REASONS = BaseHTTPServer.BaseHTTPRequestHandler.responses
+
+
+def _now():
+    return datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
+class _Params(dict):
+    # Query and form parameters of a request, with its headers
+    headers = None
+
+
+class _ApiError(Exception):
+
+    def __init__(self, status, description, details=None, headers=None):
+        super(_ApiError, self).__init__(description)
+        self.status = status
+        self.description = description
+        self.details = details
+        self.headers = headers or {}
+
+
+class _Headers(dict):
+    # Request headers keyed by lowercase name; a lighter stand-in for mimetools.Message
+
+    def __init__(self, rfile, seekable=0):
+        super(_Headers, self).__init__()
+        while True:
+            line = rfile.readline(65537)
+            if line in ("\r\n", "\n", ""):
+                break
+            name, sep, value = line.partition(":")
+            if sep:
+                self[name.strip().lower()] = value.strip()
+
+    def get(self, name, default=None):
+        return super(_Headers, self).get(name.lower(), default)
+
+    getheader = get
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    MessageClass = _Headers
+    # Buffer each response and send it in one write
+    wbufsize = -1
+
+    def setup(self):
+        if isinstance(self.request, ssl.SSLSocket):
+            # Handshake on the connection's own thread, not the accepting one
+            self.request.do_handshake()
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        # Responses larger than the write buffer go out in several sends; don't let Nagle hold the last one
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        self.server.standin.handle(self, "GET")
+
+    def do_POST(self):
+        self.server.standin.handle(self, "POST")
+
+    def do_PUT(self):
+        self.server.standin.handle(self, "PUT")
+
+    def do_DELETE(self):
+        self.server.standin.handle(self, "DELETE")
+
+    def reset(self):
+        # Close the connection without responding; with a zero linger time, closing sends a TCP reset
+        self.close_connection = 1
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.connection._sock.close()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    ssl_context = None
+
+    def get_request(self):
+        request, client_address = BaseHTTPServer.HTTPServer.get_request(self)
+        if self.ssl_context is not None:
+            request = self.ssl_context.wrap_socket(request, server_side=True, do_handshake_on_connect=False)
+        return request, client_address
+
+    def server_activate(self):
+        BaseHTTPServer.HTTPServer.server_activate(self)
+        # Threads serving open keep-alive connections, stopped by close_connections()
+        self.connections = {}
+        self.connections_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        thread = threading.Thread(target=self.process_request_thread, args=(request, client_address))
+        thread.daemon = True
+        with self.connections_lock:
+            self.connections[request] = thread
+        thread.start()
+
+    def shutdown_request(self, request):
+        with self.connections_lock:
+            self.connections.pop(request, None)
+        BaseHTTPServer.HTTPServer.shutdown_request(self, request)
+
+    def handle_error(self, request, client_address):
+        # Connections dropped by clients, or closed by stop(), are routine
+        if not issubclass(sys.exc_info()[0], socket.error):
+            BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+    def close_connections(self):
+        with self.connections_lock:
+            connections, self.connections = self.connections, {}
+        for request in connections:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        for thread in connections.itervalues():
+            thread.join(1.0)
+
+
+class StandInServer(object):
+    """
+    Threaded HTTP server holding templates and passes in memory, answering like the PassTools API under
+    base_url (http://<host>:<port>/v1, or https:// when serving TLS with a certfile; CERT_FILE is a
+    self-signed certificate for 127.0.0.1 and localhost, which clients must be told to trust).
+
+    Routes: /system/status, /template/headers, /template/<id> (GET, DELETE), /pass (GET), /pass/<template_id>
+    (POST), /pass/<id> (GET, PUT, DELETE), /pass/<id>/push (PUT) and /pass/<id>/download (GET). GETs of
+    /template/<id>, /pass/<id> and /pass/<id>/download carry an ETag, and are answered 304 (Not Modified)
+    when sent with it in If-None-Match.
+    A pass create repeating the Idempotency-Key header of an earlier one returns the pass the earlier one
+    created; 'idempotency_keys' maps the keys seen to pass ids. 'updates' lists the (pass_id, pass fields)
+    of every pass update received.
+    Errors use the API's codes: 400 for unknown ids and missing parameters, 401 for a wrong api_key, 406 for
+    undecodable JSON, 429 and 5xx for injected failures.
+
+    Every response is delayed by 'latency' seconds, after the request has been handled (so a slow GET
+    answers with the state it found on arrival). Requests fail with 'failure_status' with probability
+    'failure_rate'; fail_next() queues failures for the next requests, and reset_next() makes the next
+    requests reset their connection after being handled. 'requests' counts requests by method and route,
+    e.g. 'GET /pass/<id>'.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, api_key=None, latency=0, failure_rate=0, failure_status=503,
+                 retry_after=None, pkpass_size=DEFAULT_PKPASS_SIZE, seed=None, certfile=None):
+        """
+        @type host: str
+        @param host: Interface to listen on [Optional; Default = 127.0.0.1]
+        @type port: int
+        @param port: Port to listen on [Optional; Default = any free port]
+        @type api_key: str
+        @param api_key: Only accept requests with this api_key [Optional; Default = accept any]
+        @type latency: float
+        @param latency: Seconds added to every request [Optional; Default = 0]
+        @type failure_rate: float
+        @param failure_rate: Probability of a request failing with failure_status [Optional; Default = 0]
+        @type failure_status: int
+        @param failure_status: Status of injected failures [Optional; Default = 503]
+        @type retry_after: int
+        @param retry_after: Retry-After seconds sent with injected 429s [Optional]
+        @type pkpass_size: int
+        @param pkpass_size: Size in bytes of downloaded pass files [Optional; Default = 16384]
+        @type seed: int
+        @param seed: Seed for failure injection [Optional]
+        @type certfile: str
+        @param certfile: PEM file holding the certificate and private key to serve HTTPS with [Optional;
+                         Default = serve HTTP]
+        """
+        self.api_key = api_key
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.pkpass_size = pkpass_size
+        self.certfile = certfile
+        self.requests = {}
+        self.templates = {}
+        self.passes = {}
+        self.idempotency_keys = {}
+        self.updates = []
+        self.__keys_lock = threading.Lock()
+        self.__random = random.Random(seed)
+        self.__failures = []
+        self.__resets = 0
+        self.__next_id = 1
+        self.__lock = threading.Lock()
+        self.__httpd = _HTTPServer((host, port), _Handler)
+        self.__httpd.standin = self
+        scheme = "http"
+        if certfile is not None:
+            self.__httpd.ssl_context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+            self.__httpd.ssl_context.load_cert_chain(certfile)
+            scheme = "https"
+        self.__thread = None
+        self.host, self.port = self.__httpd.server_address[:2]
+        self.base_url = "%s://%s:%d%s" % (scheme, self.host, self.port, BASE_PATH)
+
+    def __new_id(self):
+        with self.__lock:
+            new_id, self.__next_id = self.__next_id, self.__next_id + 1
+        return new_id
+
+    def add_template(self, fields_model=None, name="Template", description="", template_id=None):
+        """
+        Store a template
+
+        @type fields_model: dict
+        @param fields_model: fieldsModel of the template [Optional]
+        @type template_id: int
+        @param template_id: ID of the template [Optional; Default = next free ID]
+        @return: ID of the template
+        """
+        template_id = template_id or self.__new_id()
+        now = _now()
+        header = {"id": template_id, "name": name, "description": description, "createdAt": now, "updatedAt": now}
+        self.templates[template_id] = {"templateHeader": header, "fieldsModel": fields_model or {}}
+        return template_id
+
+    def add_pass(self, template_id, pass_fields=None):
+        """
+        Store a pass created from a stored template
+
+        @return: ID of the pass
+        """
+        pass_id = self.__new_id()
+        fields = dict(self.templates[template_id]["fieldsModel"])
+        fields.update(pass_fields or {})
+        now = _now()
+        self.passes[pass_id] = {"id": pass_id, "templateId": template_id, "passFields": fields,
+                                "url": "%s/pass/%s/download" % (self.base_url, pass_id),
+                                "serialNumber": hashlib.sha1(str(pass_id)).hexdigest(),
+                                "createdAt": now, "updatedAt": now, "version": 1}
+        return pass_id
+
+    def fail_next(self, status, count=1):
+        """
+        Fail the next 'count' requests with 'status'
+        """
+        with self.__lock:
+            self.__failures.extend([status] * count)
+
+    def reset_next(self, count=1):
+        """
+        Handle the next 'count' requests, then reset their connection instead of responding
+        """
+        with self.__lock:
+            self.__resets += count
+
+    def start(self):
+        """
+        Serve requests on a background thread.
+
+        @return: base_url of the server
+        """
+        self.__thread = threading.Thread(target=self.__httpd.serve_forever)
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        self.__httpd.serve_forever()
+
+    def stop(self):
+        """
+        Stop serving and close open connections.
+        """
+        if self.__thread is not None:
+            self.__httpd.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__httpd.server_close()
+        self.__httpd.close_connections()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    ##########################################
+    # Request handling
+    ##########################################
+
+    def handle(self, handler, method):
+        url = urlparse.urlsplit(handler.path)
+        params = _Params(urlparse.parse_qsl(url.query))
+        params.headers = handler.headers
+        length = int(handler.headers.getheader("content-length") or 0)
+        if length:
+            params.update(urlparse.parse_qsl(handler.rfile.read(length)))
+        status, body, headers = 200, None, {}
+        try:
+            route, args = self.__route(url.path)
+            self.__count("%s %s" % (method, route))
+            self.__inject_failure()
+            if self.api_key is not None and params.get("api_key") != self.api_key:
+                raise _ApiError(401, "Invalid API key")
+            action = self.__routes.get((method, route))
+            if action is None:
+                raise _ApiError(405, "Method not allowed")
+            result = action(self, params, *args)
+            if isinstance(result, tuple):
+                status, body, headers = result
+            else:
+                body = json.dumps(result)
+                headers["Content-Type"] = "application/json"
+        except _ApiError, e:
+            status, headers = e.status, e.headers
+            error = {"description": e.description}
+            if e.details:
+                error["details"] = e.details
+            body = json.dumps(error)
+            headers["Content-Type"] = "application/json"
+        except Exception:
+            logging.exception("StandInServer: %s %s failed", method, url.path)
+            status, body, headers = 500, None, {}
+        if self.__take_reset():
+            handler.reset()
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        self.__respond(handler, status, body, headers)
+
+    def __respond(self, handler, status, body, headers):
+        lines = ["HTTP/1.1 %d %s" % (status, _REASONS.get(status, ("",))[0])]
+        for name, value in headers.iteritems():
+            lines.append("%s: %s" % (name, value))
+        lines.append("Content-Length: %d" % len(body or ""))
+        if handler.close_connection:
+            lines.append("Connection: close")
+        handler.wfile.write("\r\n".join(lines) + "\r\n\r\n" + (body or ""))
+        handler.wfile.flush()
+
+    def __count(self, name):
+        with self.__lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def __take_reset(self):
+        with self.__lock:
+            if not self.__resets:
+                return False
+            self.__resets -= 1
+            return True
+
+    def __inject_failure(self):
+        with self.__lock:
+            if self.__failures:
+                status = self.__failures.pop(0)
+            elif self.failure_rate and self.__random.random() < self.failure_rate:
+                status = self.failure_status
+            else:
+                return
+        headers = {}
+        if status == 429 and self.retry_after is not None:
+            headers["Retry-After"] = str(self.retry_after)
+        raise _ApiError(status, "Injected failure", headers=headers)
+
+    def __route(self, path):
+        if not path.startswith(BASE_PATH + "/"):
+            raise _ApiError(404, "Not found")
+        parts = path[len(BASE_PATH) + 1:].rstrip("/").split("/")
+        args = []
+        route = []
+        for part in parts:
+            if part.isdigit():
+                args.append(int(part))
+                route.append("<id>")
+            else:
+                route.append(part)
+        return "/" + "/".join(route), args
+
+    def __template(self, template_id):
+        template = self.templates.get(template_id)
+        if template is None:
+            raise _ApiError(400, "Invalid template", "Template %s not found" % template_id)
+        return template
+
+    def __pass(self, pass_id):
+        pass_dict = self.passes.get(pass_id)
+        if pass_dict is None:
+            raise _ApiError(400, "Invalid pass", "Pass %s not found" % pass_id)
+        return pass_dict
+
+    def __json_param(self, params):
+        if "json" not in params:
+            raise _ApiError(400, "Missing parameter", "json")
+        try:
+            value = json.loads(params["json"])
+        except ValueError:
+            raise _ApiError(406, "Not acceptable", "Invalid JSON")
+        if not isinstance(value, dict):
+            raise _ApiError(400, "Invalid request", "field errors")
+        return value
+
+    def __page(self, items, params, sort_keys):
+        order = sort_keys.get((params.get("order") or "ID").lower(), sort_keys["id"])
+        items.sort(key=order, reverse=(params.get("direction") or "DESC").upper() == "DESC")
+        try:
+            page_size = int(params.get("pageSize", 10))
+            page = int(params.get("page", 1))
+        except ValueError:
+            raise _ApiError(400, "Invalid request", "page and pageSize must be numbers")
+        start = (page - 1) * page_size
+        return items[start:start + page_size]
+
+    def _system_status(self, params):
+        return {"status": "OK"}
+
+    def _list_templates(self, params):
+        headers = [template["templateHeader"] for template in self.templates.values()]
+        page = self.__page(headers, params, {"id": lambda h: h["id"], "name": lambda h: h["name"],
+                                             "created": lambda h: h["createdAt"], "updated": lambda h: h["updatedAt"]})
+        return {"count": len(headers), "templateHeaders": page}
+
+    def _get_template(self, params, template_id):
+        return self.__conditional(params, self.__template(template_id))
+
+    def _delete_template(self, params, template_id):
+        self.__template(template_id)
+        del self.templates[template_id]
+        return {"status": "OK"}
+
+    def _list_passes(self, params):
+        passes = self.passes.values()
+        if params.get("templateId"):
+            passes = [p for p in passes if str(p["templateId"]) == params["templateId"]]
+        page = self.__page(passes, params, {"id": lambda p: p["id"], "name": lambda p: p["id"],
+                                            "created": lambda p: p["createdAt"], "updated": lambda p: p["updatedAt"]})
+        return {"Count": len(passes),
+                "Passes": [dict((key, p[key]) for key in ("id", "templateId", "url", "createdAt", "updatedAt"))
+                           for p in page]}
+
+    def _create_pass(self, params, template_id):
+        self.__template(template_id)
+        fields = self.__json_param(params)
+        key = params.headers.get("idempotency-key")
+        if key is None:
+            return self._get_pass(params, self.add_pass(template_id, fields))
+        with self.__keys_lock:
+            pass_id = self.idempotency_keys.get(key)
+            if pass_id is None:
+                pass_id = self.idempotency_keys[key] = self.add_pass(template_id, fields)
+        return self._get_pass(params, pass_id)
+
+    def _get_pass(self, params, pass_id):
+        pass_dict = dict(self.__pass(pass_id))
+        del pass_dict["version"]
+        return self.__conditional(params, pass_dict)
+
+    def __conditional(self, params, value):
+        # JSON response carrying an ETag of its body; 304 if the request's If-None-Match has it
+        body = json.dumps(value)
+        headers = {"ETag": '"%s"' % hashlib.sha1(body).hexdigest(), "Content-Type": "application/json"}
+        if params.headers.getheader("if-none-match") == headers["ETag"]:
+            return 304, None, headers
+        return 200, body, headers
+
+    def _update_pass(self, params, pass_id):
+        pass_dict = self.__pass(pass_id)
+        fields = self.__json_param(params)
+        with self.__lock:
+            self.updates.append((pass_id, fields))
+            pass_dict["passFields"] = dict(pass_dict["passFields"], **fields)
+            pass_dict["updatedAt"] = _now()
+            pass_dict["version"] += 1
+        return {"id": pass_id, "status": "OK"}
+
+    def _push_pass(self, params, pass_id):
+        self.__pass(pass_id)
+        return {"status": "OK", "devices": 0}
+
+    def _delete_pass(self, params, pass_id):
+        self.__pass(pass_id)
+        del self.passes[pass_id]
+        return {"status": "OK"}
+
+    def _download_pass(self, params, pass_id):
+        pass_dict = self.__pass(pass_id)
+        etag = '"%s-%s"' % (pass_id, pass_dict["version"])
+        headers = {"ETag": etag, "Content-Type": "application/vnd.apple.pkpass"}
+        if params.headers.getheader("if-none-match") == etag:
+            return 304, None, headers
+        content = "PK\x03\x04" + json.dumps(pass_dict)
+        content = (content * (self.pkpass_size // len(content) + 1))[:self.pkpass_size]
+        return 200, content, headers
+
+    __routes = {
+        ("GET", "/system/status"): _system_status,
+        ("GET", "/template/headers"): _list_templates,
+        ("GET", "/template/<id>"): _get_template,
+        ("DELETE", "/template/<id>"): _delete_template,
+        ("GET", "/pass"): _list_passes,
+        ("POST", "/pass/<id>"): _create_pass,
+        ("GET", "/pass/<id>"): _get_pass,
+        ("PUT", "/pass/<id>"): _update_pass,
+        ("DELETE", "/pass/<id>"): _delete_pass,
+        ("PUT", "/pass/<id>/push"): _push_pass,
+        ("GET", "/pass/<id>/download"): _download_pass,
+    }
+
+
+def main():
+    parser = optparse.OptionParser(usage="python -m passtools.standin [options]")
+    parser.add_option("--host", default="127.0.0.1")
+    parser.add_option("--port", type="int", default=8000)
+    parser.add_option("--api-key", dest="api_key", help="Only accept this api_key")
+    parser.add_option("--latency", type="float", default=0, help="Seconds added to every request")
+    parser.add_option("--failure-rate", dest="failure_rate", type="float", default=0,
+                      help="Probability of a request failing")
+    parser.add_option("--failure-status", dest="failure_status", type="int", default=503,
+                      help="Status of injected failures")
+    parser.add_option("--tls", action="store_true", default=False,
+                      help="Serve HTTPS with the self-signed certificate in %s" % CERT_FILE)
+    parser.add_option("--templates", type="int", default=1, help="Number of templates to create")
+    parser.add_option("--passes", type="int", default=0, help="Number of passes to create per template")
+    options, args = parser.parse_args()
+
+    server = StandInServer(options.host, options.port, options.api_key, options.latency, options.failure_rate,
+                           options.failure_status, certfile=CERT_FILE if options.tls else None)
+    for i in xrange(options.templates):
+        template_id = server.add_template({"offer": {"value": "10% Off"}}, name="Template %d" % (i + 1))
+        for j in xrange(options.passes):
+            server.add_pass(template_id)
+    print "PassTools stand-in serving %s" % server.base_url
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+##########################################
+# stats.py
+#
+# Throughput and request counters
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Counters used to report on the throughput of PassTools SDK operations.
+
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+
+
+# Numeric path segments, replaced when grouping requests by endpoint
+_ID_PATTERN = re.compile(r"/\d+(?=/|$)")
+
+
+class Counters(object):
+    """
+    Thread-safe named event counters.
+    """
+
+    def __init__(self):
+        self.__counts = {}
+        self.__lock = threading.Lock()
+
+    def increment(self, name, amount=1):
+        with self.__lock:
+            self.__counts[name] = self.__counts.get(name, 0) + amount
+
+    def get(self, name):
+        return self.__counts.get(name, 0)
+
+    def snapshot(self):
+        """
+        @return: Dict of counter name to current value
+        """
+        with self.__lock:
+            return dict(self.__counts)
+
+    def reset(self):
+        with self.__lock:
+            self.__counts = {}
+
+
+class BulkStats(object):
+    """
+    Progress of a bulk operation: items completed and failed, and the resulting throughput.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.finished = None
+        self.completed = 0
+        self.failed = 0
+        self.__lock = threading.Lock()
+
+    def add(self, completed=0, failed=0):
+        with self.__lock:
+            self.completed += completed
+            self.failed += failed
+
+    def finish(self):
+        self.finished = time.time()
+
+    def elapsed(self):
+        """
+        @return: Seconds since the operation started (until it finished, if it has)
+        """
+        return (self.finished or time.time()) - self.started
+
+    def rate(self):
+        """
+        @return: Items processed per second
+        """
+        elapsed = self.elapsed()
+        if elapsed <= 0:
+            return 0.0
+        return (self.completed + self.failed) / elapsed
+
+    def __str__(self):
+        return "%d completed, %d failed in %.1fs (%.1f/sec)" % (self.completed,
+                                                              self.failed,
+                                                              self.elapsed(),
+                                                              self.rate())
+
+
+class DownloadStats(BulkStats):
+    """
+    Progress of a bulk download: files downloaded, skipped as unchanged and failed, and bytes transferred.
+    """
+
+    def __init__(self):
+        super(DownloadStats, self).__init__()
+        self.skipped = 0
+        self.bytes = 0
+        self.__lock = threading.Lock()
+
+    def add_download(self, bytes=0, skipped=0):
+        with self.__lock:
+            self.bytes += bytes
+            self.skipped += skipped
+        self.add(completed=1)
+
+    def bytes_rate(self):
+        """
+        @return: Bytes downloaded per second
+        """
+        elapsed = self.elapsed()
+        if elapsed <= 0:
+            return 0.0
+        return self.bytes / elapsed
+
+    def __str__(self):
+        return "%d files (%d unchanged), %d failed, %d bytes in %.1fs (%.1f files/sec, %.0f bytes/sec)" % (
+            self.completed, self.skipped, self.failed, self.bytes, self.elapsed(), self.rate(), self.bytes_rate())
+
+
+class UpdateStats(BulkStats):
+    """
+    Progress of a bulk update: passes updated, skipped as unchanged and failed, and request bytes sent.
+    'bodies' counts the distinct update bodies encoded.
+    """
+
+    def __init__(self):
+        super(UpdateStats, self).__init__()
+        self.skipped = 0
+        self.bytes = 0
+        self.bodies = 0
+        self.__lock = threading.Lock()
+
+    def add_update(self, bytes=0, skipped=0):
+        with self.__lock:
+            self.bytes += bytes
+            self.skipped += skipped
+        self.add(completed=1)
+
+    def add_body(self):
+        with self.__lock:
+            self.bodies += 1
+
+    def __str__(self):
+        return "%d passes (%d unchanged), %d failed, %d distinct updates, %d bytes in %.1fs (%.1f passes/sec)" % (
+            self.completed, self.skipped, self.failed, self.bodies, self.bytes, self.elapsed(), self.rate())
+
+
+class JobStats(BulkStats):
+    """
+    Progress of a resumable job (see jobs.Job): items completed and failed by this run, items skipped as
+    already done by an earlier run ('resumed'), and items an earlier run left in doubt ('in_doubt').
+    """
+
+    def __init__(self):
+        super(JobStats, self).__init__()
+        self.resumed = 0
+        self.in_doubt = 0
+        self.__lock = threading.Lock()
+
+    def add_skipped(self, resumed=0, in_doubt=0):
+        with self.__lock:
+            self.resumed += resumed
+            self.in_doubt += in_doubt
+
+    def __str__(self):
+        return "%d completed, %d failed, %d already done, %d in doubt in %.1fs (%.1f/sec)" % (
+            self.completed, self.failed, self.resumed, self.in_doubt, self.elapsed(), self.rate())
+
+
+class ErrorSummary(object):
+    """
+    Failures of a bulk operation grouped by cause: exception type and HTTP status, with the number of
+    failures, the first message and the input indexes of the first few items failed that way.
+    """
+    max_indexes = 5
+
+    def __init__(self):
+        self.__groups = {}
+        self.__lock = threading.Lock()
+
+    def add(self, index, error):
+        key = (type(error).__name__, getattr(error, "http_status", None))
+        with self.__lock:
+            group = self.__groups.get(key)
+            if group is None:
+                group = self.__groups[key] = {"error": key[0], "status": key[1], "message": str(error),
+                                              "count": 0, "indexes": []}
+            group["count"] += 1
+            if len(group["indexes"]) < self.max_indexes:
+                group["indexes"].append(index)
+
+    def groups(self):
+        """
+        @return: List of dicts with the 'error' class name, HTTP 'status', first 'message', 'count' and
+                 first 'indexes' of each group, most frequent first
+        """
+        with self.__lock:
+            groups = [dict(group, indexes=list(group["indexes"])) for group in self.__groups.values()]
+        return sorted(groups, key=lambda group: -group["count"])
+
+    def __len__(self):
+        with self.__lock:
+            return sum(group["count"] for group in self.__groups.itervalues())
+
+    def __str__(self):
+        return "\n".join("%d x %s (status %s): %s [items %s]" % (
+            group["count"], group["error"], group["status"], group["message"],
+            ", ".join(str(index) for index in group["indexes"])) for group in self.groups())
+
+
+class RequestEvent(object):
+    """
+    Description of one request made by PassToolsClient, passed to its hooks.
+
+    'path' excludes base_url and the query string (and so the api_key). 'status' is None until a response
+    arrives. 'timings' holds seconds spent on 'dns', 'connect' and 'tls' (only when a new connection was
+    opened), 'first_byte' and 'total'. 'retries' is the number of retried attempts, and 'error' the
+    exception raised, if any.
+    """
+
+    def __init__(self, method, path, bytes_out=0):
+        self.method = method
+        self.path = path
+        self.status = None
+        self.bytes_out = bytes_out
+        self.bytes_in = 0
+        self.timings = {}
+        self.retries = 0
+        self.error = None
+
+    def endpoint(self):
+        """
+        @return: Method and path with numeric IDs replaced, e.g. "GET /pass/<id>"
+        """
+        return "%s %s" % (self.method, _ID_PATTERN.sub("/<id>", self.path))
+
+    def __str__(self):
+        return "%s %s %s out=%d in=%d retries=%d %s" % (self.method, self.path, self.status, self.bytes_out,
+                                                       self.bytes_in, self.retries,
+                                                       " ".join("%s=%.4f" % item for item in sorted(self.timings.items())))
+
+
+def log_request(event):
+    """
+    Hook logging a one-line summary of a request at INFO level; used by PassToolsClient in trace mode.
+    """
+    logging.info("PassToolsClient trace: %s", event)
+
+
+class LatencyAggregator(object):
+    """
+    Collects total request times per endpoint and reports their percentiles.
+
+    Register with PassToolsClient.add_hook() for 'after_response' (and 'on_error', to include failures).
+    For each endpoint, a uniform random sample of at most max_samples times is kept, so memory stays
+    bounded however many requests are made.
+    """
+
+    def __init__(self, max_samples=1024):
+        self.max_samples = max_samples
+        self.__samples = {}
+        self.__counts = {}
+        self.__lock = threading.Lock()
+
+    def __call__(self, event):
+        total = event.timings.get("total")
+        if total is None:
+            return
+        endpoint = event.endpoint()
+        with self.__lock:
+            count = self.__counts.get(endpoint, 0) + 1
+            self.__counts[endpoint] = count
+            samples = self.__samples.setdefault(endpoint, [])
+            if len(samples) < self.max_samples:
+                samples.append(total)
+            else:
+                # Reservoir sampling: keep each of the 'count' times with equal probability
+                index = random.randint(0, count - 1)
+                if index < self.max_samples:
+                    samples[index] = total
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """
+        @type quantiles: tuple
+        @param quantiles: Percentiles to report [Optional; Default = (50, 95, 99)]
+        @return: Dict of endpoint to dict of 'count' and 'p<quantile>' latencies in seconds
+        """
+        with self.__lock:
+            snapshot = [(endpoint, sorted(samples), self.__counts[endpoint])
+                        for endpoint, samples in self.__samples.iteritems()]
+        result = {}
+        for endpoint, samples, count in snapshot:
+            summary = {"count": count}
+            for quantile in quantiles:
+                index = min(len(samples) - 1, int(round(quantile / 100.0 * (len(samples) - 1))))
+                summary["p%s" % quantile] = samples[index]
+            result[endpoint] = summary
+        return result
+
+    def reset(self):
+        with self.__lock:
+            self.__samples = {}
+            self.__counts = {}
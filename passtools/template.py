@@ -18,10 +18,48 @@ except ImportError:
 
 import client
 import exceptions
-import datetime
+import timestamps
+
+class TemplateRecord(object):
+    """
+    Compact summary of a template, as returned by Template.list(compact=True).
+    Carries the same attributes as a listed template.Template, without a per-instance __dict__.
+    """
+    __slots__ = ("template_id", "name", "description", "created_raw", "_created_parsed",
+                 "updated_raw", "_updated_parsed", "api_client")
+
+    created = timestamps.LazyTimestamp("created")
+    updated = timestamps.LazyTimestamp("updated")
+
+    def __init__(self, header, api_client=None):
+        template_id = header.get("id")
+        self.template_id = int(template_id) if template_id else None
+        self.name = header.get("name")
+        self.description = header.get("description")
+        self.created = header['createdAt']
+        self.updated = header['updatedAt']
+        self.api_client = api_client
+
+    def __str__(self):
+        return "id=%s\nname=%s\ndescription:%s" % (self.template_id, self.name, self.description)
+
+    def promote(self):
+        """
+        Retrieve the full template this record summarizes
+
+        API call used is v1/template/<template_id> (GET)
+
+        @return: pt_template.Template instance
+        """
+        return Template(self.template_id, api_client=self.api_client)
+
 
 class Template(object):
 
+    # Timestamps are kept as strings ('created_raw', 'updated_raw') until first read
+    created = timestamps.LazyTimestamp("created")
+    updated = timestamps.LazyTimestamp("updated")
+
     def __init__(self, template_id = None, api_client=None):
         """
         Init, optionally populate, new pt_template.Template instance
@@ -81,8 +119,8 @@ class Template(object):
                         header_val = int(header_val)      
                     setattr(self, header_field, header_val)  
 
-        self.created = datetime.datetime.strptime(self.header['createdAt'], '%Y-%m-%d %H:%M:%S.%f') 
-        self.updated = datetime.datetime.strptime(self.header['updatedAt'], '%Y-%m-%d %H:%M:%S.%f')     
+        self.created = self.header['createdAt']
+        self.updated = self.header['updatedAt']
 
 
     def get(self, template_id = None):
@@ -128,15 +166,18 @@ class Template(object):
 
         return ret_val
 
-    def list(self, **kwargs):
+    def list(self, compact = False, **kwargs):
         """
         Retrieve list of existing templates created by owner of API-key
         Optional parameters are translated into query-modifiers
 
         Note that list() returns abbreviated form of templates. Use get() to retrieve full template.
+        With compact, each item is a lightweight TemplateRecord; use its promote() to retrieve the full template.
 
         API call used is v1/template/headers (GET)
 
+        @type compact: bool
+        @param compact: Return pt_template.TemplateRecord instances instead of Template [Optional; Default = False]
         @type pageSize: int
         @param pageSize: Maximum length of list to return [Optional; Default = 10]
         @type page: int
@@ -145,12 +186,15 @@ class Template(object):
         @param order: Name of field on which to sort list [Optional; From (ID, Name, Created, Updated)]
         @type direction: string
         @param direction: Direction which to sort list [Optional; From (ASC, DESC); Default = DESC]
-        @return: List of pt_template.Template instances
+        @return: List of pt_template.Template (or TemplateRecord, if compact) instances
         """
         template_list = []
         request_url = "/template/headers"
         response_code, response_data = self.api_client.get(request_url, **kwargs)
-        if response_code == 200:
+        if response_code == 200 and compact:
+            template_list = [TemplateRecord(template_item, self.api_client)
+                             for template_item in response_data.get("templateHeaders",[])]
+        elif response_code == 200:
             dict_list = response_data.get("templateHeaders",[])
             for template_item in dict_list:
                 new_template = Template(api_client=self.api_client)
@@ -0,0 +1,79 @@
+##########################################
+# timestamps.py
+#
+# Lazy parsing of API timestamps
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Parsing of the createdAt/updatedAt timestamps returned by the PassTools API.
+
+Pass and Template keep the raw timestamp strings and only turn them into datetime objects when
+'created' or 'updated' is first read, so that materialising large listings doesn't pay for parsing
+timestamps nobody looks at.
+
+"""
+
+import datetime
+
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def parse_timestamp(value):
+    """
+    Parse an API timestamp ('2012-11-01 10:00:00.123')
+
+    The fixed layout is sliced directly, which is many times faster than strptime; anything else
+    falls back to strptime with TIMESTAMP_FORMAT.
+
+    @type value: str
+    @param value: Timestamp string, or None
+    @return: datetime.datetime instance, or None if value is empty
+    """
+    if not value:
+        return None
+    fraction = value[20:]
+    if (value[4:5] == "-" and value[7:8] == "-" and value[10:11] == " " and value[13:14] == ":"
+            and value[16:17] == ":" and value[19:20] == "." and fraction.isdigit() and len(fraction) <= 6):
+        try:
+            return datetime.datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                                     int(value[11:13]), int(value[14:16]), int(value[17:19]),
+                                     int(fraction.ljust(6, "0")))
+        except ValueError:
+            pass
+    return datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+class LazyTimestamp(object):
+    """
+    Attribute holding a timestamp which is parsed on first access.
+
+    Assigning a string stores it as '<name>_raw' and defers parsing; assigning a datetime (or None)
+    stores it as is. The parsed value is kept in '_<name>_parsed' along with the raw string it came from,
+    so that copying '<name>_raw' from another instance is picked up. Works on classes with __slots__ as
+    long as they declare both attributes.
+    """
+
+    def __init__(self, name):
+        self.raw_name = name + "_raw"
+        self.parsed_name = "_" + name + "_parsed"
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        raw = getattr(obj, self.raw_name, None)
+        parsed = getattr(obj, self.parsed_name, None)
+        if parsed is not None and parsed[0] is raw:
+            return parsed[1]
+        value = parse_timestamp(raw)
+        setattr(obj, self.parsed_name, (raw, value))
+        return value
+
+    def __set__(self, obj, value):
+        if isinstance(value, basestring):
+            setattr(obj, self.raw_name, value)
+            setattr(obj, self.parsed_name, None)
+        else:
+            setattr(obj, self.raw_name, None)
+            setattr(obj, self.parsed_name, (None, value))
@@ -0,0 +1,287 @@
+##########################################
+# workers.py
+#
+# Thread pool and futures
+#
+# Copyright 2012, Tello, Inc.
+##########################################
+"""
+Minimal thread pool and future implementation used to run PassTools API calls concurrently.
+
+"""
+
+import Queue
+import collections
+import sys
+import threading
+
+
+DEFAULT_WORKERS = 10
+
+
+class Future(object):
+    """
+    Result of a call submitted to a WorkerPool, available once the call completes.
+    """
+
+    def __init__(self):
+        self.__done = threading.Event()
+        self.__lock = threading.Lock()
+        self.__result = None
+        self.__exc_info = None
+        self.__callbacks = []
+
+    def done(self):
+        return self.__done.is_set()
+
+    def result(self, timeout=None):
+        """
+        Wait for the call to complete and return its result, re-raising any exception it raised.
+
+        @type timeout: float
+        @param timeout: Seconds to wait [Optional; Default = wait forever]
+        @return: Return value of the call
+        """
+        if not self.__done.wait(timeout):
+            raise RuntimeError("Timed out waiting for result")
+        if self.__exc_info:
+            raise self.__exc_info[0], self.__exc_info[1], self.__exc_info[2]
+        return self.__result
+
+    def exception(self, timeout=None):
+        """
+        Wait for the call to complete and return the exception it raised, or None.
+        """
+        if not self.__done.wait(timeout):
+            raise RuntimeError("Timed out waiting for result")
+        if self.__exc_info:
+            return self.__exc_info[1]
+        return None
+
+    def add_done_callback(self, fn):
+        """
+        Call fn(future) once the call completes (immediately if it already has).
+        """
+        with self.__lock:
+            if not self.__done.is_set():
+                self.__callbacks.append(fn)
+                return
+        fn(self)
+
+    def set_result(self, result):
+        self.__result = result
+        self.__finish()
+
+    def set_exc_info(self, exc_info):
+        self.__exc_info = exc_info
+        self.__finish()
+
+    def __finish(self):
+        with self.__lock:
+            self.__done.set()
+            callbacks, self.__callbacks = self.__callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+
+def run_call(future, fn, args, kwargs):
+    try:
+        result = fn(*args, **kwargs)
+    except:
+        future.set_exc_info(sys.exc_info())
+    else:
+        future.set_result(result)
+
+
+def background(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) on a new daemon thread.
+
+    @return: Future instance
+    """
+    future = Future()
+    thread = threading.Thread(target=run_call, args=(future, fn, args, kwargs))
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def as_completed(futures):
+    """
+    Iterate over futures in the order they complete.
+
+    @type futures: list
+    @param futures: Future instances
+    @return: Generator of Future instances
+    """
+    completed = Queue.Queue()
+    futures = list(futures)
+    for future in futures:
+        future.add_done_callback(completed.put)
+    for i in xrange(len(futures)):
+        yield completed.get()
+
+
+class SingleFlight(object):
+    """
+    Collapses concurrent calls for the same key into one: while a call is running, further calls with its
+    key wait for it and share its result (or exception) instead of running again.
+    """
+
+    def __init__(self):
+        self.__calls = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs), unless a call for key is already running, in which case wait for that one.
+
+        @type key: hashable
+        @param key: Identity of the call
+        @return: Tuple of (future, shared): the completed Future of the call, and whether it was another
+                 caller's call
+        """
+        with self.__lock:
+            future = self.__calls.get(key)
+            shared = future is not None
+            if not shared:
+                future = self.__calls[key] = Future()
+        if shared:
+            future.exception()
+        else:
+            try:
+                run_call(future, fn, args, kwargs)
+            finally:
+                with self.__lock:
+                    del self.__calls[key]
+        return future, shared
+
+
+class WorkerPool(object):
+    """
+    Fixed-size pool of daemon threads executing submitted calls.
+
+    The number of workers bounds how many calls run at once. If max_pending is set, submit()
+    blocks while that many calls are already waiting for a worker.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=None):
+        self.workers = workers
+        self.__queue = Queue.Queue(max_pending or 0)
+        self.__threads = []
+        self.__lock = threading.Lock()
+        self.__shutdown = False
+
+    def __start_workers(self):
+        with self.__lock:
+            if self.__shutdown:
+                raise RuntimeError("Cannot submit to a WorkerPool after shutdown")
+            while len(self.__threads) < self.workers:
+                thread = threading.Thread(target=self.__work)
+                thread.daemon = True
+                thread.start()
+                self.__threads.append(thread)
+
+    def __work(self):
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                break
+            run_call(*item)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule fn(*args, **kwargs) to run on a worker thread.
+
+        @return: Future instance
+        """
+        self.__start_workers()
+        future = Future()
+        self.__queue.put((future, fn, args, kwargs))
+        return future
+
+    def map(self, fn, iterable):
+        """
+        Apply fn to every item of iterable, returning results in input order.
+
+        @return: List of results
+        """
+        futures = [self.submit(fn, item) for item in iterable]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        """
+        Stop the workers once all submitted calls have run.
+
+        @type wait: bool
+        @param wait: Block until the workers have exited [Optional; Default = True]
+        """
+        with self.__lock:
+            self.__shutdown = True
+            threads, self.__threads = self.__threads, []
+        for thread in threads:
+            self.__queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+
+def imap_unordered(pool, fn, iterable, window=None):
+    """
+    Apply fn to every item of iterable on pool, yielding (item, future) pairs as calls complete.
+    Items are consumed lazily: at most 'window' calls are pending at any time.
+
+    @type pool: WorkerPool
+    @param pool: Pool used to run the calls
+    @type fn: callable
+    @param fn: Function called with each item
+    @type iterable: iterable
+    @param iterable: Input items
+    @type window: int
+    @param window: Maximum number of pending calls [Optional; Default = 2 * pool.workers]
+    @return: Generator of (item, Future) tuples
+    """
+    window = window or 2 * pool.workers
+    completed = Queue.Queue()
+    pending = 0
+    for item in iterable:
+        if pending >= window:
+            yield completed.get()
+            pending -= 1
+        future = pool.submit(fn, item)
+        future.add_done_callback(lambda f, item=item: completed.put((item, f)))
+        pending += 1
+    while pending:
+        yield completed.get()
+        pending -= 1
+
+
+def imap(pool, fn, iterable, window=None):
+    """
+    Apply fn to every item of iterable on pool, yielding results in input order.
+    Items are consumed lazily: at most 'window' calls are pending at any time.
+
+    @type pool: WorkerPool
+    @param pool: Pool used to run the calls
+    @type fn: callable
+    @param fn: Function called with each item
+    @type iterable: iterable
+    @param iterable: Input items
+    @type window: int
+    @param window: Maximum number of pending calls [Optional; Default = 2 * pool.workers]
+    @return: Generator of results
+    """
+    window = window or 2 * pool.workers
+    pending = collections.deque()
+    for item in iterable:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
@@ -0,0 +1,41 @@
+# -*- coding: ISO-8859-1 -*-
+##########################################
+
+# Copyright 2012, Tello, Inc.
+##########################################
+
+
+from benchmarks import cases, harness
+from passtools import standin
+
+import optparse
+
+def run_benchmarks():
+	parser = optparse.OptionParser(usage="python run_benchmarks.py [options] [case ...]")
+	parser.add_option("--json", help="Save the results as JSON to this file")
+	parser.add_option("--compare", help="Compare with results saved earlier with --json")
+	parser.add_option("--label", help="Label stored with the results [Default = passtools.api_version]")
+	parser.add_option("--scale", type="float", default=1.0, help="Factor applied to the iterations of every case")
+	parser.add_option("--latency", type="float", default=0, help="Seconds the stand-in server adds to every request")
+	options, names = parser.parse_args()
+
+	selected = [case for case in cases.CASES if not names or case[0] in names]
+	server = standin.StandInServer(api_key=cases.API_KEY, latency=options.latency)
+	tls_server = standin.StandInServer(api_key=cases.API_KEY, latency=options.latency, certfile=standin.CERT_FILE)
+	context = cases.make_context(server, tls_server)
+	server.start()
+	tls_server.start()
+	try:
+		results = harness.run_cases(selected, context, options.scale)
+	finally:
+		server.stop()
+		tls_server.stop()
+
+	if options.json:
+		harness.save(harness.report(results, options.label), options.json)
+	if options.compare:
+		harness.compare(results, harness.load(options.compare))
+
+
+if __name__ == '__main__':
+    run_benchmarks()
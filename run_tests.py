@@ -5,13 +5,13 @@
 ##########################################
 
 
-from examples import templates, passes, user_passes
+from examples import templates, passes, user_passes, threads, bulk, jobs, connections, push, cache, retries, downloads, updates, listings, timestamps, async_service
 
 import unittest
 
 def run_tests():
 	
-	for test_case in [templates.TestTemplates, passes.TestPasses, templates.TestTemplates, user_passes.TestUserPasses]:
+	for test_case in [templates.TestTemplates, passes.TestPasses, templates.TestTemplates, user_passes.TestUserPasses, threads.TestSharedService, threads.TestSingleFlight, bulk.TestProcessRunner, bulk.TestCreatePasses, jobs.TestJobs, connections.TestConnections, connections.TestHTTPSConnections, push.TestPushQueue, cache.TestTemplateCache, cache.TestResponseCache, retries.TestRetries, downloads.TestDownloadPasses, updates.TestUpdates, listings.TestListings, timestamps.TestTimestamps, timestamps.TestCopiedTimestamps, async_service.TestAsyncService, async_service.TestAsyncClient]:
 		suite = unittest.TestLoader().loadTestsFromTestCase(test_case)
 		unittest.TextTestRunner(verbosity=2).run(suite)
 
@@ -19,6 +19,7 @@ setup(name = "PassTools",
     author = 'Tello, Inc.',
     author_email = 'help@tello.com',
     packages = ['passtools'],
+    package_data = {'passtools': ['standin.pem']},
     data_files = [('Example_Scripts/', ['Example_Scripts/Ex1_Templates.py', 
                                 'Example_Scripts/Ex2_Passes.py', 
                                 'Example_Scripts/Ex3_User_Specific_Passes.py', 